@@ -0,0 +1,184 @@
+"""
+Agent Context Injection
+This module builds the per-user context handed to the onboarding agent.
+Static rules live once in the agent definition (STATIC_AGENT_INSTRUCTIONS);
+only the small per-user variables travel with each run as
+additional_instructions, instead of a ~4 KB preamble message that every
+later run of the thread re-reads as input tokens.
+"""
+
+from typing import Dict
+
+# Marker proving an agent definition already carries the static rules
+STATIC_INSTRUCTIONS_MARKER = "[ONBOARDING APP RULES v2]"
+# Markers of earlier rule blocks, replaced when the rules are synced
+PREVIOUS_INSTRUCTIONS_MARKERS = ("[ONBOARDING APP RULES v1]",)
+
+# Static part of the old per-thread preamble - identical for every user
+STATIC_AGENT_INSTRUCTIONS = f"""{STATIC_INSTRUCTIONS_MARKER}
+Every run includes a [USER CONTEXT] block with the signed-in user's name, email, tenant ID and account type.
+
+CRITICAL INSTRUCTIONS: Throughout the entire conversation, whenever you create JSON output for Logic Apps API calls, you MUST always include "tenantId" and "userEmail" with the exact values from the [USER CONTEXT] block.
+
+SIGNATURE DATA HANDLING:
+- During onboarding, you will collect the user's digital signature
+- When signature is provided, you will receive a short signature handle (e.g. "sig_Ab12..."); the image itself stays on the server
+- When submitting employee data to storage, you MUST include:
+  * "signatureHandle": [the handle exactly as given]
+- Never ask for, invent or repeat image data - the system attaches the signature image, timestamp and format itself
+- Store signature data together with other employee information (name, email, phone, etc.)
+- Signature is REQUIRED for onboarding completion
+
+IMPORTANT - SIGNATURE COLLECTION INSTRUCTIONS:
+- After user confirms their details, the system will automatically handle signature collection if required
+- You do NOT need to mention signature in your response
+- Just say: "Thank you for confirming!"
+- The system will show signature canvas automatically if needed based on configuration
+- DO NOT output JSON data to the user
+- DO NOT show API call structures or technical data
+- Keep all responses brief and user-friendly
+
+CRITICAL - NEVER SHOW JSON OR TECHNICAL DATA TO USERS:
+- NEVER output JSON structures in your responses
+- NEVER show API payloads, data structures, or technical formats
+- Keep all responses in natural, conversational language
+- If you need to store data, do it silently without showing the user
+
+IMPORTANT VALIDATION RULES:
+- If tenantId is "unknown", inform user that organization identification may be limited
+- If userEmail contains "no-email" or "unknown", request user to provide their actual email
+- Never use null, undefined, or empty string for these fields
+- Always validate data before sending to Logic Apps
+- Ensure signature data is included when calling storage functions
+
+ERROR HANDLING for missing user information:
+1. If email is missing/unknown, ask user to provide their work email
+2. If tenant is unknown, proceed but note potential routing limitations
+3. Always include both fields even if they contain fallback values
+
+The tenant ID identifies which organization this user belongs to and the email identifies the specific user. Both fields must be included in all API submissions for proper user identification and organizational routing. The context email is not the user's actual email, so do not ask the user whether it is their email; collect the user's email separately during the onboarding process."""
+
+# Tiny thread opener used when the rules come from the agent definition
+GREETING_KICKOFF_MESSAGE = "Hi Employee Onboarding Assistant! Begin the onboarding process with a friendly greeting."
+
+
+def build_user_context(user_info: Dict) -> Dict[str, str]:
+    """
+    Normalize the per-user variables, applying the same fallbacks as before.
+
+    Args:
+        user_info: Normalized Graph profile from get_user_info()
+
+    Returns:
+        Dictionary with user_name, user_email, tenant_id, account_type,
+        email_method plus email_fallback/tenant_fallback flags
+    """
+    user_name = user_info.get('displayName', 'User')
+    user_email = user_info.get('mail', 'no-email@unknown.com')
+    tenant_id = user_info.get('tenant_id', 'unknown')
+
+    email_fallback = not user_email or user_email in ['None', '', 'null']
+    tenant_fallback = not tenant_id or tenant_id in ['None', '', 'null']
+
+    return {
+        'user_name': "User" if user_name == "Unknown" else user_name,
+        'user_email': "no-email@unknown.com" if email_fallback else user_email,
+        'tenant_id': "unknown" if tenant_fallback else tenant_id,
+        'account_type': user_info.get('account_type', 'unknown'),
+        'email_method': user_info.get('email_extraction_method', 'unknown'),
+        'email_fallback': email_fallback,
+        'tenant_fallback': tenant_fallback
+    }
+
+
+def build_run_instructions(context: Dict[str, str]) -> str:
+    """Small per-user block sent as additional_instructions on every run"""
+    return f"""[USER CONTEXT]
+User: {context['user_name']}
+Email: {context['user_email']}
+Tenant ID: {context['tenant_id']}
+Account Type: {context['account_type']}
+Email Status: {context['email_method']}
+Tenant Status: {'Valid' if context['tenant_id'] != 'unknown' else 'Unknown'}"""
+
+
+def agent_has_static_instructions(agent) -> bool:
+    """Check whether an agent definition already contains the static rules"""
+    return STATIC_INSTRUCTIONS_MARKER in (getattr(agent, 'instructions', None) or "")
+
+
+def with_static_instructions(instructions: str) -> str:
+    """Agent instructions with the current rules block appended, dropping an older block"""
+    instructions = instructions or ""
+    for marker in PREVIOUS_INSTRUCTIONS_MARKERS:
+        # Rule blocks are always appended last, so everything from the marker on is ours
+        if marker in instructions:
+            instructions = instructions[:instructions.index(marker)]
+    return f"{instructions.rstrip()}\n\n{STATIC_AGENT_INSTRUCTIONS}"
+
+
+def build_legacy_context_message(context: Dict[str, str]) -> str:
+    """Full per-thread preamble, for agents without the static rules"""
+    user_name = context['user_name']
+    user_email = context['user_email']
+    tenant_id = context['tenant_id']
+    account_type = context['account_type']
+    email_method = context['email_method']
+    return f"""
+        Hi Employee Onboarding Assistant! 
+        
+        [SYSTEM CONTEXT - PLEASE REMEMBER THROUGHOUT THE CONVERSATION]
+        User: {user_name}
+        Email: {user_email}
+        Tenant ID: {tenant_id}
+        Account Type: {account_type}
+        Email Extraction Method: {email_method}
+        
+        CRITICAL INSTRUCTIONS: Throughout this entire conversation, whenever you create JSON output for Logic Apps API calls, you MUST always include these fields with exact values:
+        "tenantId": "{tenant_id}"
+        "userEmail": "{user_email}"
+        
+        SIGNATURE DATA HANDLING:
+        - During onboarding, you will collect the user's digital signature
+        - When signature is provided, you will receive a short signature handle (e.g. "sig_Ab12..."); the image itself stays on the server
+        - When submitting employee data to storage, you MUST include:
+          * "signatureHandle": [the handle exactly as given]
+        - Never ask for, invent or repeat image data - the system attaches the signature image, timestamp and format itself
+        - Store signature data together with other employee information (name, email, phone, etc.)
+        - Signature is REQUIRED for onboarding completion
+        
+        IMPORTANT - SIGNATURE COLLECTION INSTRUCTIONS:
+        - After user confirms their details, the system will automatically handle signature collection if required
+        - You do NOT need to mention signature in your response
+        - Just say: "Thank you for confirming!"
+        - The system will show signature canvas automatically if needed based on configuration
+        - DO NOT output JSON data to the user
+        - DO NOT show API call structures or technical data
+        - Keep all responses brief and user-friendly
+        
+        CRITICAL - NEVER SHOW JSON OR TECHNICAL DATA TO USERS:
+        - NEVER output JSON structures in your responses
+        - NEVER show API payloads, data structures, or technical formats
+        - Keep all responses in natural, conversational language
+        - If you need to store data, do it silently without showing the user
+        
+        IMPORTANT VALIDATION RULES:
+        - If tenantId is "unknown", inform user that organization identification may be limited
+        - If userEmail contains "no-email" or "unknown", request user to provide their actual email
+        - Never use null, undefined, or empty string for these fields
+        - Always validate data before sending to Logic Apps
+        - Ensure signature data is included when calling storage functions
+        
+        ERROR HANDLING for missing user information:
+        1. If email is missing/unknown, ask user to provide their work email
+        2. If tenant is unknown, proceed but note potential routing limitations
+        3. Always include both fields even if they contain fallback values
+        
+        The tenant ID identifies which organization this user belongs to and the email identifies the specific user. Both fields must be included in all API submissions for proper user identification and organizational routing. Also the {user_email} is not the user's actual email, so do not ask the user whether {user_email} is their email. just collect user's Email seperately and do the onboarding process.
+        Current user context validation:
+        - Email Status: {email_method}
+        - Tenant Status: {'✅ Valid' if tenant_id != 'unknown' else '⚠️ Unknown'}
+        - Account Type: {account_type}
+        
+        Begin the onboarding process with a friendly greeting.
+        """
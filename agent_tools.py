@@ -0,0 +1,213 @@
+"""
+Agent Tool Registry
+This module dispatches the function calls an agent run requests. Tools
+register once with a JSON schema; arguments are checked by precompiled
+validators, and the independent calls of one requires_action round run
+concurrently on a bounded thread pool with a per-tool timeout.
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+from jsonschema import Draft7Validator
+
+# Defaults: concurrent tool calls per process and seconds a single call may take
+TOOL_MAX_WORKERS = 8
+TOOL_DEFAULT_TIMEOUT = 30
+
+# Arguments of the submit_employee_onboarding function tool
+# (same definition as in FUNCTION_CALLING_SETUP_GUIDE.md)
+SUBMIT_EMPLOYEE_ONBOARDING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "employee": {
+            "type": "object",
+            "properties": {
+                "firstName": {"type": "string"},
+                "middleName": {"type": "string"},
+                "lastName": {"type": "string"},
+                "email": {"type": "string"},
+                "employee_id": {"type": "string"},
+                "departmentCode": {"type": "string"},
+                "ethnicity": {"type": "string"},
+                "startDate": {"type": "string"},
+                "address": {
+                    "type": "object",
+                    "properties": {
+                        "street": {"type": "string"},
+                        "city": {"type": "string"},
+                        "state": {"type": "string"},
+                        "zipCode": {"type": "string"}
+                    },
+                    "required": ["street", "city", "state", "zipCode"]
+                }
+            },
+            "required": ["firstName", "lastName", "email", "startDate", "address"]
+        },
+        "paymentInfo": {
+            "type": "object",
+            "properties": {
+                "payrollDivisionCode": {"type": "string"},
+                "directDeposit": {"type": "boolean"},
+                "bankAccountNumber": {"type": "string"},
+                "routingNumber": {"type": "string"}
+            },
+            "required": ["directDeposit"]
+        },
+        "w4Info": {
+            "type": "object",
+            "properties": {
+                "filingStatus": {
+                    "type": "string",
+                    "enum": ["Single or Married filing separately", "Married filing jointly", "Head of household"]
+                },
+                "qualifyingChildrenDependents": {"type": "integer"},
+                "otherDependents": {"type": "integer"},
+                "multipleJobs": {"type": "boolean"},
+                "extraWithholding": {"type": "boolean"},
+                "extraWithholdingAmount": {"type": "integer"},
+                "otherIncome": {"type": "integer"},
+                "deductionsAmount": {"type": "integer"}
+            },
+            "required": ["filingStatus", "qualifyingChildrenDependents", "otherDependents", "multipleJobs",
+                         "extraWithholding", "extraWithholdingAmount", "otherIncome", "deductionsAmount"]
+        },
+        # Opaque reference to the collected signature; the image is attached server-side
+        "signatureHandle": {"type": "string"}
+    },
+    "required": ["employee", "paymentInfo", "w4Info"]
+}
+
+
+class _Tool:
+    """A registered function with its compiled argument validator"""
+    __slots__ = ("name", "handler", "validator", "timeout")
+
+    def __init__(self, name: str, handler: Callable, schema: Dict, timeout: float):
+        Draft7Validator.check_schema(schema)
+        self.name = name
+        self.handler = handler
+        self.validator = Draft7Validator(schema)
+        self.timeout = timeout
+
+
+class ToolRegistry:
+    """
+    Name -> tool mapping plus a bounded executor for running tool calls.
+
+    Handlers are called as handler(arguments, context) on a worker thread,
+    so they must take everything session-specific from context rather than
+    from st.session_state.
+    """
+
+    def __init__(self, max_workers: int = TOOL_MAX_WORKERS):
+        self._tools: Dict[str, _Tool] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, handler: Callable[[Dict, Any], Any], schema: Dict,
+                 timeout: float = TOOL_DEFAULT_TIMEOUT, aliases: Optional[List[str]] = None) -> None:
+        """
+        Register a function tool.
+
+        Args:
+            name: Function name the agent calls
+            handler: Callable taking (arguments, context) and returning a JSON-serializable result
+            schema: JSON schema of the arguments (compiled once here)
+            timeout: Seconds to wait for the handler before reporting a timeout
+            aliases: Other function names routed to the same handler
+        """
+        tool = _Tool(name, handler, schema, timeout)
+        for tool_name in [name] + list(aliases or []):
+            self._tools[tool_name] = tool
+
+    def execute(self, tool_calls: List[Any], context: Any = None) -> List[Dict[str, str]]:
+        """
+        Run one round of tool calls concurrently.
+
+        Args:
+            tool_calls: Tool calls from run.required_action.submit_tool_outputs
+            context: Passed to every handler as its second argument
+
+        Returns:
+            Tool outputs in the order of tool_calls, ready for submit_tool_outputs
+        """
+        started = {}
+        outputs = {}
+
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            print(f"📞 Calling function: {function_name}")
+            tool = self._tools.get(function_name)
+            if tool is None:
+                outputs[tool_call.id] = {"error": f"Unknown function: {function_name}"}
+                self._record(function_name, "unknown", 0.0)
+                continue
+
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError as e:
+                outputs[tool_call.id] = {"error": f"Arguments are not valid JSON: {e}"}
+                self._record(tool.name, "invalid", 0.0)
+                continue
+
+            errors = sorted(tool.validator.iter_errors(arguments), key=lambda error: list(error.path))
+            if errors:
+                # Let the agent correct its call instead of sending bad data downstream
+                messages = [f"{'/'.join(str(part) for part in error.path) or '(root)'}: {error.message}"
+                            for error in errors[:10]]
+                print(f"⚠️ Invalid arguments for {function_name}: {messages}")
+                outputs[tool_call.id] = {"error": "Invalid arguments", "details": messages}
+                self._record(tool.name, "invalid", 0.0)
+                continue
+
+            started[tool_call.id] = (tool, time.perf_counter(),
+                                     self._executor.submit(tool.handler, arguments, context))
+
+        for tool_call_id, (tool, start, future) in started.items():
+            # Calls run in parallel, so each deadline counts from its own start
+            remaining = max(0.0, tool.timeout - (time.perf_counter() - start))
+            try:
+                outputs[tool_call_id] = future.result(timeout=remaining)
+                outcome = "ok"
+            except FutureTimeout:
+                print(f"⏱️ TIMEOUT: {tool.name} did not finish within {tool.timeout} seconds")
+                outputs[tool_call_id] = {"success": False, "message": f"{tool.name} timed out after {tool.timeout} seconds"}
+                outcome = "timeout"
+            except Exception as e:
+                print(f"❌ EXCEPTION in {tool.name}: {type(e).__name__}: {str(e)}")
+                outputs[tool_call_id] = {"success": False, "message": f"Error in {tool.name}: {str(e)}"}
+                outcome = "error"
+            self._record(tool.name, outcome, time.perf_counter() - start)
+
+        return [{"tool_call_id": tool_call.id, "output": json.dumps(outputs[tool_call.id])}
+                for tool_call in tool_calls]
+
+    def _record(self, name: str, outcome: str, seconds: float) -> None:
+        """Count one call and its latency under the tool name"""
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "ok": 0, "error": 0, "timeout": 0,
+                                                  "invalid": 0, "unknown": 0,
+                                                  "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["total_ms"] += seconds * 1000
+            stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tool call counters and latency (average/max in milliseconds)"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            values["avg_ms"] = round(values["total_ms"] / values["calls"], 1) if values["calls"] else 0.0
+            values["total_ms"] = round(values["total_ms"], 1)
+            values["max_ms"] = round(values["max_ms"], 1)
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop accepting tool calls (running calls are left to finish)"""
+        self._executor.shutdown(wait=False)
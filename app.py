@@ -3,18 +3,54 @@
 
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from azure.ai.projects import AIProjectClient
+from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
 from azure.identity import ClientSecretCredential
-from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
+from azure.core.exceptions import (
+    ClientAuthenticationError, HttpResponseError, ServiceRequestError, ServiceResponseError
+)
 import time
 import sys
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import os
 import base64
 import requests
 from io import StringIO, BytesIO
 import msal
-from streamlit_drawable_canvas import st_canvas
+from oauth_state_store import OAuthStateStore
+from ttl_cache import TTLCache
+from conversation_pool import ConversationThreadPool
+from run_waiter import RunWaiter, RunWaitTimeout
+from agent_tools import ToolRegistry, SUBMIT_EMPLOYEE_ONBOARDING_SCHEMA
+from async_runtime import AsyncRuntime
+from http_transport import HttpTransport
+from submission_outbox import SubmissionOutbox
+from bootstrap_planner import BootstrapPlan
+from circuit_breaker import DependencyGuard, CircuitBreaker, AIMDLimiter, DependencyUnavailable
+from agent_context import (
+    GREETING_KICKOFF_MESSAGE,
+    build_user_context,
+    build_run_instructions,
+    build_legacy_context_message,
+    agent_has_static_instructions,
+    with_static_instructions
+)
+from token_cache import (
+    new_partition_key,
+    load_user_token_cache,
+    save_user_token_cache,
+    delete_user_token_cache
+)
+from signature_pad import signature_pad, reject_signature
 from PIL import Image
+from signature_processing import process_signature, process_signature_strokes, render_signature, SignatureRejected
+from signature_strokes import STROKES_FORMAT, decode_strokes, strokes_to_svg
+from signature_value import SignatureValue
+from signature_store import SignatureStore, SignatureHandleError, resolve_requested_signature
 
 import json
 import jwt
@@ -23,45 +59,22 @@ import re
 from dotenv import load_dotenv
 load_dotenv()
 
-# FIXED LOGO FUNCTION
-def get_logo_base64():
-    """Load and encode logo for display"""
-    try:
-        logo_path = os.path.join("assets", "logo.png")
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                logo_data = f.read()
-            return base64.b64encode(logo_data).decode()
-        else:
-            st.warning("⚠️ Logo file not found at assets/logo.png")
-            return None
-    except Exception as e:
-        st.warning(f"⚠️ Could not load logo: {e}")
-        return None
+from logo_assets import prepare_logo_variants
 
-# Alternative approach using base64 encoded image
-def get_logo_for_favicon_base64():
-    """Get base64 encoded logo for favicon"""
-    try:
-        logo_path = os.path.join("assets", "logo.png")
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                logo_data = f.read()
-            return f"data:image/png;base64,{base64.b64encode(logo_data).decode()}"
-        else:
-            return None
-    except Exception as e:
-        return None
+@st.cache_resource(show_spinner=False)
+def get_logo_assets():
+    """Prepare resized logo variants once per process (served as static files)"""
+    return prepare_logo_variants()
 
 # --- CONFIGURATION ---
-# Get base64 logo for favicon
-logo_favicon = get_logo_for_favicon_base64()
+# Logo variants are generated once per process; reruns only send URLs/paths
+logo_assets = get_logo_assets()
 
 st.set_page_config(
     page_title="Employee On Boarding Assistant", 
     layout="centered", 
     initial_sidebar_state="collapsed",
-    page_icon=logo_favicon if logo_favicon else "🤖"
+    page_icon=logo_assets["favicon"]["path"] if logo_assets else "🤖"
 )
 
 # Microsoft authentication variables - Updated for proper multitenant support
@@ -102,6 +115,99 @@ SCOPE = [
     "Organization.Read.All"  # For tenant information
 ]
 
+# Shared keep-alive HTTP sessions for Graph, Logic App and login traffic
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+
+@st.cache_resource
+def get_http_transport():
+    """Process-wide pooled HTTP transport (see http_transport.py)"""
+    return HttpTransport(
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        retries=HTTP_RETRIES
+    )
+
+# Bound once per run so background threads can use it without a script context
+http_transport = get_http_transport()
+
+# Circuit breakers and adaptive concurrency limits for downstream dependencies
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+TENANT_LOOKUP_MAX_CONCURRENCY = int(os.getenv("TENANT_LOOKUP_MAX_CONCURRENCY", "16"))
+AGENTS_API_MAX_CONCURRENCY = int(os.getenv("AGENTS_API_MAX_CONCURRENCY", "64"))
+SUBMISSION_MAX_CONCURRENCY = int(os.getenv("SUBMISSION_MAX_CONCURRENCY", "8"))
+
+def is_agents_api_failure(error):
+    """
+    Whether an error says the Agents API itself is struggling: transport
+    errors, timeouts, HTTP 429 and 5xx. Per-request client errors (an active
+    run on the thread, validation errors) stay with the user who caused them.
+    """
+    if isinstance(error, HttpResponseError):
+        status = error.status_code
+        return status is not None and (status == 429 or status >= 500)
+    return isinstance(error, (ServiceRequestError, ServiceResponseError, requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout, ConnectionError, TimeoutError))
+
+@st.cache_resource
+def get_dependency_guards():
+    """Process-wide breaker + AIMD limit per dependency (see circuit_breaker.py)"""
+    def guard(name, max_concurrency, **options):
+        return DependencyGuard(
+            name,
+            breaker=CircuitBreaker(failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_SECONDS),
+            # Start at half the ceiling and let successes grow the limit
+            limiter=AIMDLimiter(initial=max(2, max_concurrency // 2), minimum=min(2, max_concurrency),
+                                maximum=max_concurrency),
+            **options
+        )
+    return {
+        "tenant-lookup": guard("tenant-lookup", TENANT_LOOKUP_MAX_CONCURRENCY),
+        "agents-api": guard("agents-api", AGENTS_API_MAX_CONCURRENCY, is_failure=is_agents_api_failure),
+        "submission": guard("submission", SUBMISSION_MAX_CONCURRENCY)
+    }
+
+dependency_guards = get_dependency_guards()
+
+def agents_api(func, *args, **kwargs):
+    """
+    Make one Agents API call in an agents-api slot. Slots cover the calls
+    only, never run waits or tool execution in between.
+    """
+    return dependency_guards["agents-api"].call(func, *args, **kwargs)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_ORGANIZATION_URL = f"{GRAPH_BASE_URL}/organization"
+GRAPH_BATCH_URL = f"{GRAPH_BASE_URL}/$batch"
+# Only the /me fields the email extraction and account type logic read
+GRAPH_PROFILE_SELECT = "id,displayName,mail,userPrincipalName,otherMails,proxyAddresses"
+
+# Network calls go through one shared asyncio loop (see async_runtime.py);
+# set to false to use the synchronous requests/SDK calls instead
+ASYNC_IO_ENABLED = os.getenv("ASYNC_IO_ENABLED", "true").lower() == "true"
+
+@st.cache_resource
+def get_async_runtime():
+    """Process-wide event loop thread that the script threads submit coroutines to"""
+    if not ASYNC_IO_ENABLED:
+        return None
+    return AsyncRuntime()
+
+def create_async_project_client():
+    """aio Azure AI Project client - only ever used on the async runtime's loop"""
+    return AsyncAIProjectClient(
+        credential=AsyncClientSecretCredential(
+            tenant_id=AZURE_AI_TENANT_ID,
+            client_id=CLIENT_ID,
+            client_secret=CLIENT_SECRET
+        ),
+        endpoint=AZURE_AI_ENDPOINT
+    )
+
 
 def get_user_tenant_id(access_token):
     """Extract tenant ID from Microsoft Graph or JWT token"""
@@ -114,7 +220,7 @@ def get_user_tenant_id(access_token):
             
         # Option 2: From Microsoft Graph organization endpoint as fallback
         headers = {"Authorization": f"Bearer {access_token}"}
-        org_response = requests.get("https://graph.microsoft.com/v1.0/organization", headers=headers, timeout=10)
+        org_response = http_transport.get(GRAPH_ORGANIZATION_URL, headers=headers)
         if org_response.status_code == 200:
             org_data = org_response.json()
             if org_data.get("value") and len(org_data["value"]) > 0:
@@ -126,54 +232,116 @@ def get_user_tenant_id(access_token):
         st.warning(f"Could not retrieve tenant ID: {e}")
         return "unknown"
 
-def get_msal_app():
+@st.cache_resource
+def get_msal_shared_state():
+    """
+    Per-process MSAL state shared by every session: a pooled HTTP session and
+    the HTTP cache holding authority/OpenID discovery, so building an app for
+    a user's token cache costs no network round trips.
+    """
+    return {
+        "http_client": http_transport.session(AUTHORITY),
+        "http_cache": {}
+    }
+
+def get_msal_app(token_cache=None):
     """Create MSAL application for user authentication"""
     try:
+        shared = get_msal_shared_state()
         return msal.ConfidentialClientApplication(
             CLIENT_ID, 
             authority=AUTHORITY,  # Uses USER_TENANT_ID for user auth
-            client_credential=CLIENT_SECRET
+            client_credential=CLIENT_SECRET,
+            token_cache=token_cache,  # Per-user cache, persisted by token_cache.py
+            http_client=shared["http_client"],
+            http_cache=shared["http_cache"]
         )
     except Exception as e:
         st.error(f"❌ MSAL initialization failed: {e}")
         st.stop()
 
-import json
-import tempfile
+# Browser cookie holding the user's token cache partition key
+AUTH_COOKIE_NAME = "onboard_session"
+AUTH_COOKIE_MAX_AGE = 30 * 24 * 3600  # 30 days
 
-# File-based cache to preserve settings through OAuth (survives redirect)
-OAUTH_CACHE_FILE = os.path.join(tempfile.gettempdir(), "streamlit_oauth_cache.json")
+def get_auth_cookie():
+    """Read the token cache partition key from the browser cookie"""
+    context = getattr(st, "context", None)  # st.context requires Streamlit >= 1.37
+    if context is None:
+        return None
+    return context.cookies.get(AUTH_COOKIE_NAME)
+
+def set_auth_cookie(partition_key):
+    """Write the token cache partition key to a browser cookie"""
+    secure = "; Secure" if REDIRECT_URI.startswith("https") else ""
+    components.html(f"""
+    <script>
+        window.parent.document.cookie = "{AUTH_COOKIE_NAME}={partition_key}; Max-Age={AUTH_COOKIE_MAX_AGE}; Path=/; SameSite=Lax{secure}";
+    </script>
+    """, height=0)
+
+def complete_login(access_token, partition_key, token_seconds=None):
+    """Populate session state after a token was obtained (interactive or silent)"""
+    with st.spinner("Preparing your assistant..."):
+        run_session_bootstrap(access_token, token_seconds)
+    # Only now - a bootstrap that raises must not leave a half-signed-in session
+    st.session_state.access_token = access_token
+    st.session_state.token_cache_key = partition_key
+    st.session_state.logged_in = True
+
+def try_silent_login():
+    """
+    Sign a returning user in from their persisted token cache.
+    Uses acquire_token_silent (refresh token if needed) - no redirect.
+    """
+    partition_key = get_auth_cookie()
+    if not partition_key:
+        return False
+
+    try:
+        token_cache = load_user_token_cache(partition_key)
+        msal_app = get_msal_app(token_cache)
+        accounts = msal_app.get_accounts()
+        if not accounts:
+            return False
+
+        result = msal_app.acquire_token_silent(SCOPE, account=accounts[0])
+        save_user_token_cache(partition_key, token_cache)
+
+        if result and "access_token" in result:
+            complete_login(result["access_token"], partition_key)
+            print(f"🔍 DEBUG: Silent login succeeded for returning user")
+            return True
+        return False
+
+    except Exception as e:
+        print(f"❌ DEBUG: Silent login failed: {e}")
+        return False
+
+@st.cache_resource
+def get_oauth_state_store():
+    """
+    Process-wide OAuth state store (SQLite/WAL in the temp dir, survives the
+    redirect). Expired states are purged in the background.
+    """
+    store = OAuthStateStore()
+    store.start_background_purge()
+    return store
 
 def save_oauth_session(session_id, data):
-    """Save OAuth session data to file"""
+    """Save OAuth session data keyed by the OAuth state parameter"""
     try:
-        # Load existing cache
-        if os.path.exists(OAUTH_CACHE_FILE):
-            with open(OAUTH_CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-        else:
-            cache = {}
-        
-        # Add new session
-        cache[session_id] = data
-        
-        # Save back
-        with open(OAUTH_CACHE_FILE, 'w') as f:
-            json.dump(cache, f)
+        get_oauth_state_store().put(session_id, data)
         print(f"🔍 DEBUG: Saved session {session_id} to cache")
     except Exception as e:
         print(f"❌ DEBUG: Failed to save session: {e}")
 
 def load_oauth_session(session_id):
-    """Load OAuth session data from file"""
+    """Load and consume OAuth session data (one-shot - a state cannot be replayed)"""
     try:
-        if os.path.exists(OAUTH_CACHE_FILE):
-            with open(OAUTH_CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-            data = cache.get(session_id)
-            print(f"🔍 DEBUG: Loaded session {session_id} from cache: {data}")
-            return data
-        return None
+        data = get_oauth_state_store().consume(session_id)
+        print(f"🔍 DEBUG: Loaded session {session_id} from cache: {data}")
+        return data
     except Exception as e:
         print(f"❌ DEBUG: Failed to load session: {e}")
         return None
@@ -249,19 +417,24 @@ def handle_microsoft_callback():
     if "code" in query_params:
         try:
             code = query_params["code"]
-            msal_app = get_msal_app()
+            # Reuse the cookie's partition if present, otherwise start a new one
+            partition_key = get_auth_cookie() or new_partition_key()
+            token_cache = load_user_token_cache(partition_key)
+            msal_app = get_msal_app(token_cache)
             
             with st.spinner("Completing authentication..."):
+                exchange_started = time.perf_counter()
                 result = msal_app.acquire_token_by_authorization_code(
                     code,
                     scopes=SCOPE,
                     redirect_uri=REDIRECT_URI
                 )
+                token_seconds = time.perf_counter() - exchange_started
                 
             if "access_token" in result:
-                st.session_state.logged_in = True
-                st.session_state.access_token = result["access_token"]
-                st.session_state.user_info = get_user_info(result["access_token"])
+                save_user_token_cache(partition_key, token_cache)
+                complete_login(result["access_token"], partition_key, token_seconds)
+                st.session_state.auth_cookie_pending = True
                 
                 # Retrieve requireSignature from cached session using state parameter
                 state_param = query_params.get("state")
@@ -288,66 +461,172 @@ def handle_microsoft_callback():
         except Exception as e:
             st.error(f"❌ Authentication callback failed: {e}")
 
+async def graph_request_async(runtime, method, url, headers, payload=None):
+    """Graph call on the async runtime"""
+    return await runtime.request(method, url, headers=headers, payload=payload, timeout=10)
+
+def graph_request(method, url, access_token, runtime=None, payload=None, headers=None):
+    """
+    One Graph call via the async runtime (or requests when it is disabled).
+    Returns (status, response headers with lower-case names, JSON body or None).
+    """
+    headers = {"Authorization": f"Bearer {access_token}", **(headers or {})}
+    if runtime:
+        return runtime.run(graph_request_async(runtime, method, url, headers, payload), timeout=15)
+    
+    response = http_transport.request(method, url, headers=headers, json=payload)
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    return response.status_code, {name.lower(): value for name, value in response.headers.items()}, body
+
+def fetch_graph_profile(access_token, runtime=None, etag=None, include_organization=False):
+    """
+    Fetch the /me fields the profile normalization reads, in one round trip.
+    With include_organization, /me and /organization go out as a single $batch.
+    A known ETag is sent as If-None-Match (status 304 = cached copy still valid).
+    No Streamlit calls - may run in the background.
+    
+    Returns:
+        (status, /me document or None, ETag or None, organization tenant ID or None)
+    """
+    me_url = f"/me?$select={GRAPH_PROFILE_SELECT}"
+    me_headers = {"If-None-Match": etag} if etag else {}
+    
+    if not include_organization:
+        status, headers, user_data = graph_request("GET", GRAPH_BASE_URL + me_url, access_token, runtime, headers=me_headers)
+        return status, user_data, headers.get("etag"), None
+    
+    batch = {"requests": [
+        {"id": "me", "method": "GET", "url": me_url, "headers": me_headers},
+        {"id": "org", "method": "GET", "url": "/organization?$select=id"}
+    ]}
+    status, _, body = graph_request("POST", GRAPH_BATCH_URL, access_token, runtime, payload=batch,
+                                    headers={"Content-Type": "application/json"})
+    if status != 200 or not body:
+        return status, None, None, "unknown"
+    
+    responses = {item.get("id"): item for item in body.get("responses", [])}
+    me = responses.get("me", {})
+    org = responses.get("org", {})
+    
+    tenant_id = "unknown"
+    org_data = org.get("body") or {}
+    if org.get("status") == 200 and org_data.get("value"):
+        tenant_id = org_data["value"][0].get("id", "unknown")
+    me_headers = {name.lower(): value for name, value in (me.get("headers") or {}).items()}
+    return me.get("status", 500), me.get("body"), me_headers.get("etag"), tenant_id
+
+def normalize_user_profile(user_data, tenant_id):
+    """Pick the best email from a /me document and add tenant/account details"""
+    # Enhanced email extraction
+    email_sources = {
+        'mail': user_data.get('mail'),
+        'userPrincipalName': user_data.get('userPrincipalName'),
+        'email': user_data.get('email'),
+        'otherMails': user_data.get('otherMails', []),
+        'proxyAddresses': user_data.get('proxyAddresses', [])
+    }
+    
+    # Try multiple email extraction methods
+    email = None
+    email_method = "unknown"
+    
+    # Method 1: Direct mail field
+    if user_data.get('mail') and user_data.get('mail').strip():
+        email = user_data.get('mail').strip()
+        email_method = "mail"
+    
+    # Method 2: userPrincipalName (most reliable)
+    elif user_data.get('userPrincipalName') and '@' in user_data.get('userPrincipalName', ''):
+        email = user_data.get('userPrincipalName').strip()
+        email_method = "userPrincipalName"
+    
+    # Method 3: otherMails array
+    elif user_data.get('otherMails') and len(user_data.get('otherMails', [])) > 0:
+        email = user_data.get('otherMails')[0].strip()
+        email_method = "otherMails[0]"
+    
+    # Method 4: Extract from proxyAddresses
+    elif user_data.get('proxyAddresses'):
+        for addr in user_data.get('proxyAddresses', []):
+            if addr.startswith('SMTP:') or addr.startswith('smtp:'):
+                email = addr.replace('SMTP:', '').replace('smtp:', '').strip()
+                email_method = "proxyAddresses"
+                break
+    
+    # Method 5: Fallback to constructed email
+    if not email or email == "":
+        user_id = user_data.get('id', 'unknown')[:8] 
+        email = f"user-{user_id}@unknown.com"
+        email_method = "fallback_constructed"
+    
+    # Normalize user data
+    user_data['mail'] = email
+    user_data['tenant_id'] = tenant_id
+    user_data['email_extraction_method'] = email_method
+    user_data['account_type'] = determine_account_type(user_data)
+    
+    return user_data
+
+# Normalized Graph profiles per (tenant ID, object ID) from the token - a
+# returning user is served from memory, stale entries revalidate in the background
+GRAPH_PROFILE_TTL_SECONDS = int(os.getenv("GRAPH_PROFILE_TTL_SECONDS", "1800"))
+GRAPH_PROFILE_STALE_SECONDS = int(os.getenv("GRAPH_PROFILE_STALE_SECONDS", "86400"))
+GRAPH_PROFILE_MAX_ENTRIES = int(os.getenv("GRAPH_PROFILE_MAX_ENTRIES", "10000"))
+
+@st.cache_resource
+def get_profile_cache():
+    """Process-wide (tid, oid) -> {"profile", "etag"} cache shared by all sessions"""
+    return TTLCache(
+        ttl_seconds=GRAPH_PROFILE_TTL_SECONDS,
+        stale_seconds=GRAPH_PROFILE_STALE_SECONDS,
+        is_negative=lambda entry: entry["profile"] is None,
+        max_entries=GRAPH_PROFILE_MAX_ENTRIES,
+        name="graph-profile"
+    )
+
+def load_graph_profile(access_token, tenant_id, runtime, cached):
+    """Profile cache loader: revalidates a cached entry by ETag, else fetches it (no st.*)"""
+    status, user_data, etag, _ = fetch_graph_profile(
+        access_token, runtime, etag=cached.get("etag") if cached else None
+    )
+    if status == 304 and cached:
+        return cached
+    if status != 200:
+        # Not cached (negative TTL is 0) - the next login tries again
+        return {"profile": None, "etag": None}
+    return {"profile": normalize_user_profile(user_data, tenant_id), "etag": etag}
+
 def get_user_info(access_token):
-    """Get user information from Microsoft Graph API"""
+    """Get user information from Microsoft Graph API (cached per tenant + user)"""
     try:
-        headers = {"Authorization": f"Bearer {access_token}"}
-        response = requests.get("https://graph.microsoft.com/v1.0/me", headers=headers, timeout=10)
+        runtime = get_async_runtime()
+        try:
+            claims = jwt.decode(access_token, options={"verify_signature": False})
+        except Exception:
+            claims = {}
+        tenant_id = claims.get("tid")
+        object_id = claims.get("oid")
+        
+        if tenant_id and object_id:
+            profile_cache = get_profile_cache()
+            key = (tenant_id, object_id)
+            entry = profile_cache.get_or_load(
+                key, lambda: load_graph_profile(access_token, tenant_id, runtime, profile_cache.peek(key))
+            )
+            # Copy - sessions must not share one mutable dict
+            user_data = dict(entry["profile"]) if entry["profile"] else None
+        else:
+            # Token without tid/oid: no cache key, and the tenant comes from
+            # /organization in the same $batch
+            status, user_data, _, org_tenant_id = fetch_graph_profile(
+                access_token, runtime, include_organization=not tenant_id
+            )
+            user_data = normalize_user_profile(user_data, tenant_id or org_tenant_id) if status == 200 else None
         
-        if response.status_code == 200:
-            user_data = response.json()
-            
-            # Enhanced email extraction
-            email_sources = {
-                'mail': user_data.get('mail'),
-                'userPrincipalName': user_data.get('userPrincipalName'),
-                'email': user_data.get('email'),
-                'otherMails': user_data.get('otherMails', []),
-                'proxyAddresses': user_data.get('proxyAddresses', [])
-            }
-            
-            # Try multiple email extraction methods
-            email = None
-            email_method = "unknown"
-            
-            # Method 1: Direct mail field
-            if user_data.get('mail') and user_data.get('mail').strip():
-                email = user_data.get('mail').strip()
-                email_method = "mail"
-            
-            # Method 2: userPrincipalName (most reliable)
-            elif user_data.get('userPrincipalName') and '@' in user_data.get('userPrincipalName', ''):
-                email = user_data.get('userPrincipalName').strip()
-                email_method = "userPrincipalName"
-            
-            # Method 3: otherMails array
-            elif user_data.get('otherMails') and len(user_data.get('otherMails', [])) > 0:
-                email = user_data.get('otherMails')[0].strip()
-                email_method = "otherMails[0]"
-            
-            # Method 4: Extract from proxyAddresses
-            elif user_data.get('proxyAddresses'):
-                for addr in user_data.get('proxyAddresses', []):
-                    if addr.startswith('SMTP:') or addr.startswith('smtp:'):
-                        email = addr.replace('SMTP:', '').replace('smtp:', '').strip()
-                        email_method = "proxyAddresses"
-                        break
-            
-            # Method 5: Fallback to constructed email
-            if not email or email == "":
-                user_id = user_data.get('id', 'unknown')[:8] 
-                email = f"user-{user_id}@unknown.com"
-                email_method = "fallback_constructed"
-            
-            # Add tenant ID
-            tenant_id = get_user_tenant_id(access_token)
-            
-            # Normalize user data
-            user_data['mail'] = email
-            user_data['tenant_id'] = tenant_id
-            user_data['email_extraction_method'] = email_method
-            user_data['account_type'] = determine_account_type(user_data)
-            
+        if user_data:
             return user_data
         else:
             return {
@@ -412,8 +691,7 @@ def get_user_tenant_id_debug(access_token, user_data=None):
         # Method 3: From Microsoft Graph organization endpoint
         try:
             headers = {"Authorization": f"Bearer {access_token}"}
-            org_response = requests.get("https://graph.microsoft.com/v1.0/organization", 
-                                      headers=headers, timeout=10)
+            org_response = http_transport.get(GRAPH_ORGANIZATION_URL, headers=headers)
             
             st.write(f"**Organization API Response**: Status {org_response.status_code}")
             
@@ -472,6 +750,27 @@ def determine_account_type(user_data):
         return "unknown"
 
 # SIGNATURE COLLECTION FUNCTIONS
+# Signatures are cropped to the ink and stored compactly (see signature_processing.py)
+SIGNATURE_TARGET_HEIGHT = int(os.getenv("SIGNATURE_TARGET_HEIGHT", "120"))
+SIGNATURE_ENCODING = os.getenv("SIGNATURE_ENCODING", "1bit").lower()  # 1bit | palette
+SIGNATURE_FORMAT = os.getenv("SIGNATURE_FORMAT", "PNG").upper()  # PNG | WEBP
+SIGNATURE_MIN_QUALITY = float(os.getenv("SIGNATURE_MIN_QUALITY", "0.5"))
+# "strokes" keeps the pen paths (a few KB) and rasterizes only when an image is needed
+SIGNATURE_CAPTURE_MODE = os.getenv("SIGNATURE_CAPTURE_MODE", "raster").lower()  # raster | strokes
+# What the Logic App receives for stroke signatures: a rendered image or the SVG itself
+SIGNATURE_SUBMIT_FORMAT = os.getenv("SIGNATURE_SUBMIT_FORMAT", "PNG").upper()  # PNG | WEBP | SVG
+SIGNATURE_STROKE_WIDTH = 3
+SIGNATURE_STORE_TTL_SECONDS = int(os.getenv("SIGNATURE_STORE_TTL_SECONDS", "86400"))
+
+@st.cache_resource
+def get_signature_store():
+    """Process-wide signature blob store - the agent only sees its handles"""
+    return SignatureStore(ttl_seconds=SIGNATURE_STORE_TTL_SECONDS)
+
+def signature_owner(user_info):
+    """Who may resolve a signature handle: the signed-in user's tenant and email"""
+    return (user_info.get('tenant_id', 'unknown'), user_info.get('mail', 'no-email@unknown.com'))
+
 def collect_signature():
     """Display signature collection interface - streamlined"""
     # Simple, clean header
@@ -482,96 +781,80 @@ def collect_signature():
     </div>
     """, unsafe_allow_html=True)
     
-    # Clean canvas container
-    st.markdown("""
-    <div style="
-        border: 2px solid #ced4da;
-        border-radius: 8px;
-        padding: 20px;
-        background: white;
-        margin: 15px 0;
-        text-align: center;
-    ">
-    """, unsafe_allow_html=True)
-    
-    # Initialize canvas reset counter if not exists
-    if 'canvas_reset_counter' not in st.session_state:
-        st.session_state.canvas_reset_counter = 0
-    
-    # Signature canvas with improved settings and dynamic key for reset functionality
-    canvas_result = st_canvas(
-        fill_color="rgba(255, 255, 255, 0)",  # Transparent fill
-        stroke_width=3,
-        stroke_color="#000000",
-        background_color="#FFFFFF",
-        height=300,
+    # Drawing, Clear and Accept all happen in the browser; the pad sends one
+    # value (a PNG or the stroke points) only when Accept is pressed
+    pad_result = signature_pad(
+        key="signature_pad",
         width=800,
-        drawing_mode="freedraw",
-        key=f"signature_canvas_{st.session_state.canvas_reset_counter}"  # Dynamic key for reset
+        height=300,
+        stroke_width=SIGNATURE_STROKE_WIDTH,
+        mode="strokes" if SIGNATURE_CAPTURE_MODE == "strokes" else "raster"
     )
+    if pad_result is None:
+        return
     
-    st.markdown("</div>", unsafe_allow_html=True)
-    
-    # Simplified action buttons - streamlined UX with just Clear and Accept
-    st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
-    
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col1:
-        if st.button("🔄 Clear", key="clear_signature", help="Clear and redraw your signature", use_container_width=True, type="secondary"):
-            # Force canvas to reset by incrementing a counter
-            if 'canvas_reset_counter' not in st.session_state:
-                st.session_state.canvas_reset_counter = 0
-            st.session_state.canvas_reset_counter += 1
-            st.rerun()
-    
-    with col3:
-        if st.button("✅ Accept", key="accept_signature", help="Accept this signature and continue", use_container_width=True, type="primary"):
-            if canvas_result.image_data is not None:
-                # Check if signature is not empty (not all white)
-                if canvas_result.image_data.sum() < canvas_result.image_data.size * 255:
-                    # Convert canvas to image
-                    img = Image.fromarray(canvas_result.image_data.astype('uint8'), 'RGBA')
-                    
-                    # Convert to base64
-                    buffered = BytesIO()
-                    img.save(buffered, format="PNG")
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    
-                    # Store signature data
-                    st.session_state.signature_data = {
-                        'base64_data': img_str,
-                        'timestamp': time.time(),
-                        'format': 'PNG'
-                    }
-                    
-                    # Close the modal
-                    st.session_state.show_signature_modal = False
-                    
-                    # Add user message immediately
-                    st.session_state.messages.append({
-                        "role": "user", 
-                        "content": "✅ I have provided my digital signature."
-                    })
-                    
-                    # Mark that signature is pending to send
-                    st.session_state.signature_pending_send = True
-                    
-                    # Rerun to trigger the signature send handler
-                    st.rerun()
-                else:
-                    st.error("⚠️ Please draw your signature in the canvas above")
-            else:
-                st.error("⚠️ Please draw your signature in the canvas above")
+    try:
+        if SIGNATURE_CAPTURE_MODE == "strokes":
+            # Simplified pen paths - rejects empty or tiny drawings
+            signature = process_signature_strokes(
+                pad_result.get("paths", []),
+                stroke_width=SIGNATURE_STROKE_WIDTH,
+                min_quality=SIGNATURE_MIN_QUALITY
+            )
+        else:
+            # Crop to the ink, scale down and quantize - rejects empty or tiny drawings
+            signature = process_signature(
+                pad_result.get("image_data"),
+                target_height=SIGNATURE_TARGET_HEIGHT,
+                encoding=SIGNATURE_ENCODING,
+                image_format=SIGNATURE_FORMAT,
+                min_quality=SIGNATURE_MIN_QUALITY
+            )
+    except SignatureRejected as e:
+        # Shown inside the pad, which unlocks Accept for another try
+        reject_signature("signature_pad", f"⚠️ {e}. Please clear the pad and sign again")
+    else:
+        print(f"🔍 DEBUG: Signature encoded as {signature['width']}x{signature['height']} "
+              f"{signature['format']} ({len(signature['data'])} bytes, quality {signature['quality']['score']})")
+        
+        # Keep the image server-side; the agent gets only the handle
+        timestamp = time.time()
+        handle = get_signature_store().put(
+            signature['data'], signature['format'],
+            owner=signature_owner(st.session_state.user_info),
+            metadata={'timestamp': timestamp}
+        )
+        
+        # Store signature data - the bytes once, shared with the store; base64,
+        # previews and rendered images are derived on first use and cached
+        st.session_state.signature_data = SignatureValue(
+            signature['data'], signature['format'], timestamp,
+            handle=handle, width=signature['width'], height=signature['height']
+        )
+        
+        # Close the modal
+        st.session_state.show_signature_modal = False
+        
+        # Add user message immediately
+        st.session_state.messages.append({
+            "role": "user", 
+            "content": "✅ I have provided my digital signature."
+        })
+        
+        # Mark that signature is pending to send
+        st.session_state.signature_pending_send = True
+        
+        # Rerun to trigger the signature send handler
+        st.rerun()
 
 def get_signature_tool_data():
-    """Get signature data for Azure AI agent tool"""
+    """Get signature data for Azure AI agent tool (the handle, never the image)"""
     if st.session_state.signature_data:
         return {
             "signature_available": True,
-            "signature_base64": st.session_state.signature_data['base64_data'],
-            "timestamp": st.session_state.signature_data['timestamp'],
-            "format": st.session_state.signature_data['format']
+            "signature_handle": st.session_state.signature_data.handle,
+            "timestamp": st.session_state.signature_data.timestamp,
+            "format": st.session_state.signature_data.format
         }
     else:
         return {
@@ -579,18 +862,43 @@ def get_signature_tool_data():
             "message": "No signature collected yet"
         }
 
+def signature_submission_image(data, data_format):
+    """
+    Bytes and format sent downstream for a stored signature (no Streamlit calls).
+    Raster signatures pass through; strokes are rendered now, at submission time.
+    """
+    if data_format == STROKES_FORMAT and SIGNATURE_SUBMIT_FORMAT == "SVG":
+        return strokes_to_svg(decode_strokes(data), height=SIGNATURE_TARGET_HEIGHT).encode(), "SVG"
+    return render_signature(
+        data, data_format,
+        target_height=SIGNATURE_TARGET_HEIGHT,
+        encoding=SIGNATURE_ENCODING,
+        image_format=SIGNATURE_SUBMIT_FORMAT if SIGNATURE_SUBMIT_FORMAT != "SVG" else "PNG"
+    )
+
+def session_signature_payload(signature):
+    """(base64 text, format) sent downstream for a SignatureValue - computed once, then cached"""
+    if not signature.is_strokes:
+        return signature.base64, signature.format
+    
+    def render():
+        image, image_format = signature_submission_image(signature.data, STROKES_FORMAT)
+        return base64.b64encode(image).decode(), image_format
+    return signature.cached(("submission", SIGNATURE_SUBMIT_FORMAT, SIGNATURE_TARGET_HEIGHT), render)
+
 def get_signature_for_storage():
     """Get signature data formatted for storage in Logic Apps/database"""
     if st.session_state.signature_data:
         user_email = st.session_state.user_info.get('mail', 'no-email@unknown.com')
         tenant_id = st.session_state.user_info.get('tenant_id', 'unknown')
+        signature_base64, image_format = session_signature_payload(st.session_state.signature_data)
         
         return {
             "tenantId": tenant_id,
             "userEmail": user_email,
-            "signatureBase64": st.session_state.signature_data['base64_data'],
-            "signatureTimestamp": st.session_state.signature_data['timestamp'],
-            "signatureFormat": st.session_state.signature_data['format'],
+            "signatureBase64": signature_base64,
+            "signatureTimestamp": st.session_state.signature_data.timestamp,
+            "signatureFormat": image_format,
             "signatureCollected": True
         }
     else:
@@ -646,37 +954,36 @@ def debug_signature_state():
         st.write("**Session State:**")
         st.write(f"- show_signature_modal: {st.session_state.get('show_signature_modal', False)}")
         st.write(f"- signature_data: {st.session_state.get('signature_data', None)}")
-        st.write(f"- canvas_reset_counter: {st.session_state.get('canvas_reset_counter', 0)}")
-        st.write(f"- current canvas key: signature_canvas_{st.session_state.get('canvas_reset_counter', 0)}")
+        if st.session_state.get('signature_data'):
+            st.write(f"- signature sha256: {st.session_state.signature_data.sha256}")
+        st.write(f"- signature capture mode: {SIGNATURE_CAPTURE_MODE}")
+        st.write(f"- last accepted pad value: {st.session_state.get('signature_pad_accepted_id', None)}")
         
         st.markdown("---")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🔄 Force Rerun", key="debug_rerun"):
-                st.rerun()
-        with col2:
-            if st.button("🗑️ Reset Canvas Counter", key="debug_reset_counter"):
-                st.session_state.canvas_reset_counter = 0
-                st.rerun()
+        if st.button("🔄 Force Rerun", key="debug_rerun"):
+            st.rerun()
 
 def display_collected_signature():
     """Display the collected signature in chat"""
     if st.session_state.signature_data:
-        signature_data = st.session_state.signature_data['base64_data']
+        signature = st.session_state.signature_data
         st.markdown("**📝 Collected Signature:**")
-        st.image(base64.b64decode(signature_data), width=300)
+        if signature.is_strokes:
+            # Vector signatures render as SVG - crisp at any size
+            st.image(signature.cached("svg", lambda: strokes_to_svg(signature.strokes)), width=300)
+        else:
+            # The stored bytes are already a compact image - no decoding needed
+            st.image(signature.data, width=300)
         return True
     return False
         
 def login():
     """Login page"""
-    logo_base64 = get_logo_base64()
-    
-    if logo_base64:
+    if logo_assets:
         st.markdown(f"""
         <div style="text-align: center; margin-top: 50px;">
             <div class="login-title">
-                <img src="data:image/png;base64,{logo_base64}" class="main-logo" alt="Company Logo">
+                <img src="{logo_assets['login']['url']}" class="main-logo" alt="Company Logo">
                 <h1 style="color: #0078d4; margin-bottom: 10px;">Employee On Boarding Assistant</h1>
             </div>
             <p style="font-size: 18px; color: #666; margin-bottom: 40px;">Welcome! Please sign in to get started.</p>
@@ -690,6 +997,10 @@ def login():
         </div>
         """, unsafe_allow_html=True)
 
+    # Returning users: sign in silently from the persisted token cache
+    if "code" not in st.query_params and try_silent_login():
+        st.rerun()
+
     handle_microsoft_callback()
 
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -731,16 +1042,21 @@ else:
     # Already set (likely by OAuth callback)
     print(f"🔍 DEBUG: Using session value: {st.session_state.require_signature}")
 
+@st.cache_resource
+def get_ai_credential():
+    """Service principal credential for the AI resources tenant (caches its tokens)"""
+    # Use specific tenant for Azure AI Project access
+    return ClientSecretCredential(
+        tenant_id=AZURE_AI_TENANT_ID,  # Use specific tenant for AI resources
+        client_id=CLIENT_ID,
+        client_secret=CLIENT_SECRET
+    )
+
 @st.cache_resource
 def get_azure_client():
     """Initialize Azure AI Project Client with specific tenant for AI resources"""
     try:
-        # Use specific tenant for Azure AI Project access
-        credential = ClientSecretCredential(
-            tenant_id=AZURE_AI_TENANT_ID,  # Use specific tenant for AI resources
-            client_id=CLIENT_ID,
-            client_secret=CLIENT_SECRET
-        )
+        credential = get_ai_credential()
         
         project = AIProjectClient(
             credential=credential,
@@ -754,39 +1070,193 @@ def get_azure_client():
         st.error(f"Failed to initialize Azure client: {e}")
         return None
 
-def get_agent_id_for_tenant(tenant_id, user_email):
-    """Get agent ID from Logic App based on tenant ID"""
-    # Replace with your actual Logic App URL
-    logic_app_url = "https://prod-21.northcentralus.logic.azure.com:443/workflows/dab274a5edbd41cf8a06a3e1d38b55e9/triggers/When_a_HTTP_request_is_received/paths/invoke?api-version=2016-10-01&sp=%2Ftriggers%2FWhen_a_HTTP_request_is_received%2Frun&sv=1.0&sig=b1f63hQh-pRIKTJm0lAuyA7D4ypZ8NmrhwwUI2GZGac"
-    
+# Tenant -> agent routing Logic App
+TENANT_LOOKUP_URL = "https://prod-21.northcentralus.logic.azure.com:443/workflows/dab274a5edbd41cf8a06a3e1d38b55e9/triggers/When_a_HTTP_request_is_received/paths/invoke?api-version=2016-10-01&sp=%2Ftriggers%2FWhen_a_HTTP_request_is_received%2Frun&sv=1.0&sig=b1f63hQh-pRIKTJm0lAuyA7D4ypZ8NmrhwwUI2GZGac"
+
+# Routing cache settings - the tenant -> agent mapping almost never changes
+TENANT_ROUTE_TTL_SECONDS = int(os.getenv("TENANT_ROUTE_TTL_SECONDS", "3600"))
+TENANT_ROUTE_STALE_SECONDS = int(os.getenv("TENANT_ROUTE_STALE_SECONDS", "86400"))
+TENANT_ROUTE_NEGATIVE_TTL_SECONDS = int(os.getenv("TENANT_ROUTE_NEGATIVE_TTL_SECONDS", "60"))
+
+@st.cache_resource
+def get_tenant_route_cache():
+    """Process-wide tenant -> (agentId, agentType, orgName) cache shared by all sessions"""
+    return TTLCache(
+        ttl_seconds=TENANT_ROUTE_TTL_SECONDS,
+        stale_seconds=TENANT_ROUTE_STALE_SECONDS,
+        negative_ttl_seconds=TENANT_ROUTE_NEGATIVE_TTL_SECONDS,
+        is_negative=lambda route: not route.get("success"),
+        name="tenant-route"
+    )
+
+async def fetch_tenant_route_async(runtime, payload):
+    """Tenant lookup Logic App call on the async runtime"""
+    status, data = await runtime.post_json(TENANT_LOOKUP_URL, payload, timeout=10)
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}")
+    return data
+
+def fetch_tenant_route(tenant_id, user_email, runtime=None):
+    """
+    Call the tenant lookup Logic App (no Streamlit calls - may run in the background).
+    Returns the Logic App's JSON; raises on transport/HTTP errors so they are not cached.
+    """
     payload = {
         "tenantId": tenant_id,
         "userEmail": user_email
     }
     
+    # Fails fast with DependencyUnavailable while the Logic App is tripped or saturated
+    with dependency_guards["tenant-lookup"].slot():
+        if runtime:
+            return runtime.run(fetch_tenant_route_async(runtime, payload), timeout=15)
+        
+        response = http_transport.post(TENANT_LOOKUP_URL, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response.json()
+
+def load_tenant_route(route_cache, tenant_id, loader):
+    """
+    Cached tenant route; while the lookup Logic App is unavailable the last
+    known successful route is served even past its stale window.
+    """
     try:
-        with st.spinner(f"Looking up agent for tenant..."):
-            response = requests.post(logic_app_url, json=payload, timeout=10)
+        return route_cache.get_or_load(tenant_id, loader)
+    except DependencyUnavailable as e:
+        last_known = route_cache.peek(tenant_id)
+        if last_known and last_known.get('success'):
+            print(f"⚠️ DEBUG: {e} - using last known route for tenant {tenant_id}")
+            return last_known
+        raise
+
+def get_agent_id_for_tenant(tenant_id, user_email):
+    """Get agent ID from Logic App based on tenant ID (cached per tenant)"""
+    route_cache = get_tenant_route_cache()
+    # Resolved here - the loader may run on a background refresh thread
+    runtime = get_async_runtime()
+    load_route = lambda: fetch_tenant_route(tenant_id, user_email, runtime)
+    
+    try:
+        if route_cache.peek(tenant_id) is not None:
+            # Known tenant - served from cache (refreshed in the background when stale)
+            data = load_tenant_route(route_cache, tenant_id, load_route)
+        else:
+            with st.spinner(f"Looking up agent for tenant..."):
+                data = load_tenant_route(route_cache, tenant_id, load_route)
             
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                return data.get('agentId'), data.get('agentType', 'Standard'), data.get('orgName', 'Unknown')
-            else:
-                st.error(f"Tenant lookup failed: {data.get('error', 'Unknown error')}")
-                return None, None, None
+        if data.get('success'):
+            return data.get('agentId'), data.get('agentType', 'Standard'), data.get('orgName', 'Unknown')
         else:
-            st.error(f"Failed to get agent ID: HTTP {response.status_code}")
+            st.error(f"Tenant lookup failed: {data.get('error', 'Unknown error')}")
             return None, None, None
             
+    except DependencyUnavailable as e:
+        st.warning(f"Organization lookup is temporarily unavailable ({e}). Please refresh in a moment.")
+        return None, None, None
     except Exception as e:
         st.error(f"Error getting agent ID: {e}")
         return None, None, None
 
-def submit_employee_onboarding(employee_data):
+# Onboarding submissions are accepted into a durable outbox and delivered to
+# the Logic App in the background (see submission_outbox.py)
+ONBOARDING_OUTBOX_ENABLED = os.getenv("ONBOARDING_OUTBOX_ENABLED", "true").lower() == "true"
+ONBOARDING_OUTBOX_WORKERS = int(os.getenv("ONBOARDING_OUTBOX_WORKERS", "2"))
+
+def deliver_onboarding_submission(url, payload, idempotency_key):
+    """
+    One delivery attempt to the submission Logic App (no Streamlit calls).
+    Returns (delivered, retryable, detail) for the outbox.
+    """
+    guard = dependency_guards["submission"]
+    try:
+        guard.acquire()
+    except DependencyUnavailable as e:
+        # Not attempted - the outbox backs off and tries again later
+        return False, True, str(e)
+    
+    try:
+        response = http_transport.post(url, json=payload, headers={"Idempotency-Key": idempotency_key}, timeout=30)
+    except (requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema, requests.exceptions.InvalidURL) as e:
+        guard.release(True)
+        return False, False, f"Invalid LOGIC_APP_SUBMIT_URL: {e}"
+    except requests.exceptions.RequestException as e:
+        guard.release(False)
+        return False, True, f"{type(e).__name__}: {e}"
+    
+    if response.status_code in [200, 201, 202]:
+        guard.release(True)
+        return True, False, f"HTTP {response.status_code}"
+    # Throttling, timeouts and server errors may pass; other 4xx will not
+    retryable = response.status_code in [408, 429] or response.status_code >= 500
+    # Only a struggling Logic App counts against the breaker, not a rejected payload
+    guard.release(not retryable)
+    return False, retryable, f"HTTP {response.status_code}: {response.text[:200]}"
+
+@st.cache_resource
+def get_submission_outbox():
+    """Process-wide submission outbox with its delivery workers"""
+    if not ONBOARDING_OUTBOX_ENABLED:
+        return None
+    try:
+        outbox = SubmissionOutbox(
+            deliver=deliver_onboarding_submission,
+            encryption_secret=os.getenv("ONBOARDING_OUTBOX_ENCRYPTION_KEY") or CLIENT_SECRET
+        )
+    except Exception as e:
+        print(f"❌ DEBUG: Submission outbox unavailable, submitting directly: {e}")
+        return None
+    outbox.start(workers=ONBOARDING_OUTBOX_WORKERS)
+    return outbox
+
+# Start the workers with the process, so submissions accepted before a
+# restart are delivered without waiting for the next tool call
+get_submission_outbox()
+
+def resolve_signature(requested_handle, user_context):
+    """
+    Signature image for a submission (no Streamlit calls - runs on a tool worker).
+    A handle the agent passed must resolve for this user - it is never
+    replaced by another signature. Without one, the session's own signature
+    is used. Stroke signatures are rendered here (see SIGNATURE_SUBMIT_FORMAT).
+    Returns {'base64_data', 'timestamp', 'format'} or None.
+    
+    Raises:
+        SignatureHandleError: If the requested handle is invalid, unknown,
+            expired or belongs to someone else
+    """
+    signature = user_context['signature_data']
+    owner = (user_context['tenant_id'], user_context['user_email'])
+    
+    stored = resolve_requested_signature(
+        user_context.get('signature_store'), requested_handle, owner,
+        session_handle=signature.handle if signature else None
+    )
+    if stored:
+        image, image_format = signature_submission_image(stored['data'], stored['format'])
+        return {
+            'base64_data': base64.b64encode(image).decode(),
+            'timestamp': stored.get('timestamp', 0),
+            'format': image_format
+        }
+    
+    # The session's own signature - its cached encoding, even if the store dropped the handle
+    if not signature:
+        return None
+    base64_data, image_format = session_signature_payload(signature)
+    return {
+        'base64_data': base64_data,
+        'timestamp': signature.timestamp,
+        'format': image_format
+    }
+
+def submit_employee_onboarding(employee_data, user_context):
     """
     This function is called by Azure AI Agent when it has collected all employee data.
-    It submits the data to your Logic App.
+    It submits the data to your Logic App. Runs on a tool worker thread, so the
+    session values it needs come from user_context (see build_tool_context).
+    With the outbox enabled the data is stored durably and delivered in the
+    background; identical repeated submissions are accepted only once.
     """
     try:
         # Your Logic App URL for submitting employee data (NOT the tenant lookup one)
@@ -796,8 +1266,13 @@ def submit_employee_onboarding(employee_data):
         )
         
         # Get user context
-        tenant_id = st.session_state.user_info.get('tenant_id', 'unknown')
-        user_email = st.session_state.user_info.get('mail', 'no-email@unknown.com')
+        tenant_id = user_context['tenant_id']
+        user_email = user_context['user_email']
+        # The agent passes only the handle - the image is attached here, just before posting
+        requested_handle = employee_data.get("signatureHandle")
+        if not requested_handle and isinstance(employee_data.get("signature"), dict):
+            requested_handle = employee_data["signature"].get("signatureHandle")
+        signature_data = resolve_signature(requested_handle, user_context)
         
         # Build complete payload matching your schema
         payload = {
@@ -807,10 +1282,10 @@ def submit_employee_onboarding(employee_data):
             "paymentInfo": employee_data.get("paymentInfo", {}),
             "w4Info": employee_data.get("w4Info", {}),
             "signature": {
-                "signatureBase64": st.session_state.signature_data.get('base64_data', '') if st.session_state.signature_data else '',
-                "signatureTimestamp": st.session_state.signature_data.get('timestamp', 0) if st.session_state.signature_data else 0,
-                "signatureFormat": st.session_state.signature_data.get('format', 'PNG') if st.session_state.signature_data else 'PNG',
-                "signatureCollected": st.session_state.signature_data is not None
+                "signatureBase64": signature_data.get('base64_data', '') if signature_data else '',
+                "signatureTimestamp": signature_data.get('timestamp', 0) if signature_data else 0,
+                "signatureFormat": signature_data.get('format', 'PNG') if signature_data else 'PNG',
+                "signatureCollected": signature_data is not None
             }
         }
         
@@ -820,8 +1295,24 @@ def submit_employee_onboarding(employee_data):
         print(f"   User: {user_email}")
         print(f"   Employee: {employee_data.get('employee', {}).get('firstName', '')} {employee_data.get('employee', {}).get('lastName', '')}")
         
+        outbox = user_context.get('outbox')
+        if outbox:
+            submission, created = outbox.enqueue(logic_app_submit_url, payload)
+            submission_id = submission['idempotency_key'][:16]
+            if created:
+                print(f"📥 Submission {submission_id} queued for delivery")
+            else:
+                print(f"🔁 Duplicate submission {submission_id} ignored (already {submission['status']})")
+            return {
+                "success": True,
+                "message": "Employee data submitted successfully!",
+                "submission_id": submission_id,
+                "delivery_status": submission['status'],
+                "duplicate": not created
+            }
+        
         # Send to Logic App with increased timeout
-        response = requests.post(logic_app_submit_url, json=payload, timeout=30)
+        response = http_transport.post(logic_app_submit_url, json=payload, timeout=30)
         
         # Check response
         if response.status_code in [200, 201, 202]:
@@ -840,6 +1331,14 @@ def submit_employee_onboarding(employee_data):
                 "error": response.text
             }
             
+    except SignatureHandleError as e:
+        # Reported to the agent instead of submitting with a different signature
+        print(f"❌ SIGNATURE: {e}")
+        return {
+            "success": False,
+            "message": f"Signature could not be attached: {e}. Pass the signatureHandle from the "
+                       f"[SIGNATURE COLLECTED] message exactly, or ask the user to sign again."
+        }
     except requests.exceptions.Timeout:
         print(f"⏱️ TIMEOUT: Logic App did not respond within 30 seconds")
         return {
@@ -853,22 +1352,275 @@ def submit_employee_onboarding(employee_data):
             "message": f"Error submitting data: {str(e)}"
         }
 
+# Function tools the agents may call (see agent_tools.py)
+AGENT_TOOL_MAX_WORKERS = int(os.getenv("AGENT_TOOL_MAX_WORKERS", "8"))
+AGENT_TOOL_TIMEOUT_SECONDS = int(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "35"))
+# requires_action rounds allowed in one run before we stop feeding it tool outputs
+AGENT_MAX_TOOL_ROUNDS = int(os.getenv("AGENT_MAX_TOOL_ROUNDS", "8"))
+
+@st.cache_resource
+def get_tool_registry():
+    """Process-wide tool registry with compiled argument validators"""
+    registry = ToolRegistry(max_workers=AGENT_TOOL_MAX_WORKERS)
+    # Handle both "tax" and "submit_employee_onboarding" function names
+    registry.register(
+        "submit_employee_onboarding",
+        submit_employee_onboarding,
+        SUBMIT_EMPLOYEE_ONBOARDING_SCHEMA,
+        timeout=AGENT_TOOL_TIMEOUT_SECONDS,
+        aliases=["tax"]
+    )
+    return registry
+
+def build_tool_context():
+    """Snapshot the session values tool handlers need (they run off the script thread)"""
+    return {
+        'tenant_id': st.session_state.user_info.get('tenant_id', 'unknown'),
+        'user_email': st.session_state.user_info.get('mail', 'no-email@unknown.com'),
+        'signature_data': st.session_state.signature_data,
+        'signature_store': get_signature_store(),
+        'outbox': get_submission_outbox()
+    }
+
+# Agent definition cache - many users of one tenant share the same agent
+AGENT_CACHE_TTL_SECONDS = int(os.getenv("AGENT_CACHE_TTL_SECONDS", "900"))
+AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "256"))
+
+@st.cache_resource
+def get_agent_cache():
+    """Process-wide agent_id -> Agent cache (same scope as get_azure_client)"""
+    return TTLCache(
+        ttl_seconds=AGENT_CACHE_TTL_SECONDS,
+        max_entries=AGENT_CACHE_MAX_ENTRIES,
+        name="agent"
+    )
+
+def get_cached_agent(project_client, agent_id):
+    """Get an agent definition, calling the Agents API only on a cache miss"""
+    return get_agent_cache().get_or_load(agent_id, lambda: project_client.agents.get_agent(agent_id))
+
+def invalidate_agent_cache(agent_id=None):
+    """Drop a cached agent (or all agents) after its definition was updated"""
+    if agent_id:
+        get_agent_cache().invalidate(agent_id)
+    else:
+        get_agent_cache().clear()
+
+# Pre-warmed conversation threads per active agent
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "2"))
+THREAD_POOL_MAX_IDLE_SECONDS = int(os.getenv("THREAD_POOL_MAX_IDLE_SECONDS", "1800"))
+
+@st.cache_resource
+def get_thread_pool():
+    """Process-wide pool of empty conversation threads, refilled in the background"""
+    project = get_azure_client()
+    if not project:
+        return None
+    return ConversationThreadPool(
+        create_thread=lambda: project.agents.threads.create().id,
+        delete_thread=lambda thread_id: project.agents.threads.delete(thread_id),
+        target_size=THREAD_POOL_SIZE,
+        max_idle_seconds=THREAD_POOL_MAX_IDLE_SECONDS
+    )
+
+def take_spare_thread():
+    """Thread a failed session bootstrap created but could not use (see run_session_bootstrap)"""
+    return st.session_state.pop("spare_thread_id", None)
+
+def take_conversation_thread(project_client, agent_id):
+    """Get a ready thread from the pool, creating one synchronously only if it is empty"""
+    spare_thread_id = take_spare_thread()
+    if spare_thread_id:
+        return spare_thread_id
+    thread_pool = get_thread_pool()
+    thread_id = thread_pool.acquire(agent_id) if thread_pool else None
+    if thread_id:
+        return thread_id
+    return project_client.agents.threads.create().id
+
+async def get_agent_async(runtime, agent_id):
+    """Fetch an agent definition with the aio client"""
+    project = await runtime.resource("project", create_async_project_client)
+    return await project.agents.get_agent(agent_id)
+
+async def create_thread_async(runtime):
+    """Create a conversation thread with the aio client"""
+    project = await runtime.resource("project", create_async_project_client)
+    thread = await project.agents.threads.create()
+    return thread.id
+
 # Add new function to initialize specific agent
+def keep_spare_thread(thread_future):
+    """Once a thread created for a failed setup exists, keep it for the next attempt"""
+    def keep(future):
+        if not future.cancelled() and future.exception() is None:
+            st.session_state.spare_thread_id = future.result()
+    thread_future.add_done_callback(with_script_context(keep))
+
 def initialize_tenant_agent(project_client, agent_id):
     """Initialize conversation with the specific agent for this tenant"""
+    thread_id = None
+    thread_future = None
     try:
-        # Get the specific agent by ID
-        agent = project_client.agents.get_agent(agent_id)
+        runtime = get_async_runtime()
+        if not runtime:
+            # Get the specific agent by ID (shared across sessions)
+            agent = get_cached_agent(project_client, agent_id)
+            
+            # Take a pre-created thread for the specific agent
+            thread_id = take_conversation_thread(project_client, agent.id)
+            
+            return agent, thread_id
+        
+        # Start creating a thread (only if the pool has none ready) while the
+        # agent definition is fetched, instead of one after the other
+        thread_pool = get_thread_pool()
+        thread_id = take_spare_thread() or (thread_pool.acquire(agent_id) if thread_pool else None)
+        thread_future = None if thread_id else runtime.submit(create_thread_async(runtime))
         
-        # Create thread for the specific agent
-        thread = project_client.agents.threads.create()
+        agent = get_agent_cache().get_or_load(
+            agent_id, lambda: runtime.run(get_agent_async(runtime, agent_id), timeout=30)
+        )
+        if thread_future:
+            thread_id = thread_future.result(timeout=30)
         
-        return agent, thread.id
+        return agent, thread_id
         
     except Exception as e:
+        # The thread is fine even if the agent is not - keep it for the retry
+        if thread_id:
+            st.session_state.spare_thread_id = thread_id
+        elif thread_future:
+            keep_spare_thread(thread_future)
         st.error(f"Error initializing agent {agent_id}: {e}")
         return None, None
 
+# Page size for reply retrieval - a run produces only a handful of messages
+MESSAGE_PAGE_LIMIT = 10
+
+def extract_message_text(msg):
+    """Join every text content part of a message (not just content[0])"""
+    if not getattr(msg, 'content', None):
+        return ""
+    if not isinstance(msg.content, list):
+        return str(msg.content)
+    
+    parts = []
+    for part in msg.content:
+        text = getattr(part, 'text', None)
+        if text is not None:
+            parts.append(getattr(text, 'value', str(text)))
+    return "\n\n".join(part for part in parts if part)
+
+def get_run_reply(thread_id, run_id=None):
+    """
+    Fetch the assistant reply for one run without paging the whole thread.
+    With a run id, only that run's messages are listed (oldest first). Without
+    one, the newest messages are read until the thread's local cursor (the
+    newest message already seen) is reached. Cost stays constant with
+    transcript length either way.
+    """
+    cursors = st.session_state.setdefault("message_cursors", {})
+    cursor = cursors.get(thread_id)
+    
+    # Pages are fetched while iterating, so the slot covers the whole listing
+    with dependency_guards["agents-api"].slot():
+        if run_id:
+            messages = st.session_state.project_client.agents.messages.list(
+                thread_id=thread_id, run_id=run_id, order="asc", limit=MESSAGE_PAGE_LIMIT
+            )
+            new_messages = list(messages)
+        else:
+            new_messages = []
+            for msg in st.session_state.project_client.agents.messages.list(
+                thread_id=thread_id, order="desc", limit=MESSAGE_PAGE_LIMIT
+            ):
+                if msg.id == cursor:
+                    break
+                new_messages.append(msg)
+                if cursor is None:
+                    break  # No cursor yet - the newest message is all we need
+            new_messages.reverse()
+    
+    if new_messages:
+        cursors[thread_id] = new_messages[-1].id
+    
+    replies = [extract_message_text(msg) for msg in new_messages if msg.role == "assistant"]
+    return "\n\n".join(reply for reply in replies if reply)
+
+# Runs we start are awaited by id with adaptive backoff (see run_waiter.py)
+AGENT_RUN_TIMEOUT_SECONDS = int(os.getenv("AGENT_RUN_TIMEOUT_SECONDS", "120"))
+
+@st.cache_resource
+def get_run_waiter():
+    """Process-wide tracker/waiter for the agent runs this app starts"""
+    project = get_azure_client()
+    return RunWaiter(
+        # A rejected poll counts as a poll error and is retried after the next backoff
+        get_run=lambda thread_id, run_id: agents_api(project.agents.runs.get, thread_id=thread_id, run_id=run_id),
+        cancel_run=lambda thread_id, run_id: project.agents.runs.cancel(thread_id=thread_id, run_id=run_id)
+    )
+
+def start_agent_run(agent_id):
+    """Start a run on the current thread and wait for it to complete or need tool outputs"""
+    run = agents_api(
+        st.session_state.project_client.agents.runs.create,
+        thread_id=st.session_state.thread_id,
+        agent_id=agent_id,
+        additional_instructions=st.session_state.get('run_instructions')
+    )
+    return get_run_waiter().wait(
+        st.session_state.thread_id, run.id,
+        timeout=AGENT_RUN_TIMEOUT_SECONDS, cancel_on_timeout=True
+    )
+
+def cancel_agent_run(run_id):
+    """Cancel one of our runs on the current thread, ignoring failures"""
+    try:
+        st.session_state.project_client.agents.runs.cancel(thread_id=st.session_state.thread_id, run_id=run_id)
+    except Exception as e:
+        print(f"⚠️ DEBUG: Could not cancel run {run_id}: {e}")
+
+def submit_tool_outputs_and_wait(run_id, tool_outputs):
+    """Submit tool outputs for a run and wait for it to settle again"""
+    agents_api(
+        st.session_state.project_client.agents.runs.submit_tool_outputs,
+        thread_id=st.session_state.thread_id,
+        run_id=run_id,
+        tool_outputs=tool_outputs
+    )
+    return get_run_waiter().wait(
+        st.session_state.thread_id, run_id,
+        timeout=AGENT_RUN_TIMEOUT_SECONDS, cancel_on_timeout=True
+    )
+
+# "run": static rules in the agent definition + per-user additional_instructions
+# "legacy": full preamble message posted to every new thread
+AGENT_CONTEXT_MODE = os.getenv("AGENT_CONTEXT_MODE", "run").lower()
+# Append the static rules to agent definitions that lack them (otherwise fall back to legacy)
+AGENT_SYNC_STATIC_INSTRUCTIONS = os.getenv("AGENT_SYNC_STATIC_INSTRUCTIONS", "false").lower() == "true"
+
+def ensure_agent_static_instructions(agent):
+    """Make sure the agent definition carries the static rules; returns False if it can't"""
+    if agent_has_static_instructions(agent):
+        return True
+    if not AGENT_SYNC_STATIC_INSTRUCTIONS:
+        print(f"⚠️ DEBUG: Agent {agent.id} has no static app rules - using legacy context message")
+        return False
+    
+    try:
+        updated = st.session_state.project_client.agents.update_agent(
+            agent.id,
+            instructions=with_static_instructions(agent.instructions)
+        )
+        invalidate_agent_cache(agent.id)
+        st.session_state.agent = updated
+        print(f"✅ DEBUG: Added static app rules to agent {agent.id}")
+        return True
+    except Exception as e:
+        print(f"❌ DEBUG: Could not update agent {agent.id} instructions: {e}")
+        return False
+
 # Modify the send_initial_context_message function to accept agent parameter
 def send_initial_context_message(agent):
     """Send initial context message to the agent with enhanced user information"""
@@ -876,81 +1628,23 @@ def send_initial_context_message(agent):
         if not st.session_state.thread_id:
             return False
             
-        user_name = st.session_state.user_info.get('displayName', 'User')
-        user_email = st.session_state.user_info.get('mail', 'no-email@unknown.com')
-        tenant_id = st.session_state.user_info.get('tenant_id', 'unknown')
-        account_type = st.session_state.user_info.get('account_type', 'unknown')
-        email_method = st.session_state.user_info.get('email_extraction_method', 'unknown')
-        user_name="User" if user_name == "Unknown" else user_name
+        context = build_user_context(st.session_state.user_info)
         # Ensure email is never None or empty
-        if not user_email or user_email in ['None', '', 'null']:
-            user_email = "no-email@unknown.com"
+        if context['email_fallback']:
             st.warning("⚠️ User email could not be determined - using fallback")
         
         # Ensure tenant ID is never None
-        if not tenant_id or tenant_id in ['None', '', 'null']:
-            tenant_id = "unknown"
+        if context['tenant_fallback']:
             st.warning("⚠️ Tenant ID could not be determined - using 'unknown'")
         
-        initial_context_message = f"""
-        Hi Employee Onboarding Assistant! 
-        
-        [SYSTEM CONTEXT - PLEASE REMEMBER THROUGHOUT THE CONVERSATION]
-        User: {user_name}
-        Email: {user_email}
-        Tenant ID: {tenant_id}
-        Account Type: {account_type}
-        Email Extraction Method: {email_method}
-        
-        CRITICAL INSTRUCTIONS: Throughout this entire conversation, whenever you create JSON output for Logic Apps API calls, you MUST always include these fields with exact values:
-        "tenantId": "{tenant_id}"
-        "userEmail": "{user_email}"
-        
-        SIGNATURE DATA HANDLING:
-        - During onboarding, you will collect the user's digital signature
-        - When signature is provided, you will receive it as base64 encoded PNG data
-        - When submitting employee data to storage, you MUST include these signature fields:
-          * "signatureBase64": [the complete base64 string]
-          * "signatureTimestamp": [unix timestamp]
-          * "signatureFormat": "PNG"
-        - Store signature data together with other employee information (name, email, phone, etc.)
-        - Signature is REQUIRED for onboarding completion
-        
-        IMPORTANT - SIGNATURE COLLECTION INSTRUCTIONS:
-        - After user confirms their details, the system will automatically handle signature collection if required
-        - You do NOT need to mention signature in your response
-        - Just say: "Thank you for confirming!"
-        - The system will show signature canvas automatically if needed based on configuration
-        - DO NOT output JSON data to the user
-        - DO NOT show API call structures or technical data
-        - Keep all responses brief and user-friendly
-        
-        CRITICAL - NEVER SHOW JSON OR TECHNICAL DATA TO USERS:
-        - NEVER output JSON structures in your responses
-        - NEVER show API payloads, data structures, or technical formats
-        - Keep all responses in natural, conversational language
-        - If you need to store data, do it silently without showing the user
-        
-        IMPORTANT VALIDATION RULES:
-        - If tenantId is "unknown", inform user that organization identification may be limited
-        - If userEmail contains "no-email" or "unknown", request user to provide their actual email
-        - Never use null, undefined, or empty string for these fields
-        - Always validate data before sending to Logic Apps
-        - Ensure signature data is included when calling storage functions
-        
-        ERROR HANDLING for missing user information:
-        1. If email is missing/unknown, ask user to provide their work email
-        2. If tenant is unknown, proceed but note potential routing limitations
-        3. Always include both fields even if they contain fallback values
-        
-        The tenant ID identifies which organization this user belongs to and the email identifies the specific user. Both fields must be included in all API submissions for proper user identification and organizational routing. Also the {user_email} is not the user's actual email, so do not ask the user whether {user_email} is their email. just collect user's Email seperately and do the onboarding process.
-        Current user context validation:
-        - Email Status: {email_method}
-        - Tenant Status: {'✅ Valid' if tenant_id != 'unknown' else '⚠️ Unknown'}
-        - Account Type: {account_type}
-        
-        Begin the onboarding process with a friendly greeting.
-        """
+        # Static rules come from the agent definition when it has them; only the
+        # per-user variables then ride along with each run
+        if AGENT_CONTEXT_MODE == "run" and ensure_agent_static_instructions(agent):
+            st.session_state.run_instructions = build_run_instructions(context)
+            initial_context_message = GREETING_KICKOFF_MESSAGE
+        else:
+            st.session_state.run_instructions = None
+            initial_context_message = build_legacy_context_message(context)
         
         # Create initial context message
         message = st.session_state.project_client.agents.messages.create(
@@ -960,32 +1654,14 @@ def send_initial_context_message(agent):
         )
         
         # Process the run with the agent
-        run = st.session_state.project_client.agents.runs.create_and_process(
-            thread_id=st.session_state.thread_id,
-            agent_id=agent.id  # Use the passed agent
-        )
+        run = start_agent_run(agent.id)  # Use the passed agent
         
         if run.status == "failed":
             st.error(f"Failed to send initial context: {run.last_error}")
             return False
         
-        # Retrieve the agent's response
-        messages = st.session_state.project_client.agents.messages.list(
-            thread_id=st.session_state.thread_id
-        )
-        messages_list = list(messages)
-        
-        # Find the latest assistant message and add to session
-        msg=messages_list[0]
-        content = ""
-        if hasattr(msg, 'content') and msg.content:
-            if isinstance(msg.content, list) and len(msg.content) > 0:
-                if hasattr(msg.content[0], 'text'):
-                    content = msg.content[0].text.value
-                else:
-                    content = str(msg.content[0])
-            else:
-                content = str(msg.content)
+        # Retrieve only the messages this run produced
+        content = get_run_reply(st.session_state.thread_id, run.id)
         
         # Add the initial greeting to messages
         st.session_state.messages.append({"role": "assistant", "content": content})
@@ -997,6 +1673,132 @@ def send_initial_context_message(agent):
         st.error(f"Error sending initial context: {e}")
         return False
 
+# Post-login bootstrap stages run concurrently (see bootstrap_planner.py)
+BOOTSTRAP_MAX_WORKERS = int(os.getenv("BOOTSTRAP_MAX_WORKERS", "8"))
+BOOTSTRAP_TIMEOUT_SECONDS = int(os.getenv("BOOTSTRAP_TIMEOUT_SECONDS", "60"))
+AZURE_AI_TOKEN_SCOPE = "https://ai.azure.com/.default"
+
+@st.cache_resource
+def get_bootstrap_executor():
+    """Process-wide worker threads for bootstrap stages"""
+    return ThreadPoolExecutor(max_workers=BOOTSTRAP_MAX_WORKERS, thread_name_prefix="bootstrap")
+
+def with_script_context(func):
+    """Let a worker thread use this session's cached resources"""
+    ctx = get_script_run_ctx()
+    def run_with_context(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(*args, **kwargs)
+    return run_with_context
+
+def run_session_bootstrap(access_token, token_seconds=None):
+    """
+    Prepare profile, agent and conversation thread after login as a dependency graph:
+    
+        profile ─────────────────────────────┐
+        route (tid from JWT) ──┬──> agent ───┼──> greeting (next rerun)
+        credential warm-up ────┴──> thread ──┘
+    
+    Stages run on worker threads without st.* UI calls; results are applied to
+    the session here. If agent setup fails, the sequential setup after login
+    runs instead and shows the error.
+    """
+    origin = time.time() - (token_seconds or 0)
+    try:
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+    except Exception:
+        claims = {}
+    tenant_id = claims.get("tid")
+    claim_email = claims.get("preferred_username") or claims.get("upn") or claims.get("email")
+    
+    # Resolve shared resources on the script thread
+    project = get_azure_client()
+    credential = get_ai_credential()
+    route_cache = get_tenant_route_cache()
+    thread_pool = get_thread_pool()
+    runtime = get_async_runtime()
+    # Left over from an earlier bootstrap whose agent stage failed
+    spare_thread_id = take_spare_thread()
+    
+    def lookup_route(results):
+        route_tenant = tenant_id or results["profile"].get("tenant_id", "unknown")
+        route_email = claim_email or results["profile"].get("mail", "no-email@unknown.com")
+        data = load_tenant_route(route_cache, route_tenant, lambda: fetch_tenant_route(route_tenant, route_email, runtime))
+        if not data.get("success"):
+            raise RuntimeError(f"Tenant lookup failed: {data.get('error', 'Unknown error')}")
+        return data
+    
+    def take_thread(results):
+        # Threads are not bound to an agent: use the pool when the tenant's agent
+        # is already known, otherwise create one while the lookup is running
+        if spare_thread_id:
+            return spare_thread_id
+        known_route = route_cache.peek(tenant_id) if tenant_id else None
+        thread_id = None
+        if thread_pool and known_route and known_route.get("agentId"):
+            thread_id = thread_pool.acquire(known_route["agentId"])
+        return thread_id or project.agents.threads.create().id
+    
+    plan = BootstrapPlan(get_bootstrap_executor(), wrap=with_script_context)
+    if token_seconds is not None:
+        plan.record("token", token_seconds)
+    plan.add("profile", lambda results: get_user_info(access_token))
+    plan.add("credential", lambda results: credential.get_token(AZURE_AI_TOKEN_SCOPE))
+    plan.add("route", lookup_route, deps=[] if tenant_id and claim_email else ["profile"])
+    plan.add("agent", lambda results: get_cached_agent(project, results["route"]["agentId"]), deps=["route", "credential"])
+    plan.add("thread", take_thread, deps=["credential"])
+    results = plan.run(timeout=BOOTSTRAP_TIMEOUT_SECONDS)
+    
+    print(f"🔍 DEBUG: Session bootstrap\n{plan.format_timings()}")
+    for stage, error in plan.errors().items():
+        print(f"⚠️ DEBUG: Bootstrap stage {stage} failed: {error}")
+    st.session_state.bootstrap_timings = {
+        "origin": origin,
+        "stages": plan.timings(),
+        "critical_path": plan.critical_path()
+    }
+    
+    st.session_state.user_info = results.get("profile") or {
+        "displayName": "User", 
+        "mail": "no-email@unknown.com", 
+        "tenant_id": "unknown",
+        "email_extraction_method": "exception_fallback",
+        "account_type": "unknown"
+    }
+    
+    if "agent" in results and "thread" in results:
+        route = results["route"]
+        st.session_state.project_client = project
+        st.session_state.agent = results["agent"]
+        st.session_state.thread_id = results["thread"]
+        st.session_state.agent_type = route.get('agentType', 'Standard')
+        st.session_state.org_name = route.get('orgName', 'Unknown')
+        st.session_state.greeting_pending = True
+        if thread_pool:
+            thread_pool.warm(results["agent"].id)
+    elif results.get("thread") or spare_thread_id:
+        # Keep the thread (or the unused spare) for the sequential setup or the
+        # next bootstrap instead of leaking a new one on every retry
+        st.session_state.spare_thread_id = results.get("thread") or spare_thread_id
+
+def send_bootstrap_greeting():
+    """Send the initial context for a bootstrapped session and record its timing"""
+    started = time.time()
+    with st.spinner("Starting conversation..."):
+        context_sent = send_initial_context_message(st.session_state.agent)
+    
+    timings = st.session_state.get("bootstrap_timings")
+    if timings:
+        timings["stages"].append({
+            "stage": "greeting",
+            "deps": ["profile", "agent", "thread"],
+            "start_ms": round((started - timings["origin"]) * 1000, 1),
+            "duration_ms": round((time.time() - started) * 1000, 1),
+            "status": "ok" if context_sent else "failed"
+        })
+        timings["login_to_greeting_ms"] = round((time.time() - timings["origin"]) * 1000, 1)
+        print(f"🔍 DEBUG: Login to greeting took {timings['login_to_greeting_ms']:.0f}ms")
+
 # Authentication check
 if not st.session_state.logged_in:
     login()
@@ -1028,108 +1830,237 @@ if not st.session_state.project_client:
                         
                         # Send initial context
                         context_sent = send_initial_context_message(agent)
+elif st.session_state.pop("greeting_pending", False):
+    # Agent and thread were prepared during login - only the greeting is left
+    send_bootstrap_greeting()
                       
 # Update the create_new_thread function
 def create_new_thread():
     """Create a new conversation thread and send initial context"""
     try:
         if st.session_state.project_client and st.session_state.agent:
-            thread = st.session_state.project_client.agents.threads.create()
-            st.session_state.thread_id = thread.id
+            thread_id = take_conversation_thread(st.session_state.project_client, st.session_state.agent.id)
+            st.session_state.thread_id = thread_id
             st.session_state.messages = []
             
             # Send initial context message
             context_sent = send_initial_context_message(st.session_state.agent)
             
             if context_sent:
-                st.success(f"New conversation started with context! Thread ID: {thread.id}")
+                st.success(f"New conversation started with context! Thread ID: {thread_id}")
             else:
-                st.success(f"New conversation started! Thread ID: {thread.id}")
+                st.success(f"New conversation started! Thread ID: {thread_id}")
                 st.warning("Initial context may not have been set properly.")
                 
     except Exception as e:
         st.error(f"Failed to create thread: {e}")
 
+def execute_tool_calls(tool_calls):
+    """Run the agent's requested function calls concurrently and build the tool outputs"""
+    return get_tool_registry().execute(tool_calls, build_tool_context())
+
+def process_agent_run():
+    """Run the agent on the current thread (blocking) and return its reply"""
+    # Process the run with the agent
+    run = start_agent_run(st.session_state.agent.id)
+    return complete_agent_run(run)
+
+def complete_agent_run(run, tool_rounds=0, known_outputs=None):
+    """
+    Drive a settled run to its end on the blocking path and return its reply.
+    known_outputs maps tool call ids to outputs already produced for this run
+    (by an interrupted stream), so those tools are not executed a second time.
+    """
+    if run.status == "failed":
+        return f"Error: {run.last_error}"
+    
+    # Handle function calls from the agent - a run may ask for tools several times
+    known_outputs = known_outputs or {}
+    while run.status == "requires_action" and run.required_action and run.required_action.submit_tool_outputs:
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        if tool_calls and all(tool_call.id in known_outputs for tool_call in tool_calls):
+            # The stream ran these tools but failed before their outputs were accepted
+            print(f"🔁 Resubmitting outputs of {len(tool_calls)} tool call(s) already executed")
+            tool_outputs = [known_outputs[tool_call.id] for tool_call in tool_calls]
+        else:
+            tool_rounds += 1
+            if tool_rounds > AGENT_MAX_TOOL_ROUNDS:
+                cancel_agent_run(run.id)
+                return f"Error: agent requested tools more than {AGENT_MAX_TOOL_ROUNDS} times"
+            print(f"🔧 Agent requested function call! (round {tool_rounds})")
+            
+            tool_outputs = execute_tool_calls(tool_calls)
+        
+        # Submit tool outputs back to agent
+        run = submit_tool_outputs_and_wait(run.id, tool_outputs)
+    
+    if run.status == "failed":
+        return f"Error: {run.last_error}"
+    
+    # Retrieve only the messages this run produced
+    return get_run_reply(st.session_state.thread_id, run.id)
+
+def agent_unavailable_reply(error):
+    """Reply shown instead of waiting on an Agents API that is tripped or saturated"""
+    return f"⚠️ The assistant is temporarily unavailable ({error}). Please try again in a moment."
+
 def send_message_to_agent(user_message):
     """Send message to Azure AI agent and get response"""
     try:
-        # Create user message
-        message = st.session_state.project_client.agents.messages.create(
+        # A thread accepts no new messages while one of our runs is still active
+        wait_for_active_runs()
+        
+        # Create user message (nothing is posted while the Agents API is tripped or saturated)
+        message = agents_api(
+            st.session_state.project_client.agents.messages.create,
             thread_id=st.session_state.thread_id,
             role="user",
             content=user_message
         )
         
-        # Process the run with the agent
-        run = st.session_state.project_client.agents.runs.create_and_process(
-            thread_id=st.session_state.thread_id,
-            agent_id=st.session_state.agent.id
-        )
-        
-        if run.status == "failed":
-            return f"Error: {run.last_error}"
+        return process_agent_run()
         
-        # Handle function calls from the agent
-        if run.status == "requires_action":
-            print("🔧 Agent requested function call!")
-            
-            # Get the tool calls
-            if run.required_action and run.required_action.submit_tool_outputs:
-                tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                tool_outputs = []
+    except DependencyUnavailable as e:
+        print(f"⚠️ DEBUG: Agent call rejected: {e}")
+        return agent_unavailable_reply(e)
+    except Exception as e:
+        print(f"❌ Error communicating with agent: {e}")
+        return f"Error communicating with agent: {e}"
+
+# Stream agent replies token by token (set AGENT_STREAMING=false to disable)
+AGENT_STREAMING = os.getenv("AGENT_STREAMING", "true").lower() == "true"
+
+def stream_message_to_agent(user_message):
+    """
+    Send message to the agent and yield the reply as text deltas.
+    Tool calls requested mid-stream are executed and their outputs streamed
+    back into the same run. Falls back to the blocking run if streaming is
+    unavailable before any text was produced.
+    """
+    project_client = st.session_state.project_client
+    thread_id = st.session_state.thread_id
+    
+    # A rerun that stops reading the reply closes this generator; the slot
+    # held at that point is returned without counting against the Agents API
+    try:
+        yield from _stream_agent_turn(project_client, thread_id, user_message)
+    except DependencyUnavailable as e:
+        print(f"⚠️ DEBUG: Agent call rejected: {e}")
+        yield agent_unavailable_reply(e)
+    except Exception as e:
+        print(f"❌ Error communicating with agent: {e}")
+        yield f"Error communicating with agent: {e}"
+
+def _stream_agent_turn(project_client, thread_id, user_message):
+    """Body of stream_message_to_agent; raises when the agent could not be reached"""
+    wait_for_active_runs()
+    agents_api(
+        project_client.agents.messages.create,
+        thread_id=thread_id,
+        role="user",
+        content=user_message
+    )
+    
+    produced_text = False
+    tool_rounds = 0
+    # Set by thread.run.created - after that, the run exists whatever happens to the stream
+    run_id = None
+    tool_outputs_by_call = {}
+    # Same deadline as the polling path: per run segment, restarted after tool outputs.
+    # read_timeout keeps a silent stream from blocking past it between events.
+    deadline = time.monotonic() + AGENT_RUN_TIMEOUT_SECONDS
+    try:
+        from azure.ai.agents.models import AgentStreamEvent, MessageDeltaChunk, ThreadRun
+        
+        # The slot is held while the stream is read, but not while tools run
+        with dependency_guards["agents-api"].slot() as api_slot, project_client.agents.runs.stream(
+            thread_id=thread_id,
+            agent_id=st.session_state.agent.id,
+            additional_instructions=st.session_state.get('run_instructions'),
+            read_timeout=AGENT_RUN_TIMEOUT_SECONDS
+        ) as stream:
+            for event_type, event_data, _ in stream:
+                if time.monotonic() > deadline:
+                    raise RunWaitTimeout(f"Run {run_id} still streaming after {AGENT_RUN_TIMEOUT_SECONDS}s")
                 
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    print(f"📞 Calling function: {function_name}")
-                    print(f"   Arguments: {json.dumps(function_args, indent=2)[:200]}...")
+                if isinstance(event_data, MessageDeltaChunk):
+                    if event_data.text:
+                        produced_text = True
+                        yield event_data.text
+                
+                elif isinstance(event_data, ThreadRun):
+                    run_id = event_data.id
+                    # Keep the run waiter informed, so later waits need no polling
+                    get_run_waiter().notify(thread_id, event_data.id, event_data.status)
                     
-                    # Call the appropriate function
-                    # Handle both "tax" and "submit_employee_onboarding" function names
-                    if function_name in ["submit_employee_onboarding", "tax"]:
-                        result = submit_employee_onboarding(function_args)
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": json.dumps(result)
-                        })
-                    else:
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": json.dumps({"error": f"Unknown function: {function_name}"})
-                        })
+                    if event_data.status == "requires_action" and event_data.required_action:
+                        tool_rounds += 1
+                        if tool_rounds > AGENT_MAX_TOOL_ROUNDS:
+                            cancel_agent_run(event_data.id)
+                            produced_text = True
+                            yield f"Error: agent requested tools more than {AGENT_MAX_TOOL_ROUNDS} times"
+                            break
+                        print(f"🔧 Agent requested function call (streaming, round {tool_rounds})!")
+                        with api_slot.suspended():
+                            tool_outputs = execute_tool_calls(event_data.required_action.submit_tool_outputs.tool_calls)
+                        tool_outputs_by_call.update((output["tool_call_id"], output) for output in tool_outputs)
+                        
+                        # Continue the run - new events are chained onto this stream
+                        project_client.agents.runs.submit_tool_outputs_stream(
+                            thread_id=thread_id,
+                            run_id=event_data.id,
+                            tool_outputs=tool_outputs,
+                            event_handler=stream,
+                            read_timeout=AGENT_RUN_TIMEOUT_SECONDS
+                        )
+                        deadline = time.monotonic() + AGENT_RUN_TIMEOUT_SECONDS
+                    elif event_data.status == "failed":
+                        produced_text = True
+                        yield f"Error: {event_data.last_error}"
                 
-                # Submit tool outputs back to agent
-                run = st.session_state.project_client.agents.runs.submit_tool_outputs_and_process(
-                    thread_id=st.session_state.thread_id,
-                    run_id=run.id,
-                    tool_outputs=tool_outputs
-                )
-        
-        # Retrieve messages
-        messages = st.session_state.project_client.agents.messages.list(
-            thread_id=st.session_state.thread_id
-        )
-        messages_list = list(messages)
-        
-        # Find the latest assistant message
-        msg= messages_list[0]
-        content = ""
-        if hasattr(msg, 'content') and msg.content:
-            if isinstance(msg.content, list) and len(msg.content) > 0:
-                if hasattr(msg.content[0], 'text'):
-                    content = msg.content[0].text.value
-                else:
-                    content = str(msg.content[0])
-            else:
-                content = str(msg.content)
-        return content
-        
-        return "No response received from agent."
+                elif event_type == AgentStreamEvent.ERROR:
+                    raise RuntimeError(f"Stream error: {event_data}")
         
+        if not produced_text:
+            yield "No response received from agent."
+            
     except Exception as e:
-        print(f"❌ Error communicating with agent: {e}")
-        return f"Error communicating with agent: {e}"
+        given_up = isinstance(e, (DependencyUnavailable, RunWaitTimeout))
+        if run_id and (produced_text or given_up):
+            # Part of the reply is shown, the API is unavailable or the deadline
+            # passed - stop the run so it does not hold the thread
+            cancel_agent_run(run_id)
+        if produced_text:
+            print(f"❌ Error while streaming from agent: {e}")
+            yield "\n\n"
+            raise
+        if given_up:
+            raise
+        
+        if run_id:
+            # The run was created (and may already have called tools) - starting
+            # another would fail on the active run or repeat those tool calls, so
+            # this run is followed to its end on the blocking path instead
+            print(f"⚠️ Stream for run {run_id} failed, following the run without streaming: {e}")
+            run = get_run_waiter().wait(thread_id, run_id, timeout=AGENT_RUN_TIMEOUT_SECONDS, cancel_on_timeout=True)
+            yield complete_agent_run(run, tool_rounds, tool_outputs_by_call)
+            return
+        
+        # Streaming not available - the user message is already on the thread,
+        # so only the run itself is retried on the blocking path
+        print(f"⚠️ Streaming unavailable, falling back to blocking run: {e}")
+        yield process_agent_run()
+
+def render_agent_reply(user_message, spinner_text):
+    """Send a message and render the reply in the current chat bubble; returns the text"""
+    if AGENT_STREAMING:
+        response = st.write_stream(stream_message_to_agent(user_message))
+        return response if isinstance(response, str) else "".join(str(part) for part in response)
+    
+    with st.spinner(spinner_text):
+        response = send_message_to_agent(user_message)
+    st.markdown(response)
+    return response
 
 def send_signature_data_to_agent():
     """Send signature confirmation to agent after signature is collected"""
@@ -1137,23 +2068,18 @@ def send_signature_data_to_agent():
         if not st.session_state.signature_data:
             return "No signature data available."
         
-        # Get signature data including base64
-        base64_data = st.session_state.signature_data.get('base64_data', '')
-        timestamp = st.session_state.signature_data.get('timestamp', 0)
-        format_type = st.session_state.signature_data.get('format', 'PNG')
+        # Only the handle goes into the conversation - the image stays server-side
+        # and is attached by submit_employee_onboarding
+        handle = st.session_state.signature_data.handle or ''
         
-        # Create message with ACTUAL base64 signature data
-        # Include the base64 in the message so the agent can use it
         signature_message = f"""[SIGNATURE COLLECTED]
 
 The user has provided their digital signature.
 
-IMPORTANT - Include this signature data when submitting:
-- signatureBase64: {base64_data}
-- signatureTimestamp: {int(timestamp)}
-- signatureFormat: {format_type}
+IMPORTANT - Include this value when submitting:
+- signatureHandle: {handle}
 
-Please proceed with submitting the onboarding data using the tax function. Make sure to include the signatureBase64 value exactly as provided above."""
+Please proceed with submitting the onboarding data using the tax function, passing "signatureHandle" exactly as provided above. The signature image is attached automatically."""
         
         # Send to agent
         response = send_message_to_agent(signature_message)
@@ -1164,30 +2090,15 @@ Please proceed with submitting the onboarding data using the tax function. Make
         return f"Error: {str(e)}"
 
 def wait_for_active_runs(max_wait_seconds=30):
-    """Wait for any active runs to complete before proceeding"""
-    try:
-        wait_count = 0
-        while wait_count < max_wait_seconds:
-            # Get all runs for this thread
-            runs = st.session_state.project_client.agents.runs.list(
-                thread_id=st.session_state.thread_id
-            )
-            
-            # Check if any runs are active
-            active_runs = [run for run in runs if run.status in ["in_progress", "queued", "requires_action"]]
-            
-            if not active_runs:
-                return True  # No active runs, safe to proceed
-            
-            # Wait a bit before checking again
-            time.sleep(1)
-            wait_count += 1
-        
-        # Timeout reached
-        return False
-    except Exception as e:
-        # If we can't check, assume it's safe to proceed
+    """Wait for runs we started on this thread to settle before posting to it"""
+    if not st.session_state.get('thread_id'):
         return True
+    
+    # Only our own tracked runs are checked - no thread-wide run listing
+    settled = get_run_waiter().wait_for_thread(st.session_state.thread_id, timeout=max_wait_seconds)
+    if not settled:
+        print(f"⚠️ DEBUG: Runs still active on thread {st.session_state.thread_id} after {max_wait_seconds}s")
+    return settled
 
 
 
@@ -1392,14 +2303,20 @@ if not st.session_state.project_client:
                 st.error("❌ Could not determine agent for your organization")
                 st.stop()
 
+# Persist the token cache partition key in the browser after interactive login
+if st.session_state.pop("auth_cookie_pending", False):
+    set_auth_cookie(st.session_state.token_cache_key)
+
 # Main Chat Interface
-logo_base64 = get_logo_base64()
+# Assistant avatar is passed as a file path so Streamlit serves it by URL
+# (content-hashed media file) instead of inlining base64 in every bubble
+assistant_avatar = logo_assets["avatar"]["path"] if logo_assets else "🤖"
 
-if logo_base64:
+if logo_assets:
     st.markdown(f"""
     <div style="text-align: center; margin-bottom: 20px;">
         <div style="display: flex; align-items: center; justify-content: center; gap: 15px;">
-            <img src="data:image/png;base64,{logo_base64}" style="width: 60px; height: 60px; object-fit: contain; border-radius: 8px;" alt="Logo">
+            <img src="{logo_assets['header']['url']}" style="width: 60px; height: 60px; object-fit: contain; border-radius: 8px;" alt="Logo">
             <h1 style="color: #0078d4; margin: 0; font-size: 2.5rem;">Employee Onboarding Assistant</h1>
         </div>
     </div>
@@ -1452,6 +2369,9 @@ with col2:
     
     with btn_col3:
         if st.button("Sign Out", key="signout", help="Sign Out"):
+            # Forget persisted tokens so the next visit requires a real login
+            delete_user_token_cache(st.session_state.get("token_cache_key"))
+            
             # Clean up session
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
@@ -1464,13 +2384,17 @@ with st.sidebar:
     st.markdown("### 📝 Signature Status")
     if st.session_state.signature_data:
         st.success("✅ Signature Collected")
-        st.markdown(f"**Format:** {st.session_state.signature_data['format']}")
-        st.markdown(f"**Timestamp:** {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(st.session_state.signature_data['timestamp']))}")
+        st.markdown(f"**Format:** {st.session_state.signature_data.format}")
+        st.markdown(f"**Timestamp:** {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(st.session_state.signature_data.timestamp))}")
+        # Cached on the signature value - not re-rendered on every rerun
+        st.image(st.session_state.signature_data.thumbnail(), width=150)
         
         if st.button("👁️ View Signature", key="view_signature"):
             display_collected_signature()
             
         if st.button("🗑️ Clear Signature", key="clear_stored_signature"):
+            if st.session_state.signature_data.handle:
+                get_signature_store().discard(st.session_state.signature_data.handle)
             st.session_state.signature_data = None
             st.rerun()
     else:
@@ -1492,6 +2416,38 @@ with st.sidebar:
     debug_mode = st.checkbox("🔍 Debug Mode", key="debug_mode", help="Show debug information for signature collection")
     if debug_mode:
         debug_signature_state()
+        
+        if st.session_state.agent and st.button("♻️ Reload Agent", key="debug_reload_agent", help="Refetch the agent definition after it was updated"):
+            invalidate_agent_cache(st.session_state.agent.id)
+            st.session_state.agent = get_cached_agent(st.session_state.project_client, st.session_state.agent.id)
+            st.rerun()
+        
+        with st.expander("⏱️ Run Wait Metrics", expanded=False):
+            st.json(get_run_waiter().stats())
+        
+        with st.expander("🔧 Tool Call Metrics", expanded=False):
+            st.json(get_tool_registry().stats())
+        
+        if st.session_state.get("bootstrap_timings"):
+            with st.expander("🚀 Bootstrap Timings", expanded=False):
+                st.json(st.session_state.bootstrap_timings)
+        
+        if get_submission_outbox():
+            with st.expander("📮 Submission Outbox", expanded=False):
+                st.json(get_submission_outbox().stats())
+                if st.button("🔁 Retry dead-lettered", key="debug_outbox_requeue"):
+                    requeued = get_submission_outbox().requeue_dead()
+                    st.info(f"Requeued {requeued} submission(s)")
+        
+        with st.expander("🌐 HTTP Connection Metrics", expanded=False):
+            st.json(http_transport.stats())
+        
+        with st.expander("🛡️ Dependency Health", expanded=False):
+            st.json({name: guard.stats() for name, guard in dependency_guards.items()})
+        
+        if get_async_runtime():
+            with st.expander("⚡ Async Runtime Metrics", expanded=False):
+                st.json(get_async_runtime().stats())
 
 # Chat Interface using Streamlit's native components with custom styling
 chat_container = st.container()
@@ -1504,12 +2460,8 @@ with chat_container:
                 st.markdown(message["content"])
         else:
             # Use logo as avatar if available
-            if logo_base64:
-                with st.chat_message("assistant", avatar=f"data:image/png;base64,{logo_base64}"):
-                    st.markdown(message["content"])
-            else:
-                with st.chat_message("assistant", avatar="🤖"):
-                    st.markdown(message["content"])
+            with st.chat_message("assistant", avatar=assistant_avatar):
+                st.markdown(message["content"])
 
 # Display signature modal if triggered (appears above chat input)
 display_signature_modal()
@@ -1631,10 +2583,8 @@ if prompt := st.chat_input("Type your message here..."):
             
             # Send the [SIGNATURE NOT REQUIRED] message to agent
             print(f"📤 DEBUG: Sending [SIGNATURE NOT REQUIRED] message to agent")
-            with st.chat_message("assistant", avatar=f"data:image/png;base64,{logo_base64}" if logo_base64 else "🤖"):
-                with st.spinner("Employee Onboarding Assistant is submitting your data..."):
-                    response = send_message_to_agent(signature_not_req_msg)
-                st.markdown(response)
+            with st.chat_message("assistant", avatar=assistant_avatar):
+                response = render_agent_reply(signature_not_req_msg, "Employee Onboarding Assistant is submitting your data...")
             
             # Add assistant response to session state
             st.session_state.messages.append({"role": "assistant", "content": response})
@@ -1649,10 +2599,8 @@ if prompt := st.chat_input("Type your message here..."):
             st.markdown(prompt)
         
         # Get and display agent response
-        with st.chat_message("assistant", avatar=f"data:image/png;base64,{logo_base64}" if logo_base64 else "🤖"):
-            with st.spinner("Employee Onboarding Assistant is thinking..."):
-                response = send_message_to_agent(prompt)
-            st.markdown(response)
+        with st.chat_message("assistant", avatar=assistant_avatar):
+            response = render_agent_reply(prompt, "Employee Onboarding Assistant is thinking...")
         
         # Add assistant response to session state
         st.session_state.messages.append({"role": "assistant", "content": response})
@@ -0,0 +1,179 @@
+"""
+Async I/O Runtime
+This module runs one long-lived asyncio event loop on a background thread
+per process. Streamlit script threads submit coroutines to it and wait on
+the returned futures, so independent network calls overlap and waiting on
+I/O holds no extra worker thread. Loop-bound resources (the aiohttp
+session, aio SDK clients) are created and used only on this loop.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+# Defaults: connection pool limits of the shared aiohttp session
+HTTP_CONNECTION_LIMIT = 100
+HTTP_CONNECTION_LIMIT_PER_HOST = 20
+HTTP_KEEPALIVE_SECONDS = 60
+
+
+class AsyncRuntime:
+    """
+    Dedicated event loop thread plus the async clients that live on it.
+
+    submit() schedules a coroutine and returns a concurrent.futures.Future;
+    run() and gather() block the calling thread until the results are in.
+    """
+
+    def __init__(self, name: str = "async-io"):
+        self.name = name
+        self._loop = asyncio.new_event_loop()
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._resources: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "max_in_flight": 0,
+                       "http_new_connections": 0, "http_reused_connections": 0}
+        self._in_flight = 0
+
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the runtime's loop"""
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            failed = future.cancelled() or future.exception() is not None
+            self._stats["failed" if failed else "completed"] += 1
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run (must not touch st.*)
+            timeout: Seconds to wait; the coroutine is cancelled when it passes
+
+        Returns:
+            The coroutine's result (its exception is re-raised here)
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+
+    def gather(self, *coros: Awaitable, timeout: Optional[float] = None,
+               return_exceptions: bool = False) -> List[Any]:
+        """Run several coroutines concurrently and wait for all of them"""
+        async def _gather():
+            return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+        return self.run(_gather(), timeout=timeout)
+
+    async def resource(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Create a loop-bound object once (on the loop) and reuse it afterwards"""
+        if name not in self._resources:
+            self._resources[name] = factory()
+        return self._resources[name]
+
+    async def http_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session with keep-alive connection pooling"""
+        if self._http is None or self._http.closed:
+            # Count new vs reused connections, i.e. how many TLS handshakes were saved
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._count_connection("http_new_connections"))
+            trace.on_connection_reuseconn.append(self._count_connection("http_reused_connections"))
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_CONNECTION_LIMIT,
+                    limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+                    keepalive_timeout=HTTP_KEEPALIVE_SECONDS
+                ),
+                trace_configs=[trace]
+            )
+        return self._http
+
+    def _count_connection(self, counter: str):
+        async def on_connection(session, context, params):
+            with self._lock:
+                self._stats[counter] += 1
+        return on_connection
+
+    async def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                      params: Optional[Dict[str, str]] = None, payload: Any = None,
+                      timeout: float = 10) -> Tuple[int, Dict[str, str], Any]:
+        """
+        Send one HTTP request on the shared session.
+
+        Returns:
+            (status, response headers with lower-case names, parsed JSON or None)
+        """
+        session = await self.http_session()
+        async with session.request(method, url, headers=headers, params=params, json=payload,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response_headers = {name.lower(): value for name, value in response.headers.items()}
+            return response.status, response_headers, await self._read_json(response)
+
+    async def get_json(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       params: Optional[Dict[str, str]] = None,
+                       timeout: float = 10) -> Tuple[int, Any]:
+        """GET a URL; returns (status, parsed JSON or None for non-JSON bodies)"""
+        status, _, body = await self.request("GET", url, headers=headers, params=params, timeout=timeout)
+        return status, body
+
+    async def post_json(self, url: str, payload: Any, headers: Optional[Dict[str, str]] = None,
+                        timeout: float = 10) -> Tuple[int, Any]:
+        """POST a JSON body; returns (status, parsed JSON or None for non-JSON bodies)"""
+        status, _, body = await self.request("POST", url, headers=headers, payload=payload, timeout=timeout)
+        return status, body
+
+    @staticmethod
+    async def _read_json(response: aiohttp.ClientResponse) -> Any:
+        try:
+            return await response.json(content_type=None)
+        except ValueError:
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        """Submitted/completed/failed coroutine counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """Close loop-bound clients and stop the loop thread"""
+        async def _close():
+            for resource in self._resources.values():
+                close = getattr(resource, "close", None)
+                if close:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+            if self._http is not None:
+                await self._http.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), self._loop).result(timeout=timeout)
+        except Exception as e:
+            print(f"⚠️ DEBUG: Async runtime shutdown incomplete: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
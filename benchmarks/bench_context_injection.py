@@ -0,0 +1,117 @@
+"""
+Agent Context Injection Benchmark
+Compares the legacy per-thread context preamble against the per-run
+[USER CONTEXT] block. Offline mode reports payload sizes and estimated
+tokens re-read by every later run of a conversation. Live mode (needs the
+Azure env vars from env_template.txt and an agent carrying the static
+rules) measures prompt tokens and time-to-greeting for both modes.
+
+Usage:
+    python benchmarks/bench_context_injection.py [--turns 20]
+    python benchmarks/bench_context_injection.py --live AGENT_ID [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from agent_context import (
+    GREETING_KICKOFF_MESSAGE,
+    build_user_context,
+    build_run_instructions,
+    build_legacy_context_message
+)
+
+SAMPLE_USER = {
+    "displayName": "Jane Doe",
+    "mail": "jane.doe@contoso.com",
+    "tenant_id": "72f988bf-86f1-41af-91ab-2d7cd011db47",
+    "account_type": "work",
+    "email_extraction_method": "mail"
+}
+
+# Rough English/markup ratio, good enough for comparing the two payloads
+CHARS_PER_TOKEN = 4
+
+
+def _estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def run_offline(turns):
+    context = build_user_context(SAMPLE_USER)
+    legacy = build_legacy_context_message(context)
+    per_run = build_run_instructions(context)
+
+    legacy_tokens = _estimate_tokens(legacy)
+    # Kickoff message stays in the thread; the user block is re-sent per run
+    run_tokens = _estimate_tokens(GREETING_KICKOFF_MESSAGE)
+    block_tokens = _estimate_tokens(per_run)
+
+    print(f"{'mode':>8} {'thread bytes':>13} {'per-run bytes':>14} {f'~tokens over {turns} turns':>24}")
+    print(f"{'legacy':>8} {len(legacy.encode()):>13} {0:>14} {legacy_tokens * turns:>24}")
+    print(f"{'run':>8} {len(GREETING_KICKOFF_MESSAGE.encode()):>13} {len(per_run.encode()):>14} "
+          f"{(run_tokens + block_tokens) * turns:>24}")
+
+
+def _greet(project_client, agent_id, content, additional_instructions):
+    thread = project_client.agents.threads.create()
+    try:
+        start = time.perf_counter()
+        project_client.agents.messages.create(thread_id=thread.id, role="assistant", content=content)
+        run = project_client.agents.runs.create_and_process(
+            thread_id=thread.id,
+            agent_id=agent_id,
+            additional_instructions=additional_instructions
+        )
+        seconds = time.perf_counter() - start
+        usage = getattr(run, "usage", None)
+        return seconds, getattr(usage, "prompt_tokens", None), run.status
+    finally:
+        project_client.agents.threads.delete(thread.id)
+
+
+def run_live(agent_id, repeat):
+    from azure.ai.projects import AIProjectClient
+    from azure.identity import ClientSecretCredential
+
+    project_client = AIProjectClient(
+        endpoint=os.environ["AZURE_AI_ENDPOINT"],
+        credential=ClientSecretCredential(
+            tenant_id=os.environ["AZURE_AI_TENANT_ID"],
+            client_id=os.environ["AZURE_CLIENT_ID"],
+            client_secret=os.environ["AZURE_CLIENT_SECRET"]
+        )
+    )
+    context = build_user_context(SAMPLE_USER)
+    modes = {
+        "legacy": (build_legacy_context_message(context), None),
+        "run": (GREETING_KICKOFF_MESSAGE, build_run_instructions(context))
+    }
+
+    print(f"{'mode':>8} {'time-to-greeting':>17} {'prompt tokens':>14} {'status':>10}")
+    for _ in range(repeat):
+        for mode, (content, instructions) in modes.items():
+            seconds, prompt_tokens, status = _greet(project_client, agent_id, content, instructions)
+            print(f"{mode:>8} {seconds * 1000:>15.0f}ms {str(prompt_tokens):>14} {str(status):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--live", metavar="AGENT_ID")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.live:
+        run_live(args.live, args.repeat)
+    else:
+        run_offline(args.turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+OAuth State Store Benchmark
+Measures put/consume latency of OAuthStateStore as the number of stored
+states grows, next to the legacy single-JSON-file cache it replaced.
+
+Usage:
+    python benchmarks/bench_oauth_state_store.py [--max-states 100000]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from oauth_state_store import OAuthStateStore
+
+SAMPLES = 200
+
+
+def _percentiles(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return (
+        statistics.median(samples_ms),
+        samples_ms[int(len(samples_ms) * 0.99) - 1]
+    )
+
+
+def bench_sqlite_store(checkpoints, workdir):
+    """Fill the store up to each checkpoint and sample put + consume latency"""
+    store = OAuthStateStore(os.path.join(workdir, "bench_state.db"), ttl_seconds=3600)
+    conn = store._connection()
+    stored = 0
+
+    print("\nOAuthStateStore (SQLite/WAL)")
+    print(f"{'states':>10} {'put p50':>10} {'put p99':>10} {'consume p50':>12} {'consume p99':>12}")
+    for target in checkpoints:
+        # Bulk fill in one transaction - the fill itself is not what we measure
+        now = time.time()
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO oauth_state (state, data, timestamp) VALUES (?, ?, ?)",
+            ((str(uuid.uuid4()), json.dumps({"requireSignature": "true", "timestamp": now}), now)
+             for _ in range(target - stored))
+        )
+        conn.execute("COMMIT")
+        stored = target
+
+        put_ms, consume_ms = [], []
+        for _ in range(SAMPLES):
+            state = str(uuid.uuid4())
+            start = time.perf_counter()
+            store.put(state, {"requireSignature": "true", "timestamp": time.time()})
+            put_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            store.consume(state)
+            consume_ms.append((time.perf_counter() - start) * 1000)
+
+        put_p50, put_p99 = _percentiles(put_ms)
+        consume_p50, consume_p99 = _percentiles(consume_ms)
+        print(f"{target:>10} {put_p50:>9.3f}ms {put_p99:>9.3f}ms {consume_p50:>11.3f}ms {consume_p99:>11.3f}ms")
+
+
+def bench_legacy_json(checkpoints, workdir):
+    """Legacy behaviour: read, mutate and rewrite the whole JSON file per login"""
+    path = os.path.join(workdir, "bench_state.json")
+    cache = {}
+
+    print("\nLegacy JSON file cache")
+    print(f"{'states':>10} {'save p50':>10} {'save p99':>10}")
+    for target in checkpoints:
+        now = time.time()
+        while len(cache) < target:
+            cache[str(uuid.uuid4())] = {"requireSignature": "true", "timestamp": now}
+        with open(path, "w") as f:
+            json.dump(cache, f)
+
+        save_ms = []
+        for _ in range(min(SAMPLES, 20)):
+            start = time.perf_counter()
+            with open(path, "r") as f:
+                data = json.load(f)
+            data[str(uuid.uuid4())] = {"requireSignature": "true", "timestamp": time.time()}
+            with open(path, "w") as f:
+                json.dump(data, f)
+            save_ms.append((time.perf_counter() - start) * 1000)
+
+        p50, p99 = _percentiles(save_ms)
+        print(f"{target:>10} {p50:>9.3f}ms {p99:>9.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-states", type=int, default=100_000)
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (1_000, 10_000, 100_000, 1_000_000) if n <= args.max_states]
+    with tempfile.TemporaryDirectory() as workdir:
+        bench_sqlite_store(checkpoints, workdir)
+        bench_legacy_json(checkpoints, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Tenant Roster Snapshot Benchmark
+Compares cold-start lookup latency of the Excel roster (pandas + openpyxl)
+against the compiled SQLite snapshot, at several roster sizes. Each cold
+lookup runs in a fresh interpreter so import and parse costs are included.
+
+Usage:
+    python benchmarks/bench_roster_snapshot.py [--sizes 10000 100000 1000000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Runs in a fresh interpreter: time import + load + one lookup
+COLD_EXCEL_LOOKUP = """
+import json, sys, time
+start = time.perf_counter()
+import pandas as pd
+df = pd.read_excel(sys.argv[1])
+row = df[df['userEmail'].str.lower() == sys.argv[2]]
+found = not row.empty
+print(json.dumps({"seconds": time.perf_counter() - start, "found": found}))
+"""
+
+COLD_SNAPSHOT_LOOKUP = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[3])
+from user_tenant_lookup import RosterSnapshot
+opened = time.perf_counter()
+found = RosterSnapshot(sys.argv[1]).get(sys.argv[2]) is not None
+end = time.perf_counter()
+print(json.dumps({"seconds": end - start, "open_seconds": end - opened, "found": found,
+                  "pandas_imported": "pandas" in sys.modules}))
+"""
+
+
+def _run_cold(script, *args):
+    output = subprocess.check_output([sys.executable, "-c", script, *args], text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _write_roster(path, rows):
+    import pandas as pd
+    pd.DataFrame({
+        "userEmail": [f"user{i}@tenant{i % 500}.example.com" for i in range(rows)],
+        "tenantId": [f"{i % 500:08d}-0000-0000-0000-000000000000" for i in range(rows)],
+        "clientid": ["client"] * rows,
+        "url": ["https://example.com"] * rows,
+        "clientSecret": ["secret"] * rows,
+    }).to_excel(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    from user_tenant_lookup import compile_roster_snapshot, RosterSnapshot
+
+    print(f"{'rows':>9} {'xlsx MB':>8} {'snap MB':>8} {'compile':>9} {'cold excel':>11} "
+          f"{'cold snapshot':>14} {'(open+get)':>11} {'warm lookup':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            excel_path = os.path.join(workdir, f"roster_{rows}.xlsx")
+            snapshot_path = excel_path + ".snapshot.sqlite"
+            _write_roster(excel_path, rows)
+            target = f"user{rows - 1}@tenant{(rows - 1) % 500}.example.com"
+
+            start = time.perf_counter()
+            compile_roster_snapshot(excel_path, snapshot_path)
+            compile_seconds = time.perf_counter() - start
+
+            excel = _run_cold(COLD_EXCEL_LOOKUP, excel_path, target)
+            snapshot = _run_cold(COLD_SNAPSHOT_LOOKUP, snapshot_path, target, REPO_DIR)
+            assert excel["found"] and snapshot["found"] and not snapshot["pandas_imported"]
+
+            roster = RosterSnapshot(snapshot_path)
+            start = time.perf_counter()
+            for _ in range(1000):
+                roster.get(target)
+            warm_us = (time.perf_counter() - start) * 1000
+
+            print(f"{rows:>9} {os.path.getsize(excel_path) / 1e6:>8.1f} "
+                  f"{os.path.getsize(snapshot_path) / 1e6:>8.1f} {compile_seconds:>8.2f}s "
+                  f"{excel['seconds'] * 1000:>9.0f}ms {snapshot['seconds'] * 1000:>12.1f}ms "
+                  f"{snapshot['open_seconds'] * 1000:>9.2f}ms "
+                  f"{warm_us:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
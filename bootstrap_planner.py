@@ -0,0 +1,163 @@
+"""
+Bootstrap Planner
+This module runs the post-login setup steps as a small dependency graph.
+Each stage starts as soon as the stages it depends on have finished, so
+independent network calls overlap, and every stage's start offset and
+duration are recorded for a login-to-greeting latency breakdown.
+"""
+
+import time
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class StageSkipped(Exception):
+    """Raised for a stage that did not run because a dependency failed"""
+
+
+class _Stage:
+    """A named step, the stages it needs, and what happened when it ran"""
+    __slots__ = ("name", "func", "deps", "value", "error", "started", "finished")
+
+    def __init__(self, name: str, func: Optional[Callable[[Dict[str, Any]], Any]], deps: Sequence[str]):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+class BootstrapPlan:
+    """
+    Dependency graph of bootstrap stages run on a shared executor.
+
+    Stages are added in dependency order (a stage may only depend on stages
+    already added, which rules out cycles). A stage function receives a
+    dict with the values of its dependencies; if one of them failed, the
+    stage is skipped and reports StageSkipped.
+    """
+
+    def __init__(self, executor: Executor,
+                 wrap: Optional[Callable[[Callable], Callable]] = None):
+        self.executor = executor
+        self.wrap = wrap or (lambda func: func)
+        self._stages: Dict[str, _Stage] = {}
+        self._origin = time.perf_counter()
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Sequence[str] = ()) -> None:
+        """
+        Add a stage.
+
+        Args:
+            name: Unique stage name
+            func: Callable taking {dependency name: value} and returning the stage value
+            deps: Names of stages that must finish first
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+        self._stages[name] = _Stage(name, func, deps)
+
+    def record(self, name: str, seconds: float, deps: Sequence[str] = ()) -> None:
+        """Add a stage that already ran elsewhere (e.g. the code exchange), ending now"""
+        stage = _Stage(name, None, deps)
+        stage.finished = time.perf_counter()
+        stage.started = stage.finished - seconds
+        self._origin = min(self._origin, stage.started)
+        self._stages[name] = stage
+
+    def run(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run every pending stage, each as soon as its dependencies are done.
+
+        Args:
+            timeout: Overall deadline in seconds; unfinished stages are reported as timed out
+
+        Returns:
+            {stage name: value} for the stages that succeeded
+        """
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        pending = {name: stage for name, stage in self._stages.items() if stage.finished is None}
+        running = {}
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                dep_stages = [self._stages[dep] for dep in stage.deps]
+                if any(dep.error is not None for dep in dep_stages):
+                    stage.error = StageSkipped(f"{name} skipped: a dependency failed")
+                    del pending[name]
+                elif all(dep.finished is not None for dep in dep_stages):
+                    inputs = {dep.name: dep.value for dep in dep_stages}
+                    running[self.executor.submit(self.wrap(self._run_stage), stage, inputs)] = stage
+                    del pending[name]
+
+            if not running:
+                continue
+
+            remaining = deadline - time.perf_counter() if deadline is not None else None
+            done, _ = wait(running, timeout=max(0.0, remaining) if remaining is not None else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                for stage in list(running.values()) + list(pending.values()):
+                    stage.error = TimeoutError(f"{stage.name} did not finish within {timeout} seconds")
+                break
+            for future in done:
+                running.pop(future)
+
+        return {name: stage.value for name, stage in self._stages.items()
+                if stage.finished is not None and stage.error is None}
+
+    @staticmethod
+    def _run_stage(stage: _Stage, inputs: Dict[str, Any]) -> None:
+        stage.started = time.perf_counter()
+        try:
+            stage.value = stage.func(inputs)
+        except Exception as e:
+            stage.error = e
+        finally:
+            stage.finished = time.perf_counter()
+
+    def errors(self) -> Dict[str, BaseException]:
+        """Stages that failed, were skipped or timed out"""
+        return {name: stage.error for name, stage in self._stages.items() if stage.error is not None}
+
+    def timings(self) -> List[Dict[str, Any]]:
+        """Start offset and duration (ms) of every stage, in start order"""
+        rows = []
+        for stage in self._stages.values():
+            ran = stage.started is not None and stage.finished is not None
+            rows.append({
+                "stage": stage.name,
+                "deps": stage.deps,
+                "start_ms": round((stage.started - self._origin) * 1000, 1) if ran else None,
+                "duration_ms": round((stage.finished - stage.started) * 1000, 1) if ran else None,
+                "status": "ok" if stage.error is None else type(stage.error).__name__
+            })
+        return sorted(rows, key=lambda row: (row["start_ms"] is None, row["start_ms"] or 0))
+
+    def critical_path(self) -> List[str]:
+        """Chain of stages that ended last - where shaving time shortens the bootstrap"""
+        finished = [stage for stage in self._stages.values() if stage.finished is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda stage: stage.finished)]
+        while path[-1].deps:
+            deps = [self._stages[dep] for dep in path[-1].deps if self._stages[dep].finished is not None]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda stage: stage.finished))
+        return [stage.name for stage in reversed(path)]
+
+    def format_timings(self) -> str:
+        """Plain-text waterfall of the stage timings for the logs"""
+        lines = [f"{'stage':<12} {'start':>9} {'duration':>10}  status"]
+        for row in self.timings():
+            start = f"{row['start_ms']:.0f}ms" if row["start_ms"] is not None else "-"
+            duration = f"{row['duration_ms']:.0f}ms" if row["duration_ms"] is not None else "-"
+            lines.append(f"{row['stage']:<12} {start:>9} {duration:>10}  {row['status']}")
+        lines.append(f"critical path: {' -> '.join(self.critical_path())}")
+        return "\n".join(lines)
@@ -0,0 +1,249 @@
+"""
+Dependency Guards
+This module protects the app from a slow or failing downstream service. A
+circuit breaker stops calling a dependency after repeated failures and lets
+a single probe through after a cool-down; an AIMD concurrency limit caps how
+many calls may be in flight at once, growing it slowly while calls succeed
+and halving it when they fail. Calls that are not allowed fail immediately
+instead of holding a server thread for a full timeout.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Defaults: consecutive failures that open the circuit, seconds before a probe
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+# Defaults: concurrency limit bounds and AIMD factors
+LIMIT_INITIAL = 16
+LIMIT_MIN = 2
+LIMIT_MAX = 64
+LIMIT_DECREASE_FACTOR = 0.5
+
+
+class DependencyUnavailable(Exception):
+    """Raised instead of calling a dependency whose circuit is open or limit is reached"""
+
+
+class CircuitOpenError(DependencyUnavailable):
+    """The dependency failed repeatedly and is not being called right now"""
+
+
+class ConcurrencyLimitExceeded(DependencyUnavailable):
+    """Too many calls to the dependency are already in flight"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    closed -> open after failure_threshold failures in a row; open ->
+    half_open once reset_timeout has passed, admitting one probe call;
+    the probe's outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (caller holds the guard's lock)"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == STATE_HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = STATE_CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                self.trips += 1
+            self.state = STATE_OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is admitted (0 unless open)"""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    Every success raises the limit by 1/limit (about +1 per limit's worth
+    of calls); a failure multiplies it by decrease_factor.
+    """
+
+    def __init__(self, initial: float = LIMIT_INITIAL, minimum: float = LIMIT_MIN,
+                 maximum: float = LIMIT_MAX, decrease_factor: float = LIMIT_DECREASE_FACTOR):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.limit = float(initial)
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, succeeded: bool) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if succeeded:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+def _is_exception(error: BaseException) -> bool:
+    return isinstance(error, Exception)
+
+
+class GuardSlot:
+    """The call slot held inside DependencyGuard.slot()"""
+
+    def __init__(self, guard: "DependencyGuard"):
+        self.guard = guard
+        self.held = True
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """
+        Give the slot back for a stretch of local work between API calls
+        (e.g. running tools mid-stream) and take a new one afterwards.
+
+        Raises:
+            DependencyUnavailable: If no slot is free when the block ends
+        """
+        # Everything up to here worked - record it as a success
+        self.guard.release(True)
+        self.held = False
+        yield
+        self.guard.acquire()
+        self.held = True
+
+
+class DependencyGuard:
+    """
+    Circuit breaker plus AIMD limit for one downstream dependency.
+
+    Use guard.call(func, ...), `with guard.slot():`, or acquire() and
+    release(succeeded) when the outcome is not an exception (e.g. a
+    generator that reports errors as text). In slot() and call(), exceptions
+    for which is_failure(error) is true count against the dependency;
+    anything else (a per-request client error, or GeneratorExit when a
+    consumer stops reading a generator) returns the slot without recording
+    an outcome.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker = None, limiter: AIMDLimiter = None,
+                 is_failure: Callable[[BaseException], bool] = _is_exception):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AIMDLimiter()
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "abandoned": 0,
+                       "rejected_open": 0, "rejected_limit": 0}
+
+    def acquire(self) -> None:
+        """Take a call slot or raise DependencyUnavailable without calling anything"""
+        with self._lock:
+            if not self.breaker.allow():
+                self._stats["rejected_open"] += 1
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable (retry in {self.breaker.retry_after():.0f}s)"
+                )
+            if not self.limiter.try_acquire():
+                # A half-open probe that cannot run must not block later probes
+                if self.breaker.state == STATE_HALF_OPEN:
+                    self.breaker._probe_in_flight = False
+                self._stats["rejected_limit"] += 1
+                raise ConcurrencyLimitExceeded(
+                    f"{self.name} is busy ({self.limiter.in_flight} calls in flight)"
+                )
+            self._stats["calls"] += 1
+
+    def release(self, succeeded: Optional[bool]) -> None:
+        """
+        Return a slot taken by acquire() and record the call's outcome.
+
+        succeeded=None returns the slot without judging the dependency (the
+        call was abandoned by our side); a half-open probe is freed for the
+        next caller.
+        """
+        with self._lock:
+            if succeeded is None:
+                self.limiter.in_flight = max(0, self.limiter.in_flight - 1)
+                if self.breaker.state == STATE_HALF_OPEN:
+                    self.breaker._probe_in_flight = False
+                self._stats["abandoned"] += 1
+                return
+            self.limiter.release(succeeded)
+            if succeeded:
+                self.breaker.record_success()
+                self._stats["successes"] += 1
+            else:
+                self.breaker.record_failure()
+                self._stats["failures"] += 1
+
+    @contextmanager
+    def slot(self) -> Iterator[GuardSlot]:
+        """Hold one call slot for the duration of the block"""
+        self.acquire()
+        slot = GuardSlot(self)
+        succeeded = True
+        try:
+            yield slot
+        except BaseException as error:
+            succeeded = False if self.is_failure(error) else None
+            raise
+        finally:
+            if slot.held:
+                self.release(succeeded)
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in a slot"""
+        with self.slot():
+            return func(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state, trip count, current limit and call counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "state": self.breaker.state,
+                "trips": self.breaker.trips,
+                "retry_after_seconds": round(self.breaker.retry_after(), 1),
+                "concurrency_limit": int(self.limiter.limit),
+                "in_flight": self.limiter.in_flight
+            })
+        return stats
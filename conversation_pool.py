@@ -0,0 +1,157 @@
+"""
+Conversation Thread Pool
+This module keeps a small number of pre-created, empty agent conversation
+threads per active agent, so starting a session or a new conversation can
+take a ready thread instead of waiting on threads.create().
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Defaults: threads kept ready per agent, and how long an unused thread or
+# an agent nobody has asked for stays in the pool
+THREAD_POOL_TARGET_SIZE = 2
+THREAD_POOL_MAX_IDLE_SECONDS = 1800
+THREAD_POOL_SWEEP_INTERVAL = 60
+
+
+class ConversationThreadPool:
+    """
+    Bounded pool of pre-created conversation threads, keyed by agent id.
+
+    acquire() never blocks on the network: it returns a ready thread id or
+    None (caller then creates one synchronously) and schedules an
+    asynchronous refill. Threads older than max_idle_seconds are discarded,
+    and agents that were not used within that window stop being refilled.
+    """
+
+    def __init__(self, create_thread: Callable[[], str],
+                 delete_thread: Optional[Callable[[str], None]] = None,
+                 target_size: int = THREAD_POOL_TARGET_SIZE,
+                 max_idle_seconds: float = THREAD_POOL_MAX_IDLE_SECONDS,
+                 max_workers: int = 2):
+        self.create_thread = create_thread
+        self.delete_thread = delete_thread
+        self.target_size = target_size
+        self.max_idle_seconds = max_idle_seconds
+
+        self._ready: Dict[str, deque] = {}        # agent_id -> deque[(thread_id, created_at)]
+        self._pending: Dict[str, int] = {}        # agent_id -> refills in flight
+        self._last_used: Dict[str, float] = {}    # agent_id -> last acquire/warm time
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thread-prewarm")
+        self._stats = {"hits": 0, "misses": 0, "created": 0, "expired": 0, "create_errors": 0}
+
+        self._stop_event = threading.Event()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="thread-pool-sweep", daemon=True)
+        self._sweeper.start()
+
+    def acquire(self, agent_id: str) -> Optional[str]:
+        """
+        Take a ready thread for an agent.
+
+        Args:
+            agent_id: Agent the conversation is for
+
+        Returns:
+            Thread id, or None if no ready thread is available right now
+        """
+        thread_id = None
+        expired = []
+        now = time.time()
+
+        with self._lock:
+            self._last_used[agent_id] = now
+            ready = self._ready.setdefault(agent_id, deque())
+            while ready:
+                candidate, created_at = ready.popleft()
+                if now - created_at < self.max_idle_seconds:
+                    thread_id = candidate
+                    break
+                expired.append(candidate)
+            self._stats["hits" if thread_id else "misses"] += 1
+
+        self._discard(expired)
+        self._schedule_refill(agent_id)
+        return thread_id
+
+    def warm(self, agent_id: str) -> None:
+        """Mark an agent active and start filling its pool in the background"""
+        with self._lock:
+            self._last_used[agent_id] = time.time()
+        self._schedule_refill(agent_id)
+
+    def _schedule_refill(self, agent_id: str) -> None:
+        """Queue enough background creations to bring the pool to target size"""
+        with self._lock:
+            missing = self.target_size - len(self._ready.get(agent_id, ())) - self._pending.get(agent_id, 0)
+            if missing <= 0:
+                return
+            self._pending[agent_id] = self._pending.get(agent_id, 0) + missing
+
+        for _ in range(missing):
+            self._executor.submit(self._create_one, agent_id)
+
+    def _create_one(self, agent_id: str) -> None:
+        """Create one thread and add it to the agent's pool (runs on the executor)"""
+        try:
+            thread_id = self.create_thread()
+            with self._lock:
+                self._ready.setdefault(agent_id, deque()).append((thread_id, time.time()))
+                self._stats["created"] += 1
+        except Exception as e:
+            with self._lock:
+                self._stats["create_errors"] += 1
+            print(f"❌ DEBUG: Thread pre-warm failed for agent {agent_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending[agent_id] = max(0, self._pending.get(agent_id, 0) - 1)
+
+    def _discard(self, thread_ids) -> None:
+        """Delete expired threads in the background"""
+        if not thread_ids:
+            return
+        with self._lock:
+            self._stats["expired"] += len(thread_ids)
+        if self.delete_thread:
+            for thread_id in thread_ids:
+                self._executor.submit(self._delete_quietly, thread_id)
+
+    def _delete_quietly(self, thread_id: str) -> None:
+        try:
+            self.delete_thread(thread_id)
+        except Exception as e:
+            print(f"⚠️ DEBUG: Could not delete expired thread {thread_id}: {e}")
+
+    def _sweep_loop(self) -> None:
+        """Expire old threads and forget agents that went idle"""
+        while not self._stop_event.wait(THREAD_POOL_SWEEP_INTERVAL):
+            now = time.time()
+            expired = []
+            with self._lock:
+                for agent_id in list(self._ready):
+                    ready = self._ready[agent_id]
+                    while ready and now - ready[0][1] >= self.max_idle_seconds:
+                        expired.append(ready.popleft()[0])
+                    if now - self._last_used.get(agent_id, 0) >= self.max_idle_seconds:
+                        # Inactive agent: drop its pool entirely, no refill
+                        expired.extend(thread_id for thread_id, _ in ready)
+                        del self._ready[agent_id]
+                        self._last_used.pop(agent_id, None)
+            self._discard(expired)
+
+    def stats(self) -> Dict[str, int]:
+        """Pool counters plus the number of ready threads across all agents"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ready"] = sum(len(ready) for ready in self._ready.values())
+            stats["agents"] = len(self._ready)
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop background work (ready threads are left as they are)"""
+        self._stop_event.set()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,155 @@
+"""
+HTTP Transport
+This module provides the process-wide synchronous HTTP layer: one pooled
+requests.Session per host with keep-alive, sized connection pools, default
+timeouts and a retry policy, plus counters showing how often a request
+reused a warm connection instead of paying a new TCP+TLS handshake.
+"""
+
+import time
+import threading
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Defaults: connections kept per host, (connect, read) timeouts in seconds
+HTTP_POOL_MAXSIZE = 20
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 10
+
+# Retries: connection failures for any method (nothing was sent yet); throttling
+# and gateway errors only for idempotent methods, honouring Retry-After
+HTTP_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class HttpTransport:
+    """
+    Per-host pooled requests sessions shared by every Streamlit session.
+
+    requests.Session is safe to share for plain request calls (no cookie or
+    header mutation), and urllib3 hands each thread its own pooled
+    connection, so concurrent sessions reuse keep-alive connections.
+    """
+
+    def __init__(self, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT,
+                 retries: int = HTTP_RETRIES,
+                 backoff_factor: float = HTTP_BACKOFF_FACTOR):
+        self.pool_maxsize = pool_maxsize
+        self.default_timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def session(self, url: str) -> requests.Session:
+        """Pooled session for the host of url (created on first use)"""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = self._new_session()
+            return session
+
+    def _new_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            status_forcelist=HTTP_RETRY_STATUSES,
+            backoff_factor=self.backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                              max_retries=retry, pool_block=False)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method: str, url: str,
+                timeout: Optional[Union[float, Tuple[float, float]]] = None,
+                **kwargs) -> requests.Response:
+        """
+        Send a request on the host's pooled session.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            timeout: Read timeout or (connect, read); defaults to the transport's
+            **kwargs: Passed to requests (headers, json, params, ...)
+
+        Returns:
+            The response (HTTP errors are not raised)
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        elif not isinstance(timeout, tuple):
+            timeout = (min(self.default_timeout[0], timeout), timeout)
+
+        host = urlsplit(url).netloc.lower()
+        start = time.perf_counter()
+        try:
+            response = self.session(url).request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(host, time.perf_counter() - start, failed=True)
+            raise
+        self._record(host, time.perf_counter() - start, failed=False)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(host, {"requests": 0, "errors": 0, "total_ms": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += 1 if failed else 0
+            stats["total_ms"] += seconds * 1000
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-host request counters and connection reuse.
+
+        new_connections counts TCP+TLS handshakes (from urllib3's pools), so
+        reuse_ratio is the share of requests served on an existing connection.
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+            stats = {host: dict(values) for host, values in self._stats.items()}
+
+        for host, session in sessions.items():
+            connections = wire_requests = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        connections += pool.num_connections
+                        wire_requests += pool.num_requests
+            values = stats.setdefault(host, {"requests": 0, "errors": 0, "total_ms": 0.0})
+            values["new_connections"] = connections
+            values["reuse_ratio"] = round(1 - connections / wire_requests, 3) if wire_requests else 0.0
+            values["avg_ms"] = round(values["total_ms"] / values["requests"], 1) if values["requests"] else 0.0
+            values["total_ms"] = round(values["total_ms"], 1)
+        return stats
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
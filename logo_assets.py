@@ -0,0 +1,86 @@
+"""
+Logo Asset Utility
+This module prepares the resized logo variants (avatar, header, login and
+favicon) once per process and writes them into Streamlit's static folder so
+the UI can reference them by URL instead of inlining base64 data.
+"""
+
+import os
+from typing import Optional, Dict
+
+# Source logo and the folder Streamlit serves under "app/static/"
+# (requires `enableStaticServing = true` in .streamlit/config.toml).
+# Streamlit resolves ./static next to the main script, so anchor both paths here.
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_SOURCE_PATH = os.path.join(APP_DIR, "assets", "logo.png")
+STATIC_DIR = os.path.join(APP_DIR, "static")
+STATIC_URL_PREFIX = "app/static"
+
+# Variant name -> (file name, max edge in pixels)
+# Sizes are 2x the CSS display size so the logo stays sharp on HiDPI screens
+LOGO_VARIANTS = {
+    "avatar": ("logo_avatar.png", 70),    # chat bubble avatar, displayed at 35px
+    "header": ("logo_header.png", 120),   # chat page header, displayed at 60px
+    "login": ("logo_login.png", 160),     # login page title, displayed at 80px
+    "favicon": ("logo_favicon.png", 32),  # browser tab icon
+}
+
+
+def _variant_is_fresh(source_path: str, variant_path: str) -> bool:
+    """Check whether a generated variant is newer than the source logo"""
+    return (
+        os.path.exists(variant_path)
+        and os.path.getmtime(variant_path) >= os.path.getmtime(source_path)
+    )
+
+
+def prepare_logo_variants(source_path: str = LOGO_SOURCE_PATH,
+                          static_dir: str = STATIC_DIR) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Generate resized logo variants and write them into the static folder.
+
+    Args:
+        source_path: Path to the original logo image
+        static_dir: Folder served by Streamlit static file serving
+
+    Returns:
+        Dictionary mapping variant name to {'path': local file, 'url': static URL},
+        or None if the source logo is missing or cannot be processed
+    """
+    if not os.path.exists(source_path):
+        print(f"⚠️ Logo file not found at {source_path}")
+        return None
+
+    try:
+        from PIL import Image
+
+        os.makedirs(static_dir, exist_ok=True)
+        variants = {}
+
+        with Image.open(source_path) as source:
+            source = source.convert("RGBA")
+
+            for name, (file_name, max_edge) in LOGO_VARIANTS.items():
+                variant_path = os.path.join(static_dir, file_name)
+
+                # Only re-render when the source logo changed since last deploy
+                if not _variant_is_fresh(source_path, variant_path):
+                    variant = source.copy()
+                    variant.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+                    # Write to a temp file first so concurrent workers never
+                    # serve a half-written image
+                    tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+                    variant.save(tmp_path, format="PNG", optimize=True)
+                    os.replace(tmp_path, variant_path)
+
+                variants[name] = {
+                    "path": variant_path,
+                    "url": f"{STATIC_URL_PREFIX}/{file_name}"
+                }
+
+        return variants
+
+    except Exception as e:
+        print(f"⚠️ Could not prepare logo variants: {e}")
+        return None
@@ -0,0 +1,131 @@
+"""
+OAuth State Store
+This module keeps the per-login OAuth `state` entries (e.g. requireSignature)
+that must survive the Microsoft redirect. Entries live in a SQLite database in
+WAL mode with single-key atomic put/consume and background TTL expiry.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from typing import Optional, Dict
+
+# Default location and lifetime of stored OAuth states
+OAUTH_STATE_DB = os.path.join(tempfile.gettempdir(), "streamlit_oauth_state.db")
+OAUTH_STATE_TTL_SECONDS = 600  # Sign-in must complete within 10 minutes
+OAUTH_STATE_PURGE_INTERVAL = 60
+
+
+class OAuthStateStore:
+    """
+    Concurrent, TTL-evicting key/value store for OAuth `state` parameters.
+
+    Every operation touches a single primary-key row, so latency stays flat
+    regardless of how many states are stored. Each thread gets its own
+    SQLite connection; WAL mode lets readers and the writer run in parallel.
+    """
+
+    def __init__(self, db_path: str = OAUTH_STATE_DB,
+                 ttl_seconds: float = OAUTH_STATE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._purge_thread = None
+        self._stop_event = threading.Event()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS oauth_state (
+                state TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_oauth_state_ts ON oauth_state(timestamp)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (autocommit, explicit transactions)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, state: str, data: Dict) -> None:
+        """Store data for a state; data['timestamp'] (if present) drives expiry"""
+        timestamp = data.get("timestamp", time.time())
+        self._connection().execute(
+            "INSERT OR REPLACE INTO oauth_state (state, data, timestamp) VALUES (?, ?, ?)",
+            (state, json.dumps(data), timestamp)
+        )
+
+    def get(self, state: str) -> Optional[Dict]:
+        """Read a state without consuming it; expired entries are not returned"""
+        row = self._connection().execute(
+            "SELECT data FROM oauth_state WHERE state = ? AND timestamp >= ?",
+            (state, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def consume(self, state: str) -> Optional[Dict]:
+        """
+        Atomically read and delete a state (one-shot).
+        A replayed or concurrent callback with the same state gets None.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data, timestamp FROM oauth_state WHERE state = ?", (state,)
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM oauth_state WHERE state = ?", (state,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if not row or row[1] < time.time() - self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def purge_expired(self) -> int:
+        """Delete all expired states, returning how many were removed"""
+        cursor = self._connection().execute(
+            "DELETE FROM oauth_state WHERE timestamp < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+    def count(self) -> int:
+        """Number of stored states (including not-yet-purged expired ones)"""
+        return self._connection().execute("SELECT COUNT(*) FROM oauth_state").fetchone()[0]
+
+    def start_background_purge(self, interval_seconds: float = OAUTH_STATE_PURGE_INTERVAL) -> None:
+        """Start a daemon thread that purges expired states periodically"""
+        if self._purge_thread and self._purge_thread.is_alive():
+            return
+
+        def _purge_loop():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    removed = self.purge_expired()
+                    if removed:
+                        print(f"🔍 DEBUG: Purged {removed} expired OAuth states")
+                except Exception as e:
+                    print(f"❌ DEBUG: OAuth state purge failed: {e}")
+
+        self._stop_event.clear()
+        self._purge_thread = threading.Thread(
+            target=_purge_loop, name="oauth-state-purge", daemon=True
+        )
+        self._purge_thread.start()
+
+    def stop_background_purge(self) -> None:
+        """Stop the background purge thread"""
+        self._stop_event.set()
@@ -0,0 +1,205 @@
+"""
+Agent Run Waiter
+This module waits for agent runs that the app started itself. Runs are
+tracked by id; a waiter wakes immediately when a stream reports the run
+finished, and otherwise polls that single run with jittered exponential
+backoff until a deadline. A run waiting for tool outputs is settled for the
+caller driving it, but still active for anyone who wants to post to its
+thread.
+"""
+
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Run statuses after which nothing more happens without our input
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+ACTION_RUN_STATUSES = {"requires_action"}
+
+# Polling schedule: 0.25s, 0.5s, 1s, 2s, 2s... each +/- 50% jitter
+RUN_POLL_INITIAL_DELAY = 0.25
+RUN_POLL_MAX_DELAY = 2.0
+RUN_POLL_MULTIPLIER = 2.0
+RUN_POLL_JITTER = 0.5
+
+
+class RunWaitTimeout(Exception):
+    """Raised when a run did not settle before its deadline"""
+
+
+def run_status(status: Any) -> str:
+    """Lower-case status text of a run status (SDK RunStatus enum or plain string)"""
+    return str(getattr(status, "value", status)).lower()
+
+
+class RunWaiter:
+    """
+    Tracks runs we started and waits for them to settle.
+
+    get_run(thread_id, run_id) fetches one run. Streams call notify() with
+    each run status they see, which records it and cuts a waiter's backoff
+    sleep short so it picks up the final state with a single poll.
+    """
+
+    def __init__(self, get_run: Callable[[str, str], Any],
+                 cancel_run: Optional[Callable[[str, str], Any]] = None,
+                 initial_delay: float = RUN_POLL_INITIAL_DELAY,
+                 max_delay: float = RUN_POLL_MAX_DELAY,
+                 multiplier: float = RUN_POLL_MULTIPLIER,
+                 jitter: float = RUN_POLL_JITTER):
+        self.get_run = get_run
+        self.cancel_run = cancel_run
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+        # (thread_id, run_id) -> {"status": str, "event": threading.Event}
+        self._runs: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {"waits": 0, "polls": 0, "event_wakeups": 0, "timeouts": 0,
+                       "poll_errors": 0, "cancelled": 0, "max_polls": 0}
+
+    def track(self, thread_id: str, run_id: str, status: str = "queued") -> None:
+        """Start tracking a run we created"""
+        with self._lock:
+            self._runs.setdefault((thread_id, run_id), {"status": status, "event": threading.Event()})
+
+    def notify(self, thread_id: str, run_id: str, status: str) -> None:
+        """Record a status seen on a stream; wakes waiters once the run settles"""
+        status = run_status(status)
+        with self._lock:
+            record = self._runs.setdefault((thread_id, run_id), {"status": status, "event": threading.Event()})
+            record["status"] = status
+            if self._is_settled(status):
+                record["event"].set()
+                self._stats["event_wakeups"] += 1
+                if self._is_finished(status):
+                    # Waiters keep their reference to the record, so it can be dropped now
+                    self._runs.pop((thread_id, run_id), None)
+                else:
+                    # Needs tool outputs - later waits must poll again
+                    record["event"] = threading.Event()
+
+    def active_runs(self, thread_id: str) -> List[str]:
+        """Run ids on a thread that have not finished (including those waiting for tool outputs)"""
+        with self._lock:
+            return [run_id for (tid, run_id), record in self._runs.items()
+                    if tid == thread_id and not self._is_finished(record["status"])]
+
+    @staticmethod
+    def _is_finished(status: Any) -> bool:
+        return run_status(status) in TERMINAL_RUN_STATUSES
+
+    @staticmethod
+    def _is_settled(status: Any) -> bool:
+        status = run_status(status)
+        return status in TERMINAL_RUN_STATUSES or status in ACTION_RUN_STATUSES
+
+    def wait(self, thread_id: str, run_id: str, timeout: float = 30,
+             cancel_on_timeout: bool = False, until_finished: bool = False) -> Any:
+        """
+        Wait until a run completes, fails or needs tool outputs.
+
+        Args:
+            thread_id: Thread the run belongs to
+            run_id: Run to wait for
+            timeout: Deadline in seconds
+            cancel_on_timeout: Cancel the run if the deadline passes
+            until_finished: Keep waiting through requires_action until the run ends
+
+        Returns:
+            The settled run object
+
+        Raises:
+            RunWaitTimeout: If the run did not settle before the deadline
+        """
+        self.track(thread_id, run_id)
+        with self._lock:
+            record = self._runs[(thread_id, run_id)]
+        settled = self._is_finished if until_finished else self._is_settled
+
+        deadline = time.monotonic() + timeout
+        delay = self.initial_delay
+        polls = 0
+
+        try:
+            while True:
+                try:
+                    polls += 1
+                    run = self.get_run(thread_id, run_id)
+                    status = run_status(run.status)
+                    with self._lock:
+                        record["status"] = status
+                    if settled(status):
+                        return run
+                except Exception as e:
+                    # A failed poll is not proof the run finished - keep trying until the deadline
+                    with self._lock:
+                        self._stats["poll_errors"] += 1
+                    print(f"⚠️ DEBUG: Polling run {run_id} failed: {e}")
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    if cancel_on_timeout and self.cancel_run:
+                        self._cancel(thread_id, run_id)
+                    raise RunWaitTimeout(f"Run {run_id} still {record['status']} after {timeout}s")
+
+                # Sleep with jitter, waking early (for one final poll) if a
+                # stream reports the run settled. The wake-up is used once: if
+                # that poll lags the stream or fails, the backoff applies again.
+                sleep_for = delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+                event = record["event"]
+                if event.wait(min(sleep_for, remaining)):
+                    event.clear()
+                delay = min(delay * self.multiplier, self.max_delay)
+        finally:
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["polls"] += polls
+                self._stats["max_polls"] = max(self._stats["max_polls"], polls)
+                if self._is_finished(record["status"]):
+                    self._runs.pop((thread_id, run_id), None)
+            print(f"🔍 DEBUG: Run {run_id} wait finished ({record['status']}) after {polls} poll(s)")
+
+    def wait_for_thread(self, thread_id: str, timeout: float = 30) -> bool:
+        """
+        Wait for every tracked run on a thread to finish; returns False on timeout.
+
+        A run still waiting for tool outputs here was abandoned by the turn
+        driving it (e.g. a rerun interrupted tool submission) and would block
+        the thread until it expires, so it is cancelled.
+        """
+        deadline = time.monotonic() + timeout
+        for run_id in self.active_runs(thread_id):
+            try:
+                run = self.wait(thread_id, run_id, timeout=max(0.0, deadline - time.monotonic()))
+                if run_status(run.status) in ACTION_RUN_STATUSES:
+                    if not self.cancel_run:
+                        return False
+                    print(f"⚠️ DEBUG: Cancelling run {run_id} abandoned in {run.status}")
+                    self._cancel(thread_id, run_id)
+                    self.wait(thread_id, run_id, timeout=max(0.0, deadline - time.monotonic()),
+                              until_finished=True)
+            except RunWaitTimeout:
+                return False
+        return True
+
+    def _cancel(self, thread_id: str, run_id: str) -> None:
+        try:
+            self.cancel_run(thread_id, run_id)
+            with self._lock:
+                self._stats["cancelled"] += 1
+        except Exception as e:
+            print(f"⚠️ DEBUG: Could not cancel run {run_id}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Wait/poll counters, including average polls per wait"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked"] = len(self._runs)
+        stats["avg_polls_per_wait"] = stats["polls"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
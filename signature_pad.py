@@ -0,0 +1,83 @@
+"""
+Signature Pad Component
+This module wraps a small Streamlit custom component (signature_pad_frontend)
+for drawing signatures. Strokes are kept in the browser while the user
+draws and Clear is handled there too; only pressing Accept sends one value
+to the server - a PNG of the pad or the stroke point lists - instead of
+the full canvas pixel array on every interaction. After Accept the pad stays
+locked until the server either takes the signature or rejects it with
+reject_signature().
+"""
+
+import os
+import base64
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+from PIL import Image
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "signature_pad_frontend")
+
+_signature_pad = components.declare_component("signature_pad", path=FRONTEND_DIR)
+
+
+def _decode_png(data_url: str) -> np.ndarray:
+    """RGBA pixels of a "data:image/png;base64,..." URL"""
+    encoded = data_url.split(",", 1)[1] if data_url.startswith("data:") else data_url
+    with Image.open(BytesIO(base64.b64decode(encoded))) as image:
+        return np.asarray(image.convert("RGBA"))
+
+
+def _decode_strokes(strokes: List[List[float]]) -> List[np.ndarray]:
+    """Nx2 point arrays from flat [x0, y0, x1, y1, ...] lists"""
+    return [np.asarray(flat[:len(flat) // 2 * 2], dtype=np.float64).reshape(-1, 2)
+            for flat in strokes if len(flat) >= 2]
+
+
+def signature_pad(key: str, width: int = 800, height: int = 300,
+                  stroke_width: int = 3, mode: str = "raster") -> Optional[Dict[str, Any]]:
+    """
+    Render the signature pad.
+
+    Args:
+        key: Widget key
+        width: Pad width in canvas pixels (the pad scales to the column width)
+        height: Pad height in canvas pixels
+        stroke_width: Pen width in canvas pixels
+        mode: "raster" to receive a PNG of the pad, "strokes" for the point lists
+
+    Returns:
+        None until the user presses Accept; then, once per Accept, a dict with
+        "mode", "stroke_width" and either "image_data" (HxWx4 RGBA array) or
+        "paths" (list of Nx2 point arrays)
+    """
+    # The pad unlocks Accept only when rejected_id names the value it sent
+    rejected = st.session_state.get(f"{key}_rejected") or {}
+    value = _signature_pad(width=width, height=height, stroke_width=stroke_width, mode=mode,
+                           rejected_id=rejected.get("id"), message=rejected.get("reason", ""),
+                           key=key, default=None)
+    # The component keeps returning its last value on later reruns
+    seen_key = f"{key}_accepted_id"
+    if not value or value.get("id") == st.session_state.get(seen_key):
+        return None
+    st.session_state[seen_key] = value.get("id")
+    st.session_state.pop(f"{key}_rejected", None)
+
+    result = {"mode": value.get("mode", mode), "stroke_width": value.get("stroke_width", stroke_width)}
+    if "strokes" in value:
+        result["paths"] = _decode_strokes(value["strokes"])
+    elif value.get("png"):
+        result["image_data"] = _decode_png(value["png"])
+    return result
+
+
+def reject_signature(key: str, reason: str) -> None:
+    """
+    Reject the value just returned by signature_pad(): reruns the script so
+    the pad shows reason and lets the user accept a new drawing.
+    """
+    st.session_state[f"{key}_rejected"] = {"id": st.session_state.get(f"{key}_accepted_id"), "reason": reason}
+    st.rerun()
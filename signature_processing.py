@@ -0,0 +1,234 @@
+"""
+Signature Processing
+This module turns the raw RGBA canvas of the signature pad into a compact
+image: it finds the ink, crops to it with a small margin, scales it to a
+fixed height and stores it as a 1-bit (or few-level grey) PNG, or as
+lossless WebP. Signatures captured as strokes (see signature_strokes.py)
+are rendered through the same encoder on demand. Drawings are scored so
+near-empty scribbles can be rejected before they reach the agent or the
+Logic App.
+"""
+
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, features
+
+from signature_strokes import (
+    STROKES_FORMAT, build_strokes, decode_strokes, encode_strokes, rasterize_strokes
+)
+
+# Pixels darker than this (0-255, composited over white) count as ink
+SIGNATURE_INK_THRESHOLD = 200
+
+# Output geometry: margin around the ink (canvas pixels) and final height
+SIGNATURE_PADDING = 8
+SIGNATURE_TARGET_HEIGHT = 120
+
+# "1bit" = black/white; "palette" = a few grey levels that keep antialiased edges
+SIGNATURE_ENCODING = "1bit"
+SIGNATURE_PALETTE_LEVELS = 4
+
+# Quality gate: ink pixels and ink width (canvas pixels) of a believable signature
+SIGNATURE_MIN_INK_PIXELS = 300
+SIGNATURE_MIN_WIDTH = 60
+SIGNATURE_MIN_QUALITY = 0.5
+
+
+class SignatureRejected(ValueError):
+    """Raised when the canvas holds no usable signature"""
+
+
+def ink_intensity(image_data: np.ndarray) -> np.ndarray:
+    """
+    Grey level of an RGBA (or RGB) canvas composited over white.
+
+    Args:
+        image_data: HxWx4 or HxWx3 array (uint8 or float 0-255)
+
+    Returns:
+        HxW float32 array, 0 = black ink, 255 = white paper
+    """
+    pixels = np.asarray(image_data, dtype=np.float32)
+    luma = pixels[..., 0] * 0.299 + pixels[..., 1] * 0.587 + pixels[..., 2] * 0.114
+    if pixels.shape[-1] == 4:
+        alpha = pixels[..., 3] / 255.0
+        luma = 255.0 - alpha * (255.0 - luma)
+    return luma
+
+
+def ink_bbox(mask: np.ndarray, padding: int = 0) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (top, bottom, left, right; exclusive ends) of the ink plus padding"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    height, width = mask.shape
+    return (max(0, int(rows[0]) - padding), min(height, int(rows[-1]) + 1 + padding),
+            max(0, int(cols[0]) - padding), min(width, int(cols[-1]) + 1 + padding))
+
+
+def signature_quality(mask: np.ndarray) -> Dict[str, Any]:
+    """
+    Score how much the ink looks like a signature rather than a dot or a tick.
+
+    The score (0-1) is the product of the ink amount, the ink width and how
+    evenly the ink spans that width, each relative to a modest minimum.
+    """
+    ink_pixels = int(mask.sum())
+    bbox = ink_bbox(mask)
+    if bbox is None:
+        return {"score": 0.0, "ink_pixels": 0, "ink_width": 0, "ink_height": 0, "column_coverage": 0.0}
+
+    top, bottom, left, right = bbox
+    columns = mask[top:bottom, left:right].any(axis=0)
+    coverage = float(columns.mean())
+    score = (min(1.0, ink_pixels / SIGNATURE_MIN_INK_PIXELS)
+             * min(1.0, (right - left) / SIGNATURE_MIN_WIDTH)
+             * min(1.0, coverage / 0.5))
+    return {
+        "score": round(score, 3),
+        "ink_pixels": ink_pixels,
+        "ink_width": right - left,
+        "ink_height": bottom - top,
+        "column_coverage": round(coverage, 3)
+    }
+
+
+def _quantize(grey: np.ndarray, encoding: str) -> Image.Image:
+    """Reduce a grey image (0-255) to 1 bit or a small grey palette"""
+    if encoding == "1bit":
+        return Image.fromarray(grey >= SIGNATURE_INK_THRESHOLD).convert("1")
+
+    levels = SIGNATURE_PALETTE_LEVELS
+    indices = np.rint(grey / 255.0 * (levels - 1)).astype(np.uint8)
+    image = Image.fromarray(indices, "P")
+    palette = np.repeat(np.linspace(0, 255, levels).astype(np.uint8), 3)
+    image.putpalette(palette.tolist())
+    return image
+
+
+def encode_signature_image(grey: np.ndarray, encoding: str = SIGNATURE_ENCODING,
+                           image_format: str = "PNG") -> Tuple[bytes, str]:
+    """
+    Encode a grey signature image (0 = ink, 255 = paper).
+
+    Returns:
+        (image bytes, format actually used - WEBP falls back to PNG without WebP support)
+    """
+    image_format = image_format.upper()
+    if image_format == "WEBP" and not features.check("webp"):
+        image_format = "PNG"
+
+    buffer = BytesIO()
+    if image_format == "WEBP":
+        # WebP has no 1-bit mode; a quantized grey image still compresses to very little
+        _quantize(grey, encoding).convert("L").save(buffer, format="WEBP", lossless=True, quality=100, method=6)
+    else:
+        image = _quantize(grey, encoding)
+        options = {"bits": 2} if image.mode == "P" and SIGNATURE_PALETTE_LEVELS <= 4 else {}
+        image.save(buffer, format="PNG", optimize=True, **options)
+    return buffer.getvalue(), image_format
+
+
+def _check_quality(mask: np.ndarray, min_quality: float) -> Dict[str, Any]:
+    """Quality of the ink mask, raising SignatureRejected below min_quality"""
+    quality = signature_quality(mask)
+    if quality["ink_pixels"] == 0:
+        raise SignatureRejected("The signature pad is empty")
+    if quality["score"] < min_quality:
+        raise SignatureRejected("The signature is too small - please sign across the pad")
+    return quality
+
+
+def process_signature(image_data: np.ndarray,
+                      target_height: int = SIGNATURE_TARGET_HEIGHT,
+                      encoding: str = SIGNATURE_ENCODING,
+                      image_format: str = "PNG",
+                      min_quality: float = SIGNATURE_MIN_QUALITY) -> Dict[str, Any]:
+    """
+    Crop, scale and encode a signature canvas.
+
+    Args:
+        image_data: Canvas pixels (HxWx4 RGBA)
+        target_height: Output height in pixels (ink smaller than this is not upscaled)
+        encoding: "1bit" or "palette"
+        image_format: "PNG" or "WEBP" (falls back to PNG without WebP support)
+        min_quality: Reject drawings scoring below this
+
+    Returns:
+        Dict with the encoded bytes ("data"), "format", "width", "height" and "quality"
+
+    Raises:
+        SignatureRejected: If the canvas is empty or the drawing scores too low
+    """
+    if image_data is None:
+        raise SignatureRejected("The signature pad is empty")
+
+    grey = ink_intensity(image_data)
+    mask = grey < SIGNATURE_INK_THRESHOLD
+    quality = _check_quality(mask, min_quality)
+
+    top, bottom, left, right = ink_bbox(mask, SIGNATURE_PADDING)
+    cropped = Image.fromarray(grey[top:bottom, left:right].astype(np.uint8), "L")
+    if cropped.height > target_height:
+        width = max(1, round(cropped.width * target_height / cropped.height))
+        cropped = cropped.resize((width, target_height), Image.LANCZOS)
+    data, image_format = encode_signature_image(np.asarray(cropped, dtype=np.float32), encoding, image_format)
+
+    return {
+        "data": data,
+        "format": image_format,
+        "width": cropped.width,
+        "height": cropped.height,
+        "quality": quality
+    }
+
+
+def process_signature_strokes(paths: List[np.ndarray], stroke_width: float,
+                              min_quality: float = SIGNATURE_MIN_QUALITY) -> Dict[str, Any]:
+    """
+    Build a stroke-format signature from the pad's pen paths.
+
+    Args:
+        paths: One Nx2 point array per stroke, in canvas pixels
+        stroke_width: Pen width in canvas pixels
+        min_quality: Reject drawings scoring below this
+
+    Returns:
+        Dict with the encoded stroke JSON ("data"), "format" ("STROKES"),
+        "width", "height" (canvas pixels) and "quality"
+
+    Raises:
+        SignatureRejected: If nothing was drawn or the drawing scores too low
+    """
+    strokes = build_strokes(paths, stroke_width)
+    if strokes is None:
+        raise SignatureRejected("The signature pad is empty")
+
+    # Score the drawing at its original size, exactly as a raster capture would be
+    grey = rasterize_strokes(strokes)
+    quality = _check_quality(grey < SIGNATURE_INK_THRESHOLD, min_quality)
+    return {
+        "data": encode_strokes(strokes),
+        "format": STROKES_FORMAT,
+        "width": grey.shape[1],
+        "height": grey.shape[0],
+        "quality": quality
+    }
+
+
+def render_signature(data: bytes, data_format: str, target_height: int = SIGNATURE_TARGET_HEIGHT,
+                     encoding: str = SIGNATURE_ENCODING, image_format: str = "PNG") -> Tuple[bytes, str]:
+    """
+    Image bytes for a stored signature: raster formats pass through, strokes
+    are rasterized at target_height.
+
+    Returns:
+        (image bytes, image format)
+    """
+    if data_format != STROKES_FORMAT:
+        return data, data_format
+    grey = rasterize_strokes(decode_strokes(data), height=target_height)
+    return encode_signature_image(grey, encoding, image_format)
@@ -0,0 +1,171 @@
+"""
+Signature Blob Store
+This module keeps collected signature images on the server under opaque
+handles such as "sig_3hQ...". The agent only ever sees the handle; the
+submission tool resolves it back to the image bytes right before posting,
+so the image never travels through the model's prompt or tool arguments.
+"""
+
+import time
+import secrets
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Handles live as long as an onboarding conversation reasonably can
+SIGNATURE_STORE_TTL_SECONDS = 24 * 3600
+SIGNATURE_STORE_MAX_ENTRIES = 10000
+
+HANDLE_PREFIX = "sig_"
+
+
+class SignatureHandleError(LookupError):
+    """Raised when a handle cannot be resolved for the owner asking for it"""
+
+
+def is_signature_handle(value: Any) -> bool:
+    """Whether a value looks like a handle issued by SignatureStore"""
+    return isinstance(value, str) and value.startswith(HANDLE_PREFIX) and 8 < len(value) < 64
+
+
+def resolve_requested_signature(store: Optional["SignatureStore"], requested_handle: Any,
+                                owner: Hashable, session_handle: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Stored signature for a handle the agent passed explicitly.
+
+    A requested handle is never swapped for a different signature: it
+    resolves for this owner or the call fails.
+
+    Returns:
+        The stored entry (see SignatureStore.resolve), or None when no handle
+        was requested or it is the session's own - use the session's copy then
+
+    Raises:
+        SignatureHandleError: If the requested handle is invalid, unknown,
+            expired or belongs to someone else
+    """
+    if not requested_handle or requested_handle == session_handle:
+        return None
+    if not is_signature_handle(requested_handle):
+        raise SignatureHandleError(f"{str(requested_handle)[:20]!r} is not a signature handle")
+    if store is None:
+        raise SignatureHandleError("Signature storage is not available")
+    return store.require(requested_handle, owner)
+
+
+class SignatureStore:
+    """
+    Thread-safe, process-wide map of handle -> signature bytes.
+
+    Each handle is bound to the owner that stored it (tenant and email), so
+    a handle leaked into another conversation cannot be resolved there.
+    Expired and overflowing entries are dropped oldest first.
+    """
+
+    def __init__(self, ttl_seconds: float = SIGNATURE_STORE_TTL_SECONDS,
+                 max_entries: int = SIGNATURE_STORE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Running total of stored bytes, so stats() does not walk every entry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "resolved": 0, "misses": 0, "owner_mismatches": 0, "expired": 0}
+
+    def put(self, data: bytes, image_format: str, owner: Hashable,
+            metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store a signature image.
+
+        Args:
+            data: Encoded image bytes
+            image_format: "PNG" or "WEBP"
+            owner: Who may resolve the handle, e.g. (tenant_id, user_email)
+            metadata: Extra fields returned by resolve() (timestamp, size, ...)
+
+        Returns:
+            New opaque handle
+        """
+        handle = HANDLE_PREFIX + secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            self._bytes += len(data)
+            self._entries[handle] = {
+                "data": bytes(data),
+                "format": image_format,
+                "owner": owner,
+                "metadata": dict(metadata or {}),
+                "stored_at": now
+            }
+            self._stats["stored"] += 1
+        return handle
+
+    def resolve(self, handle: str, owner: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Look up a handle for its owner.
+
+        Returns:
+            Dict with "data", "format" and the stored metadata, or None if the
+            handle is unknown, expired or belongs to someone else
+        """
+        return self._lookup(handle, owner)[0]
+
+    def require(self, handle: str, owner: Hashable) -> Dict[str, Any]:
+        """
+        Like resolve(), but says why a handle cannot be used.
+
+        Raises:
+            SignatureHandleError: If the handle is unknown, expired or belongs to someone else
+        """
+        stored, reason = self._lookup(handle, owner)
+        if stored is None:
+            raise SignatureHandleError(f"Signature handle {handle[:12]}... {reason}")
+        return stored
+
+    def _lookup(self, handle: str, owner: Hashable) -> Tuple[Optional[Dict[str, Any]], str]:
+        """(entry view, "") or (None, reason); expiry is checked before ownership"""
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, "is unknown or has expired"
+            if time.monotonic() - entry["stored_at"] > self.ttl_seconds:
+                # Expired entries go whoever asks, so a mismatched owner cannot keep them alive
+                self._remove(handle)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None, "is unknown or has expired"
+            if entry["owner"] != owner:
+                self._stats["owner_mismatches"] += 1
+                return None, "belongs to another user"
+            self._stats["resolved"] += 1
+            return dict(entry["metadata"], data=entry["data"], format=entry["format"]), ""
+
+    def discard(self, handle: str) -> None:
+        """Forget a handle (e.g. when the user clears their signature)"""
+        with self._lock:
+            if handle in self._entries:
+                self._remove(handle)
+
+    def _remove(self, handle: str) -> None:
+        """Delete one entry and its bytes from the total (lock held)"""
+        self._bytes -= len(self._entries.pop(handle)["data"])
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries, then the oldest beyond max_entries (lock held)"""
+        expired = [handle for handle, entry in self._entries.items()
+                   if now - entry["stored_at"] > self.ttl_seconds]
+        for handle in expired:
+            self._remove(handle)
+        self._stats["expired"] += len(expired)
+        # Dicts keep insertion order, so the first keys are the oldest
+        while len(self._entries) >= self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        """Store/resolve counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
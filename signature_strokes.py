@@ -0,0 +1,150 @@
+"""
+Signature Strokes
+This module stores a signature as its pen strokes instead of pixels. The
+point lists drawn on the signature pad are simplified with Douglas-Peucker,
+translated to the ink's bounding box and scaled to integer units. The
+result is a few KB of JSON that can be rasterized at any size when an
+image is needed, or rendered as SVG.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Longer side of the normalized drawing, in integer units
+STROKE_UNITS = 1000
+
+# Douglas-Peucker tolerance in canvas pixels (sub-pixel detail is invisible)
+STROKE_TOLERANCE = 0.8
+
+# Raster output is drawn this many times larger, then scaled down for smooth edges
+SUPERSAMPLE = 4
+
+STROKES_FORMAT = "STROKES"
+STROKES_VERSION = 1
+
+
+def simplify_stroke(points: np.ndarray, tolerance: float = STROKE_TOLERANCE) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of one stroke.
+
+    Keeps every point further than tolerance from the chord of its segment;
+    distances for a whole segment are computed in one vectorized step.
+    """
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[first + 1:last]
+        start, end = points[first], points[last]
+        chord = end - start
+        length = np.hypot(*chord)
+        if length == 0:
+            distances = np.hypot(*(segment - start).T)
+        else:
+            distances = np.abs(chord[0] * (segment[:, 1] - start[1]) - chord[1] * (segment[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def build_strokes(paths: List[np.ndarray], stroke_width: float,
+                  tolerance: float = STROKE_TOLERANCE) -> Optional[Dict[str, Any]]:
+    """
+    Normalized, simplified stroke document for a set of pen paths.
+
+    Returns:
+        {"v", "w", "h", "sw", "px", "strokes"} - width/height and stroke width
+        in units, units per canvas pixel, and flat [x0, y0, x1, y1, ...] integer
+        lists - or None if there is nothing drawn
+    """
+    paths = [simplify_stroke(path, tolerance) for path in paths if len(path)]
+    if not paths:
+        return None
+    pad = stroke_width / 2 + 2
+    all_points = np.concatenate(paths)
+    origin = all_points.min(axis=0) - pad
+    extent = all_points.max(axis=0) + pad - origin
+    scale = STROKE_UNITS / max(extent.max(), 1.0)
+    return {
+        "v": STROKES_VERSION,
+        "w": int(np.ceil(extent[0] * scale)),
+        "h": int(np.ceil(extent[1] * scale)),
+        "sw": round(stroke_width * scale, 2),
+        "px": round(scale, 4),
+        "strokes": [np.rint((path - origin) * scale).astype(int).ravel().tolist() for path in paths]
+    }
+
+
+def encode_strokes(strokes: Dict[str, Any]) -> bytes:
+    """Compact JSON bytes of a stroke document"""
+    return json.dumps(strokes, separators=(",", ":")).encode()
+
+
+def decode_strokes(data: bytes) -> Dict[str, Any]:
+    """Stroke document from encode_strokes() output"""
+    strokes = json.loads(data)
+    if strokes.get("v") != STROKES_VERSION:
+        raise ValueError(f"Unsupported stroke format version: {strokes.get('v')}")
+    return strokes
+
+
+def rasterize_strokes(strokes: Dict[str, Any], height: Optional[int] = None) -> np.ndarray:
+    """
+    Draw a stroke document as a grey image.
+
+    Args:
+        strokes: Stroke document
+        height: Output height in pixels; defaults to the original canvas size
+
+    Returns:
+        HxW float32 array, 0 = black ink, 255 = white paper
+    """
+    if height is None:
+        height = max(1, round(strokes["h"] / strokes["px"]))
+    scale = height / strokes["h"]
+    big = scale * SUPERSAMPLE
+    width = max(1, round(strokes["w"] * scale))
+    image = Image.new("L", (width * SUPERSAMPLE, height * SUPERSAMPLE), 255)
+    draw = ImageDraw.Draw(image)
+    line_width = max(1, round(strokes["sw"] * big))
+    radius = line_width / 2
+    for flat in strokes["strokes"]:
+        points = [(x * big, y * big) for x, y in zip(flat[0::2], flat[1::2])]
+        if len(points) > 1:
+            draw.line(points, fill=0, width=line_width, joint="curve")
+        # Round caps (and single-point dots)
+        for x, y in (points[0], points[-1]):
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=0)
+    image = image.resize((width, height), Image.LANCZOS)
+    return np.asarray(image, dtype=np.float32)
+
+
+def strokes_to_svg(strokes: Dict[str, Any], height: Optional[int] = None) -> str:
+    """SVG document of a stroke document (scales crisply; height sets the default size)"""
+    height = height or max(1, round(strokes["h"] / strokes["px"]))
+    width = max(1, round(strokes["w"] * height / strokes["h"]))
+    paths = []
+    for flat in strokes["strokes"]:
+        pairs = [f"{x} {y}" for x, y in zip(flat[0::2], flat[1::2])]
+        if len(pairs) == 1:
+            pairs.append(pairs[0])
+        paths.append(f'<path d="M{pairs[0]} L{" ".join(pairs[1:])}"/>')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {strokes["w"]} {strokes["h"]}">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        f'<g fill="none" stroke="#000" stroke-width="{strokes["sw"]}" '
+        f'stroke-linecap="round" stroke-linejoin="round">{"".join(paths)}</g></svg>'
+    )
@@ -0,0 +1,98 @@
+"""
+Signature Value
+This module defines the object a collected signature is kept as in the
+session: the encoded bytes (image or stroke JSON) held once, plus views
+derived from them - base64 text, SHA-256, thumbnails, rendered images -
+computed on first use and cached, so reruns, previews and submissions do
+not decode or re-encode the same data again.
+"""
+
+import base64
+import hashlib
+import threading
+from io import BytesIO
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from PIL import Image
+
+from signature_strokes import STROKES_FORMAT, decode_strokes, rasterize_strokes
+
+# Height of the small preview image in pixels
+THUMBNAIL_HEIGHT = 64
+
+
+class SignatureValue:
+    """
+    Immutable signature bytes with lazily computed, cached views.
+
+    data is exposed as bytes (no copies are made when it is passed on) and
+    as a memoryview via view(). Views are computed at most once; the object
+    may be read from tool worker threads.
+    """
+
+    __slots__ = ("data", "format", "timestamp", "handle", "width", "height", "_views", "_lock")
+
+    def __init__(self, data: bytes, data_format: str, timestamp: float,
+                 handle: Optional[str] = None, width: int = 0, height: int = 0):
+        self.data = bytes(data)
+        self.format = data_format
+        self.timestamp = timestamp
+        self.handle = handle
+        self.width = width
+        self.height = height
+        self._views: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_strokes(self) -> bool:
+        return self.format == STROKES_FORMAT
+
+    def view(self) -> memoryview:
+        """Zero-copy read-only view of the bytes"""
+        return memoryview(self.data)
+
+    def cached(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the view stored under key, computing it with factory() the first time"""
+        with self._lock:
+            if key in self._views:
+                return self._views[key]
+        value = factory()
+        with self._lock:
+            return self._views.setdefault(key, value)
+
+    @property
+    def base64(self) -> str:
+        """Base64 text of the bytes (for JSON payloads)"""
+        return self.cached("base64", lambda: base64.b64encode(self.data).decode())
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of the bytes (identifies the signature without carrying it)"""
+        return self.cached("sha256", lambda: hashlib.sha256(self.data).hexdigest())
+
+    @property
+    def strokes(self) -> Dict[str, Any]:
+        """Decoded stroke document (stroke signatures only)"""
+        if not self.is_strokes:
+            raise ValueError(f"{self.format} signature has no strokes")
+        return self.cached("strokes", lambda: decode_strokes(self.data))
+
+    def thumbnail(self, height: int = THUMBNAIL_HEIGHT) -> bytes:
+        """Small greyscale PNG preview"""
+        def build():
+            if self.is_strokes:
+                image = Image.fromarray(rasterize_strokes(self.strokes, height=height).astype("uint8"), "L")
+            else:
+                with Image.open(BytesIO(self.data)) as source:
+                    image = source.convert("L")
+                    if image.height > height:
+                        image = image.resize((max(1, round(image.width * height / image.height)), height),
+                                             Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, format="PNG", optimize=True)
+            return buffer.getvalue()
+        return self.cached(("thumbnail", height), build)
+
+    def __repr__(self) -> str:
+        return (f"SignatureValue(format={self.format!r}, bytes={len(self.data)}, "
+                f"size={self.width}x{self.height}, handle={self.handle!r}, timestamp={self.timestamp:.0f})")
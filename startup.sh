@@ -5,6 +5,12 @@ echo "Installing Python dependencies..."
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Compile the tenant roster snapshot so the first login doesn't pay for pandas/Excel parsing
+if [ -n "$USER_TENANT_EXCEL_PATH" ] && [ -f "$USER_TENANT_EXCEL_PATH" ]; then
+    echo "Compiling tenant roster snapshot..."
+    python user_tenant_lookup.py "$USER_TENANT_EXCEL_PATH" || echo "Roster snapshot compile failed; it will be built on first lookup"
+fi
+
 # Get port from Azure environment variable or use default
 PORT=${WEBSITES_PORT:-8000}
 echo "Starting Streamlit on port $PORT..."
@@ -0,0 +1,284 @@
+"""
+Onboarding Submission Outbox
+This module accepts onboarding submissions into a local SQLite outbox and
+delivers them to the Logic App from background workers. Each submission is
+keyed by an idempotency key, so repeated submits of the same data are
+stored once; failed deliveries retry with exponential backoff and end in a
+dead-letter state after too many attempts. Payloads are encrypted at rest.
+"""
+
+import os
+import json
+import time
+import base64
+import random
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cryptography.fernet import Fernet
+
+# Default location of the outbox database (point it at persistent storage)
+OUTBOX_DB = os.getenv(
+    "ONBOARDING_OUTBOX_DB",
+    os.path.join(tempfile.gettempdir(), "onboarding_outbox.db")
+)
+
+# Delivery schedule: 2s, 4s, 8s ... capped at 5 minutes, +/- 25% jitter
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_BASE = 2.0
+OUTBOX_BACKOFF_MAX = 300.0
+OUTBOX_BACKOFF_JITTER = 0.25
+
+# A claimed submission whose worker died is retried after this many seconds
+OUTBOX_LEASE_SECONDS = 120
+
+# Delivered rows are kept this long (for duplicate detection), then purged
+OUTBOX_RETENTION_SECONDS = 7 * 24 * 3600
+
+STATUS_PENDING = "pending"
+STATUS_DELIVERING = "delivering"
+STATUS_DELIVERED = "delivered"
+STATUS_DEAD = "dead"
+
+
+def submission_key(payload: Dict) -> str:
+    """Idempotency key: hash of the canonical payload, so identical submits collapse"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SubmissionOutbox:
+    """
+    Durable at-least-once delivery queue for onboarding submissions.
+
+    deliver(url, payload, key) performs one delivery attempt and returns
+    (delivered, retryable, detail). It receives the idempotency key so it
+    can be forwarded to the receiver, which makes a redelivery after a
+    crash between send and acknowledge detectable downstream.
+    """
+
+    def __init__(self, deliver: Callable[[str, Dict, str], Tuple[bool, bool, str]],
+                 encryption_secret: str, db_path: str = OUTBOX_DB,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 backoff_base: float = OUTBOX_BACKOFF_BASE,
+                 backoff_max: float = OUTBOX_BACKOFF_MAX,
+                 lease_seconds: float = OUTBOX_LEASE_SECONDS):
+        if not encryption_secret:
+            raise RuntimeError("An encryption secret is required for the submission outbox")
+        self.deliver = deliver
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+
+        digest = hashlib.sha256(encryption_secret.encode() + b":onboarding-outbox").digest()
+        self._fernet = Fernet(base64.urlsafe_b64encode(digest))
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                idempotency_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (autocommit, explicit transactions)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            # FULL: an accepted submission must survive a power loss, not just a crash
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, url: str, payload: Dict, idempotency_key: Optional[str] = None) -> Tuple[Dict, bool]:
+        """
+        Accept a submission for background delivery.
+
+        Args:
+            url: Endpoint to POST the payload to
+            payload: JSON-serializable submission
+            idempotency_key: Defaults to submission_key(payload)
+
+        Returns:
+            (submission status, created) - created is False for a duplicate
+        """
+        key = idempotency_key or submission_key(payload)
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, url, payload, status, attempts, "
+            "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+            (key, url, self._fernet.encrypt(json.dumps(payload).encode()), STATUS_PENDING, now, now, now)
+        )
+        created = cursor.rowcount == 1
+        if created:
+            self._wake.set()
+        return self.get(key), created
+
+    def get(self, idempotency_key: str) -> Optional[Dict]:
+        """Delivery status of a submission (without its payload)"""
+        row = self._connection().execute(
+            "SELECT idempotency_key, status, attempts, created_at, updated_at, last_error "
+            "FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("idempotency_key", "status", "attempts", "created_at", "updated_at", "last_error"), row))
+
+    def _claim(self) -> Optional[Tuple[str, str, bytes, int]]:
+        """Atomically take the next due submission (or one whose lease expired)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT idempotency_key, url, payload, attempts FROM outbox "
+                "WHERE status IN (?, ?) AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (STATUS_PENDING, STATUS_DELIVERING, now)
+            ).fetchone()
+            if row:
+                # Counting the attempt at claim time also bounds retries of a
+                # submission whose worker keeps dying mid-delivery
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, updated_at = ? "
+                    "WHERE idempotency_key = ?",
+                    (STATUS_DELIVERING, now + self.lease_seconds, now, row[0])
+                )
+                row = (row[0], row[1], row[2], row[3] + 1)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _finish(self, key: str, attempts: int, delivered: bool, retryable: bool, detail: str) -> None:
+        """Record the outcome of one delivery attempt"""
+        now = time.time()
+        if delivered:
+            status, next_attempt_at = STATUS_DELIVERED, now
+        elif retryable and attempts < self.max_attempts:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+            status = STATUS_PENDING
+            next_attempt_at = now + delay * random.uniform(1 - OUTBOX_BACKOFF_JITTER, 1 + OUTBOX_BACKOFF_JITTER)
+        else:
+            status, next_attempt_at = STATUS_DEAD, now
+        self._connection().execute(
+            "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, updated_at = ?, last_error = ? "
+            "WHERE idempotency_key = ?",
+            (status, attempts, next_attempt_at, now, None if delivered else detail[:500], key)
+        )
+        if status == STATUS_DEAD:
+            print(f"❌ DEBUG: Submission {key[:12]} dead-lettered after {attempts} attempt(s): {detail[:200]}")
+        elif status == STATUS_PENDING:
+            print(f"⚠️ DEBUG: Submission {key[:12]} attempt {attempts} failed, retrying: {detail[:200]}")
+        else:
+            print(f"✅ DEBUG: Submission {key[:12]} delivered after {attempts} attempt(s)")
+
+    def _deliver_one(self) -> bool:
+        """Claim and deliver one submission; returns False when nothing is due"""
+        claimed = self._claim()
+        if not claimed:
+            return False
+        key, url, token, attempts = claimed
+        if attempts > self.max_attempts:
+            self._finish(key, attempts - 1, False, False, "delivery never completed (worker lease expired)")
+            return True
+        try:
+            payload = json.loads(self._fernet.decrypt(token))
+            delivered, retryable, detail = self.deliver(url, payload, key)
+        except Exception as e:
+            delivered, retryable, detail = False, True, f"{type(e).__name__}: {e}"
+        self._finish(key, attempts, delivered, retryable, detail)
+        return True
+
+    def _next_due_in(self) -> float:
+        row = self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status IN (?, ?)",
+            (STATUS_PENDING, STATUS_DELIVERING)
+        ).fetchone()
+        return max(0.0, row[0] - time.time()) if row and row[0] is not None else self.lease_seconds
+
+    def _worker_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if self._deliver_one():
+                    continue
+                wait_for = self._next_due_in()
+            except Exception as e:
+                print(f"❌ DEBUG: Outbox worker error: {e}")
+                wait_for = self.backoff_base
+            self._wake.wait(min(wait_for, self.lease_seconds))
+            self._wake.clear()
+
+    def start(self, workers: int = 2) -> None:
+        """Start background delivery workers (idempotent)"""
+        if any(worker.is_alive() for worker in self._workers):
+            return
+        removed = self.purge_delivered()
+        if removed:
+            print(f"🔍 DEBUG: Purged {removed} delivered submissions")
+        self._stop_event.clear()
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"outbox-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self) -> None:
+        """Stop the workers after their current attempt"""
+        self._stop_event.set()
+        self._wake.set()
+
+    def requeue_dead(self) -> int:
+        """Move dead-lettered submissions back to pending, returning how many"""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, now, now, STATUS_DEAD)
+        )
+        if cursor.rowcount:
+            self._wake.set()
+        return cursor.rowcount
+
+    def purge_delivered(self, retention_seconds: float = OUTBOX_RETENTION_SECONDS) -> int:
+        """Delete delivered submissions older than the retention window"""
+        cursor = self._connection().execute(
+            "DELETE FROM outbox WHERE status = ? AND updated_at < ?",
+            (STATUS_DELIVERED, time.time() - retention_seconds)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Submission counts per status plus the age of the oldest undelivered one"""
+        conn = self._connection()
+        stats = {status: 0 for status in (STATUS_PENDING, STATUS_DELIVERING, STATUS_DELIVERED, STATUS_DEAD)}
+        for status, count in conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+            stats[status] = count
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN (?, ?)",
+            (STATUS_PENDING, STATUS_DELIVERING)
+        ).fetchone()[0]
+        stats["oldest_undelivered_seconds"] = round(time.time() - oldest, 1) if oldest else 0.0
+        stats["workers"] = sum(1 for worker in self._workers if worker.is_alive())
+        return stats
@@ -0,0 +1,117 @@
+"""
+Dependency Guard Tests
+Checks that abandoning a streamed call (a Streamlit rerun closing the reply
+generator) or a per-request client error returns its slot without counting
+against the dependency, and that suspended() frees the slot for local work.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import AIMDLimiter, CircuitBreaker, DependencyGuard, STATE_CLOSED, STATE_HALF_OPEN
+
+
+class ServerError(Exception):
+    pass
+
+
+class ClientError(Exception):
+    pass
+
+
+def make_guard():
+    return DependencyGuard(
+        "agents-api",
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0),
+        limiter=AIMDLimiter(initial=4, minimum=2, maximum=8),
+        is_failure=lambda error: isinstance(error, ServerError)
+    )
+
+
+def fail_with(error):
+    raise error
+
+
+def streamed_reply(guard):
+    """Reply generator holding a slot while it yields, like the agent stream"""
+    with guard.slot():
+        for delta in ("Hel", "lo", " there"):
+            yield delta
+
+
+def test_closing_stream_mid_reply_records_no_failure():
+    guard = make_guard()
+    for _ in range(5):
+        reply = streamed_reply(guard)
+        assert next(reply) == "Hel"
+        reply.close()
+
+    stats = guard.stats()
+    assert guard.breaker.failures == 0
+    assert stats["failures"] == 0
+    assert stats["abandoned"] == 5
+    assert stats["state"] == STATE_CLOSED
+    assert stats["in_flight"] == 0
+    assert guard.limiter.limit == 4
+
+
+def test_finished_stream_records_success():
+    guard = make_guard()
+    assert "".join(streamed_reply(guard)) == "Hello there"
+    assert guard.stats()["successes"] == 1
+    assert guard.stats()["in_flight"] == 0
+
+
+def test_abandoned_probe_frees_half_open_breaker():
+    guard = make_guard()
+    for _ in range(2):
+        guard.acquire()
+        guard.release(False)
+    # reset_timeout=0: the next call is admitted as the half-open probe
+    reply = streamed_reply(guard)
+    next(reply)
+    assert guard.breaker.state == STATE_HALF_OPEN
+    reply.close()
+
+    # Another caller may probe right away
+    guard.acquire()
+    guard.release(True)
+    assert guard.breaker.state == STATE_CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    guard = make_guard()
+    for _ in range(5):
+        with pytest.raises(ClientError):
+            guard.call(fail_with, ClientError("thread already has an active run"))
+    assert guard.breaker.state == STATE_CLOSED
+    assert guard.stats()["failures"] == 0
+    assert guard.limiter.limit == 4
+
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            guard.call(fail_with, ServerError("HTTP 503"))
+    assert guard.stats()["failures"] == 2
+    assert guard.stats()["trips"] == 1
+
+
+def test_suspended_slot_is_free_during_local_work():
+    guard = make_guard()
+    with guard.slot() as slot:
+        assert guard.stats()["in_flight"] == 1
+        with slot.suspended():
+            assert guard.stats()["in_flight"] == 0
+        assert guard.stats()["in_flight"] == 1
+    assert guard.stats()["in_flight"] == 0
+    assert guard.stats()["successes"] == 2
+
+    # An error in the suspended block leaves nothing to release
+    with pytest.raises(ClientError):
+        with guard.slot() as slot:
+            with slot.suspended():
+                raise ClientError("tool failed")
+    assert guard.stats()["in_flight"] == 0
@@ -0,0 +1,132 @@
+"""
+Run Waiter Tests
+Feeds real ThreadRun objects (whose status is the SDK's RunStatus enum)
+through wait(), notify() and wait_for_thread(), and checks that an early
+wake-up from a stream does not turn into a tight polling loop.
+"""
+
+import os
+import sys
+import time
+import threading
+
+import pytest
+from azure.ai.agents.models import ThreadRun
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_waiter import RunWaiter, RunWaitTimeout, run_status
+
+
+class FakeRuns:
+    """Stand-in for project.agents.runs that serves ThreadRun objects"""
+
+    def __init__(self, **statuses):
+        self.statuses = dict(statuses)
+        self.gets = 0
+        self.cancelled = []
+        self.error = None
+
+    def get(self, thread_id, run_id):
+        self.gets += 1
+        if self.error:
+            raise self.error
+        return ThreadRun({"id": run_id, "thread_id": thread_id, "status": self.statuses[run_id]})
+
+    def cancel(self, thread_id, run_id):
+        self.cancelled.append(run_id)
+        self.statuses[run_id] = "cancelled"
+
+
+def make_waiter(runs):
+    return RunWaiter(runs.get, runs.cancel, initial_delay=0.01, max_delay=0.05)
+
+
+def thread_run(run_id, status):
+    return ThreadRun({"id": run_id, "thread_id": "thread", "status": status})
+
+
+def test_run_status_accepts_sdk_enum():
+    assert run_status(thread_run("run", "completed").status) == "completed"
+    assert run_status("Requires_Action") == "requires_action"
+
+
+def test_wait_returns_finished_run():
+    runs = FakeRuns(run="completed")
+    waiter = make_waiter(runs)
+    started = time.monotonic()
+    assert run_status(waiter.wait("thread", "run", timeout=1.5).status) == "completed"
+    assert time.monotonic() - started < 0.5
+    assert runs.gets == 1
+    assert waiter.active_runs("thread") == []
+
+
+def test_wait_returns_on_requires_action_but_keeps_tracking():
+    runs = FakeRuns(run="requires_action")
+    waiter = make_waiter(runs)
+    assert run_status(waiter.wait("thread", "run", timeout=1.5).status) == "requires_action"
+    assert waiter.active_runs("thread") == ["run"]
+
+
+def test_notify_with_thread_run_status_untracks_finished_runs():
+    waiter = make_waiter(FakeRuns())
+    for run_id in ("first", "second"):
+        waiter.notify("thread", run_id, thread_run(run_id, "in_progress").status)
+    assert sorted(waiter.active_runs("thread")) == ["first", "second"]
+
+    for run_id in ("first", "second"):
+        waiter.notify("thread", run_id, thread_run(run_id, "completed").status)
+    assert waiter.active_runs("thread") == []
+    assert waiter.stats()["tracked"] == 0
+
+
+def test_wait_for_thread_returns_at_once_when_runs_finished():
+    runs = FakeRuns(run="in_progress")
+    waiter = make_waiter(runs)
+    waiter.notify("thread", "run", thread_run("run", "in_progress").status)
+    runs.statuses["run"] = "completed"
+    started = time.monotonic()
+    assert waiter.wait_for_thread("thread", timeout=1.5)
+    assert time.monotonic() - started < 0.5
+    assert runs.cancelled == []
+
+
+def test_wait_for_thread_cancels_abandoned_requires_action_run():
+    runs = FakeRuns(run="requires_action")
+    waiter = make_waiter(runs)
+    waiter.notify("thread", "run", thread_run("run", "requires_action").status)
+    assert waiter.wait_for_thread("thread", timeout=1.5)
+    assert runs.cancelled == ["run"]
+    assert waiter.active_runs("thread") == []
+
+
+def test_wait_times_out_and_cancels():
+    runs = FakeRuns(run="in_progress")
+    waiter = make_waiter(runs)
+    with pytest.raises(RunWaitTimeout):
+        waiter.wait("thread", "run", timeout=0.1, cancel_on_timeout=True)
+    assert runs.cancelled == ["run"]
+
+
+def test_early_wakeup_falls_back_to_backoff_when_poll_fails():
+    runs = FakeRuns(run="in_progress")
+    waiter = RunWaiter(runs.get, runs.cancel, initial_delay=0.05, max_delay=0.05, jitter=0)
+    outcome = {}
+
+    def wait():
+        try:
+            waiter.wait("thread", "run", timeout=0.4)
+        except RunWaitTimeout as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=wait)
+    worker.start()
+    time.sleep(0.1)
+    # The stream saw the run finish, but polling it keeps failing (e.g. circuit open)
+    runs.error = RuntimeError("agents-api is unavailable")
+    waiter.notify("thread", "run", thread_run("run", "completed").status)
+    worker.join()
+
+    assert isinstance(outcome.get("error"), RunWaitTimeout)
+    # One early wake-up, then 0.05s backoff sleeps - not a busy loop
+    assert runs.gets <= 12
@@ -0,0 +1,129 @@
+"""
+Signature Store Tests
+Checks the owner boundary that stops a leaked handle from resolving for
+another user, expiry and eviction, and that an explicitly requested handle
+is never replaced by the session's own signature.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import signature_store
+from signature_store import SignatureHandleError, SignatureStore, resolve_requested_signature
+
+ALICE = ("tenant-a", "alice@contoso.com")
+BOB = ("tenant-a", "bob@contoso.com")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(signature_store.time, "monotonic", clock)
+    return clock
+
+
+def test_owner_resolves_its_handle():
+    store = SignatureStore()
+    handle = store.put(b"png-bytes", "PNG", ALICE, metadata={"timestamp": 42})
+    stored = store.resolve(handle, ALICE)
+    assert stored["data"] == b"png-bytes"
+    assert stored["format"] == "PNG"
+    assert stored["timestamp"] == 42
+
+
+def test_other_owner_cannot_resolve_handle():
+    store = SignatureStore()
+    handle = store.put(b"png-bytes", "PNG", ALICE)
+    assert store.resolve(handle, BOB) is None
+    with pytest.raises(SignatureHandleError, match="another user"):
+        store.require(handle, BOB)
+    assert store.stats()["owner_mismatches"] == 2
+    # The rightful owner is unaffected
+    assert store.resolve(handle, ALICE) is not None
+
+
+def test_expired_handle_is_removed_whoever_asks(clock):
+    store = SignatureStore(ttl_seconds=60)
+    handle = store.put(b"12345", "PNG", ALICE)
+    clock.now += 61
+    # Expiry is checked before ownership, so a mismatched owner drops it too
+    with pytest.raises(SignatureHandleError, match="expired"):
+        store.require(handle, BOB)
+    stats = store.stats()
+    assert stats["expired"] == 1
+    assert stats["owner_mismatches"] == 0
+    assert stats["entries"] == 0
+    assert stats["bytes"] == 0
+    assert store.resolve(handle, ALICE) is None
+
+
+def test_oldest_entries_are_evicted(clock):
+    store = SignatureStore(max_entries=3)
+    handles = []
+    for index in range(5):
+        handles.append(store.put(b"x" * (index + 1), "PNG", ALICE))
+        clock.now += 1
+    assert [store.resolve(handle, ALICE) is not None for handle in handles] == [False, False, True, True, True]
+    stats = store.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 3 + 4 + 5
+
+
+def test_discard_updates_size():
+    store = SignatureStore()
+    handle = store.put(b"1234", "PNG", ALICE)
+    store.discard(handle)
+    store.discard(handle)
+    assert store.resolve(handle, ALICE) is None
+    assert store.stats()["bytes"] == 0
+
+
+def test_requested_handle_of_another_user_raises_instead_of_substituting():
+    store = SignatureStore()
+    own_handle = store.put(b"alice", "PNG", ALICE)
+    leaked_handle = store.put(b"bob", "PNG", BOB)
+    with pytest.raises(SignatureHandleError):
+        resolve_requested_signature(store, leaked_handle, ALICE, session_handle=own_handle)
+
+
+def test_requested_handle_that_expired_raises(clock):
+    store = SignatureStore(ttl_seconds=60)
+    own_handle = store.put(b"alice", "PNG", ALICE)
+    old_handle = store.put(b"alice-old", "PNG", ALICE)
+    clock.now += 61
+    with pytest.raises(SignatureHandleError):
+        resolve_requested_signature(store, old_handle, ALICE, session_handle=own_handle)
+
+
+def test_requested_value_that_is_not_a_handle_raises():
+    store = SignatureStore()
+    with pytest.raises(SignatureHandleError, match="not a signature handle"):
+        resolve_requested_signature(store, "iVBORw0KGgoAAAANSUhEUgAA", ALICE)
+
+
+def test_requested_handle_resolves_for_its_owner():
+    store = SignatureStore()
+    handle = store.put(b"alice", "PNG", ALICE)
+    assert resolve_requested_signature(store, handle, ALICE)["data"] == b"alice"
+
+
+def test_no_handle_or_session_handle_uses_session_copy():
+    store = SignatureStore()
+    own_handle = store.put(b"alice", "PNG", ALICE)
+    assert resolve_requested_signature(store, None, ALICE, session_handle=own_handle) is None
+    assert resolve_requested_signature(store, "", ALICE) is None
+    # The session's own handle maps to the session copy even after the store dropped it
+    store.discard(own_handle)
+    assert resolve_requested_signature(store, own_handle, ALICE, session_handle=own_handle) is None
@@ -0,0 +1,212 @@
+"""
+Submission Outbox Tests
+Behavior of the durable outbox against a temp-dir database: duplicate
+suppression, retry with backoff, dead-lettering and requeue, and reclaiming
+a submission whose worker died mid-delivery. Delivery attempts are driven
+one at a time with _deliver_one() and a fake clock instead of workers.
+"""
+
+import os
+import sys
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import submission_outbox
+from submission_outbox import (
+    STATUS_DEAD, STATUS_DELIVERED, STATUS_DELIVERING, STATUS_PENDING, SubmissionOutbox, submission_key
+)
+
+URL = "https://logic.example/submit"
+PAYLOAD = {"tenantId": "tenant-a", "userEmail": "alice@contoso.com", "employee": {"firstName": "Alice"}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Receiver:
+    """deliver() stand-in returning scripted outcomes and recording the calls"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def __call__(self, url, payload, key):
+        self.calls.append((url, payload, key))
+        outcome = self.outcomes.pop(0) if self.outcomes else (True, False, "HTTP 200")
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(submission_outbox.time, "time", clock)
+    return clock
+
+
+def make_outbox(tmp_path, receiver, **options):
+    options.setdefault("max_attempts", 3)
+    return SubmissionOutbox(receiver, encryption_secret="test-secret",
+                            db_path=str(tmp_path / "outbox.db"), **options)
+
+
+def next_attempt_at(outbox, key):
+    return outbox._connection().execute(
+        "SELECT next_attempt_at FROM outbox WHERE idempotency_key = ?", (key,)
+    ).fetchone()[0]
+
+
+def test_same_payload_is_stored_once(tmp_path, clock):
+    outbox = make_outbox(tmp_path, Receiver())
+    first, created = outbox.enqueue(URL, PAYLOAD)
+    again, created_again = outbox.enqueue(URL, dict(PAYLOAD))
+    assert created and not created_again
+    assert first["idempotency_key"] == again["idempotency_key"] == submission_key(PAYLOAD)
+    assert outbox.stats()[STATUS_PENDING] == 1
+
+
+def test_duplicate_of_delivered_submission_is_not_resent(tmp_path, clock):
+    receiver = Receiver()
+    outbox = make_outbox(tmp_path, receiver)
+    outbox.enqueue(URL, PAYLOAD)
+    assert outbox._deliver_one()
+    submission, created = outbox.enqueue(URL, PAYLOAD)
+    assert not created
+    assert submission["status"] == STATUS_DELIVERED
+    assert not outbox._deliver_one()
+    assert len(receiver.calls) == 1
+
+
+def test_delivery_gets_payload_and_idempotency_key(tmp_path, clock):
+    receiver = Receiver()
+    outbox = make_outbox(tmp_path, receiver)
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    assert outbox._deliver_one()
+    assert receiver.calls == [(URL, PAYLOAD, submission["idempotency_key"])]
+    assert outbox.get(submission["idempotency_key"])["status"] == STATUS_DELIVERED
+
+
+def test_payload_is_encrypted_at_rest(tmp_path, clock):
+    outbox = make_outbox(tmp_path, Receiver())
+    outbox.enqueue(URL, PAYLOAD)
+    with closing(sqlite3.connect(str(tmp_path / "outbox.db"))) as conn:
+        stored = conn.execute("SELECT payload FROM outbox").fetchone()[0]
+    assert b"alice@contoso.com" not in stored
+
+
+def test_failed_delivery_backs_off_then_dead_letters(tmp_path, clock):
+    receiver = Receiver(*[(False, True, "HTTP 503")] * 3)
+    outbox = make_outbox(tmp_path, receiver, backoff_base=2.0, backoff_max=300.0)
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    key = submission["idempotency_key"]
+
+    delays = []
+    for attempt in (1, 2):
+        assert outbox._deliver_one()
+        state = outbox.get(key)
+        assert state["status"] == STATUS_PENDING
+        assert state["attempts"] == attempt
+        assert state["last_error"] == "HTTP 503"
+        delays.append(next_attempt_at(outbox, key) - clock.now)
+        # Not due until the backoff has passed
+        assert not outbox._deliver_one()
+        clock.now += delays[-1]
+
+    # 2s then 4s, each +/- 25% jitter
+    assert 1.5 <= delays[0] <= 2.5
+    assert 3.0 <= delays[1] <= 5.0
+
+    assert outbox._deliver_one()
+    state = outbox.get(key)
+    assert state["status"] == STATUS_DEAD
+    assert state["attempts"] == 3
+    assert not outbox._deliver_one()
+    assert len(receiver.calls) == 3
+
+
+def test_rejected_submission_is_dead_lettered_at_once(tmp_path, clock):
+    outbox = make_outbox(tmp_path, Receiver((False, False, "HTTP 400: bad payload")))
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    assert outbox._deliver_one()
+    state = outbox.get(submission["idempotency_key"])
+    assert state["status"] == STATUS_DEAD
+    assert state["attempts"] == 1
+
+
+def test_delivery_exception_is_retried(tmp_path, clock):
+    outbox = make_outbox(tmp_path, Receiver(ConnectionError("reset by peer")))
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    assert outbox._deliver_one()
+    state = outbox.get(submission["idempotency_key"])
+    assert state["status"] == STATUS_PENDING
+    assert "ConnectionError" in state["last_error"]
+
+
+def test_requeue_dead_brings_submission_back(tmp_path, clock):
+    receiver = Receiver((False, False, "HTTP 400"))
+    outbox = make_outbox(tmp_path, receiver)
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    outbox._deliver_one()
+    assert outbox.stats()[STATUS_DEAD] == 1
+
+    assert outbox.requeue_dead() == 1
+    state = outbox.get(submission["idempotency_key"])
+    assert state["status"] == STATUS_PENDING
+    assert state["attempts"] == 0
+
+    assert outbox._deliver_one()
+    assert outbox.get(submission["idempotency_key"])["status"] == STATUS_DELIVERED
+    assert outbox.requeue_dead() == 0
+
+
+def test_expired_lease_is_reclaimed(tmp_path, clock):
+    receiver = Receiver()
+    outbox = make_outbox(tmp_path, receiver, lease_seconds=120)
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    key = submission["idempotency_key"]
+
+    # A worker claims the submission and dies before recording the outcome
+    assert outbox._claim()[0] == key
+    assert outbox.get(key)["status"] == STATUS_DELIVERING
+    assert not outbox._deliver_one()
+
+    clock.now += 121
+    assert outbox._deliver_one()
+    state = outbox.get(key)
+    assert state["status"] == STATUS_DELIVERED
+    assert state["attempts"] == 2
+    assert len(receiver.calls) == 1
+
+
+def test_submission_whose_workers_keep_dying_is_dead_lettered(tmp_path, clock):
+    receiver = Receiver()
+    outbox = make_outbox(tmp_path, receiver, max_attempts=2, lease_seconds=10)
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+    for _ in range(2):
+        assert outbox._claim()
+        clock.now += 11
+
+    assert outbox._deliver_one()
+    state = outbox.get(submission["idempotency_key"])
+    assert state["status"] == STATUS_DEAD
+    assert "lease expired" in state["last_error"]
+    assert receiver.calls == []
+
+
+def test_state_survives_reopening_the_database(tmp_path, clock):
+    outbox = make_outbox(tmp_path, Receiver())
+    submission, _ = outbox.enqueue(URL, PAYLOAD)
+
+    reopened = make_outbox(tmp_path, Receiver())
+    assert reopened.get(submission["idempotency_key"])["status"] == STATUS_PENDING
+    assert not reopened.enqueue(URL, PAYLOAD)[1]
@@ -0,0 +1,110 @@
+"""
+Persistent MSAL Token Cache
+This module stores each user's MSAL token cache on local disk, encrypted at
+rest and partitioned per user, so returning users can be signed in with
+acquire_token_silent instead of a full authorization-code round trip.
+"""
+
+import os
+import base64
+import hashlib
+import secrets
+import tempfile
+from typing import Optional
+
+import msal
+from cryptography.fernet import Fernet, InvalidToken
+
+# Folder holding one encrypted cache file per user partition
+TOKEN_CACHE_DIR = os.getenv(
+    "TOKEN_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "onboard_token_cache")
+)
+
+
+def new_partition_key() -> str:
+    """Generate a random, unguessable partition key for a new user"""
+    return secrets.token_urlsafe(32)
+
+
+def _master_secret() -> bytes:
+    """Server-side secret used to derive per-partition encryption keys"""
+    secret = os.getenv("TOKEN_CACHE_ENCRYPTION_KEY") or os.getenv("AZURE_CLIENT_SECRET")
+    if not secret:
+        raise RuntimeError("TOKEN_CACHE_ENCRYPTION_KEY or AZURE_CLIENT_SECRET must be set")
+    return secret.encode()
+
+
+def _fernet_for(partition_key: str) -> Fernet:
+    """
+    Derive the encryption key from the server secret AND the partition key,
+    so a cache file cannot be decrypted without the user's browser cookie.
+    """
+    digest = hashlib.sha256(_master_secret() + b":" + partition_key.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+def _cache_path(partition_key: str) -> str:
+    """File name is a hash of the partition key - the key itself never hits disk"""
+    file_name = hashlib.sha256(partition_key.encode()).hexdigest() + ".bin"
+    return os.path.join(TOKEN_CACHE_DIR, file_name)
+
+
+def load_user_token_cache(partition_key: Optional[str]) -> msal.SerializableTokenCache:
+    """
+    Load a user's token cache from disk.
+
+    Args:
+        partition_key: Per-user partition key (from the auth cookie), or None
+
+    Returns:
+        SerializableTokenCache - empty if no cache exists or it cannot be decrypted
+    """
+    cache = msal.SerializableTokenCache()
+    if not partition_key:
+        return cache
+
+    path = _cache_path(partition_key)
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                cache.deserialize(_fernet_for(partition_key).decrypt(f.read()).decode())
+        except (InvalidToken, ValueError) as e:
+            # Secret rotated or file corrupted - drop it and start fresh
+            print(f"⚠️ Discarding unreadable token cache: {type(e).__name__}")
+            delete_user_token_cache(partition_key)
+        except Exception as e:
+            print(f"❌ Failed to load token cache: {e}")
+    return cache
+
+
+def save_user_token_cache(partition_key: str, cache: msal.SerializableTokenCache) -> None:
+    """Encrypt and persist a user's token cache if MSAL changed it"""
+    if not partition_key or not cache.has_state_changed:
+        return
+
+    try:
+        os.makedirs(TOKEN_CACHE_DIR, mode=0o700, exist_ok=True)
+        path = _cache_path(partition_key)
+        encrypted = _fernet_for(partition_key).encrypt(cache.serialize().encode())
+
+        # Atomic replace so a concurrent reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=TOKEN_CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(encrypted)
+        os.replace(tmp_path, path)
+        cache.has_state_changed = False
+    except Exception as e:
+        print(f"❌ Failed to save token cache: {e}")
+
+
+def delete_user_token_cache(partition_key: Optional[str]) -> None:
+    """Remove a user's persisted token cache (used on sign out)"""
+    if not partition_key:
+        return
+    try:
+        os.remove(_cache_path(partition_key))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"❌ Failed to delete token cache: {e}")
@@ -0,0 +1,168 @@
+"""
+TTL Cache Utility
+This module provides a thread-safe, process-wide cache with time-to-live
+expiry, stale-while-revalidate, request coalescing (singleflight), short-lived
+negative entries and an optional LRU bound. It is shared by the lookups in
+app.py that hit slow or rate-limited services for rarely-changing data.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Entry:
+    """Cached value plus the time it was stored and how long it stays fresh"""
+    __slots__ = ("value", "stored_at", "ttl")
+
+    def __init__(self, value: Any, ttl: float):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key wait on"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe TTL cache with stale-while-revalidate and singleflight loads.
+
+    - Fresh entries (age < ttl) are returned directly.
+    - Stale entries (ttl <= age < ttl + stale_seconds) are returned immediately
+      while one background refresh reloads them.
+    - Misses are loaded once per key; concurrent callers share the result.
+    - Values classified as negative are cached for negative_ttl only.
+    - Loader exceptions are never cached; they propagate to every waiter.
+    """
+
+    def __init__(self, ttl_seconds: float, stale_seconds: float = 0,
+                 negative_ttl_seconds: float = 0,
+                 is_negative: Optional[Callable[[Any], bool]] = None,
+                 max_entries: Optional[int] = None, name: str = "cache"):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.is_negative = is_negative or (lambda value: value is None)
+        self.max_entries = max_entries
+        self.name = name
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "refreshes": 0, "load_errors": 0, "evictions": 0}
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, loading it with loader() if needed.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable fetching the value (must not use st.*,
+                    it may run on a background thread)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = entry.age()
+                if age < entry.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry.value
+                if age < entry.ttl + self.stale_seconds and not self.is_negative(entry.value):
+                    self._entries.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    if key not in self._flights:
+                        self._flights[key] = _Flight()
+                        self._stats["refreshes"] += 1
+                        threading.Thread(
+                            target=self._load, args=(key, loader, self._flights[key]),
+                            name=f"{self.name}-refresh", daemon=True
+                        ).start()
+                    return entry.value
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                owner = True
+                self._stats["misses"] += 1
+            else:
+                owner = False
+                self._stats["coalesced"] += 1
+
+        if owner:
+            self._load(key, loader, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: _Flight) -> None:
+        """Run loader once, store the result and release every waiter"""
+        try:
+            value = loader()
+            ttl = self.negative_ttl_seconds if self.is_negative(value) else self.ttl_seconds
+            with self._lock:
+                if ttl > 0:
+                    self._entries[key] = _Entry(value, ttl)
+                    self._entries.move_to_end(key)
+                    self._evict_over_limit()
+                else:
+                    self._entries.pop(key, None)
+            flight.value = value
+        except Exception as e:
+            with self._lock:
+                self._stats["load_errors"] += 1
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _evict_over_limit(self) -> None:
+        """Drop least-recently-used entries beyond max_entries (lock held)"""
+        if self.max_entries is None:
+            return
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value (fresh or stale) without loading or counting"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove one key so the next call reloads it"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/refresh counters plus the current number of entries"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
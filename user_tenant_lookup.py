@@ -5,8 +5,248 @@ from an Excel file or SharePoint list.
 """
 
 import os
+import csv
+import sqlite3
+import tempfile
+import threading
 import requests
-from typing import Optional, Dict
+from collections import deque
+from contextlib import closing
+from typing import Optional, Dict, Tuple, List, Iterable, Iterator
+
+# Roster columns copied into each lookup result: result key -> Excel column
+ROSTER_FIELDS = {
+    'tenantId': 'tenantId',
+    'clientId': 'clientid',
+    'url': 'url',
+    'clientSecret': 'clientSecret'
+}
+
+# Compiled roster snapshot: SQLite file next to the workbook unless overridden.
+# Lookups read the snapshot (memory-mapped) without importing pandas.
+ROSTER_SNAPSHOT_SUFFIX = ".snapshot.sqlite"
+ROSTER_SNAPSHOT_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_MAX_PARAMS = 500  # Stay well below SQLite's bound-parameter limit
+
+# Bulk validation: rows joined against the roster per batch
+VALIDATION_BATCH_SIZE = 5000
+
+# Process-wide roster snapshot, replaced as a whole on reload so readers
+# never see a half-built index.
+_roster_snapshot = None
+_roster_reload_lock = threading.Lock()
+
+_lookup_stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'compiles': 0}
+_stats_lock = threading.Lock()
+
+def _normalize_email(email: str) -> str:
+    """Normalize an email address for index lookups"""
+    return (email or '').strip().lower()
+
+def _count(stat: str) -> None:
+    """Increment a lookup counter"""
+    with _stats_lock:
+        _lookup_stats[stat] += 1
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Identify a roster file version by mtime and size"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _build_roster_index(excel_file_path: str) -> Dict[str, Dict]:
+    """Parse the roster workbook once into a dict keyed by normalized email"""
+    import pandas as pd
+    df = pd.read_excel(excel_file_path)
+
+    emails = df['userEmail'].astype(str).str.strip().str.lower()
+    columns = {
+        key: df[column].astype(str).tolist() if column in df.columns else [''] * len(df)
+        for key, column in ROSTER_FIELDS.items()
+    }
+
+    index = {}
+    for position, email in enumerate(emails):
+        # First row wins for duplicate emails (same as the old iloc[0] lookup)
+        if email not in index:
+            index[email] = {key: values[position] for key, values in columns.items()}
+    return index
+
+def get_snapshot_path(excel_file_path: Optional[str] = None) -> Optional[str]:
+    """Resolve the snapshot location (USER_TENANT_SNAPSHOT_PATH or next to the workbook)"""
+    configured = os.getenv("USER_TENANT_SNAPSHOT_PATH")
+    if configured:
+        return configured
+    return excel_file_path + ROSTER_SNAPSHOT_SUFFIX if excel_file_path else None
+
+def compile_roster_snapshot(excel_file_path: str, snapshot_path: Optional[str] = None) -> str:
+    """
+    Compile the Excel roster into a SQLite snapshot keyed by normalized email.
+    This is the only code path that needs pandas/openpyxl.
+
+    Args:
+        excel_file_path: Path to the roster workbook
+        snapshot_path: Output path (defaults to get_snapshot_path())
+
+    Returns:
+        Path of the written snapshot
+    """
+    snapshot_path = snapshot_path or get_snapshot_path(excel_file_path)
+    source_mtime, source_size = _file_signature(excel_file_path)
+    index = _build_roster_index(excel_file_path)
+
+    # Build into a temp file and rename, so readers only ever open a complete snapshot
+    snapshot_dir = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        # Closed before the file is renamed or removed, on failure too
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            field_names = list(ROSTER_FIELDS)
+            conn.execute(
+                f"CREATE TABLE roster (email TEXT PRIMARY KEY, {', '.join(f'{name} TEXT' for name in field_names)}) WITHOUT ROWID"
+            )
+            conn.executemany(
+                f"INSERT INTO roster VALUES (?, {', '.join('?' for _ in field_names)})",
+                ((email, *(config[name] for name in field_names)) for email, config in index.items())
+            )
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('source_mtime_ns', source_mtime),
+                ('source_size', source_size),
+                ('row_count', len(index))
+            ])
+            conn.commit()
+        os.replace(tmp_path, snapshot_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    _count('compiles')
+    print(f"📦 Compiled tenant roster snapshot: {len(index)} users -> {snapshot_path}")
+    return snapshot_path
+
+class RosterSnapshot:
+    """
+    Read-only view of a compiled roster snapshot.
+    Each thread gets its own memory-mapped SQLite connection; a lookup is a
+    single primary-key probe.
+    """
+
+    def __init__(self, snapshot_path: str):
+        self.path = snapshot_path
+        self._local = threading.local()
+
+        meta = dict(self._connection().execute("SELECT key, value FROM meta").fetchall())
+        self.source_signature = (meta.get('source_mtime_ns'), meta.get('source_size'))
+        self.row_count = meta.get('row_count', 0)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute(f"PRAGMA mmap_size={ROSTER_SNAPSHOT_MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, email: str) -> Optional[Dict]:
+        """Look up a normalized email, returning its tenant configuration"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(ROSTER_FIELDS)} FROM roster WHERE email = ?", (email,)
+        ).fetchone()
+        return dict(zip(ROSTER_FIELDS, row)) if row else None
+
+    def get_many(self, emails: List[str]) -> Dict[str, Dict]:
+        """Look up a batch of normalized emails with one query per chunk"""
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(emails), SQLITE_MAX_PARAMS):
+            chunk = emails[start:start + SQLITE_MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT email, {', '.join(ROSTER_FIELDS)} FROM roster "
+                f"WHERE email IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            for email, *values in rows:
+                found[email] = dict(zip(ROSTER_FIELDS, values))
+        return found
+
+    def __len__(self) -> int:
+        return self.row_count
+
+def _fallback_snapshot_path(excel_file_path: str) -> str:
+    """Snapshot location used when the workbook's folder is not writable"""
+    return os.path.join(tempfile.gettempdir(), os.path.basename(excel_file_path) + ROSTER_SNAPSHOT_SUFFIX)
+
+def _open_fresh_snapshot(excel_file_path: Optional[str],
+                         signature: Optional[Tuple[int, int]]) -> RosterSnapshot:
+    """Open the on-disk snapshot, recompiling it first if the workbook changed"""
+    snapshot_path = get_snapshot_path(excel_file_path)
+    candidates = [snapshot_path]
+    if excel_file_path:
+        candidates.append(_fallback_snapshot_path(excel_file_path))
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            snapshot = RosterSnapshot(candidate)
+            if signature is None or snapshot.source_signature == signature:
+                return snapshot
+
+    try:
+        compile_roster_snapshot(excel_file_path, snapshot_path)
+    except OSError as e:
+        # App folder not writable - keep the snapshot in the temp dir instead
+        print(f"⚠️ Could not write roster snapshot next to workbook ({e}); using temp dir")
+        snapshot_path = _fallback_snapshot_path(excel_file_path)
+        compile_roster_snapshot(excel_file_path, snapshot_path)
+    return RosterSnapshot(snapshot_path)
+
+def get_roster_index(excel_file_path: Optional[str] = None) -> Optional[RosterSnapshot]:
+    """
+    Get the roster snapshot, recompiling only when the workbook changed.
+    Works without the workbook if a prebuilt snapshot was deployed.
+
+    Args:
+        excel_file_path: Roster path (defaults to USER_TENANT_EXCEL_PATH)
+
+    Returns:
+        RosterSnapshot for lookups, or None if no roster is configured
+    """
+    global _roster_snapshot
+
+    excel_file_path = excel_file_path or os.getenv("USER_TENANT_EXCEL_PATH")
+    if excel_file_path and os.path.exists(excel_file_path):
+        signature = _file_signature(excel_file_path)
+    else:
+        # No workbook: serve a prebuilt snapshot as-is if one exists
+        signature = None
+        snapshot_path = get_snapshot_path(excel_file_path)
+        if not snapshot_path or not os.path.exists(snapshot_path):
+            return None
+
+    current = _roster_snapshot
+    if current and (signature is None or current.source_signature == signature):
+        return current
+
+    with _roster_reload_lock:
+        # Another thread may have reloaded while we waited for the lock
+        current = _roster_snapshot
+        if not current or (signature is not None and current.source_signature != signature):
+            current = _open_fresh_snapshot(excel_file_path, signature)
+            _roster_snapshot = current
+            _count('reloads')
+            print(f"🔄 Loaded tenant roster snapshot: {len(current)} users from {current.path}")
+        return current
+
+def get_lookup_stats() -> Dict[str, int]:
+    """
+    Get roster lookup counters.
+
+    Returns:
+        Dictionary with hits, misses, reloads, compiles and the current roster size
+    """
+    with _stats_lock:
+        stats = dict(_lookup_stats)
+    stats['size'] = len(_roster_snapshot) if _roster_snapshot else 0
+    return stats
 
 def lookup_user_tenant_from_excel(user_email: str, excel_url: Optional[str] = None) -> Optional[Dict]:
     """
@@ -29,28 +269,21 @@ def lookup_user_tenant_from_excel(user_email: str, excel_url: Optional[str] = No
             print(f"Error reading from SharePoint: {e}")
             return None
     
-    # Alternative: Read from local Excel file if available
-    excel_file_path = os.getenv("USER_TENANT_EXCEL_PATH")
-    if excel_file_path and os.path.exists(excel_file_path):
-        try:
-            import pandas as pd
-            df = pd.read_excel(excel_file_path)
-            
+    # Alternative: Read from local Excel file (via its compiled snapshot) if available
+    try:
+        roster = get_roster_index()
+        if roster is not None:
             # Find user by email (case-insensitive)
-            user_row = df[df['userEmail'].str.lower() == user_email.lower()]
+            config = roster.get(_normalize_email(user_email))
             
-            if not user_row.empty:
-                row = user_row.iloc[0]
-                return {
-                    'tenantId': str(row.get('tenantId', '')),
-                    'clientId': str(row.get('clientid', '')),
-                    'url': str(row.get('url', '')),
-                    'clientSecret': str(row.get('clientSecret', ''))
-                }
-        except ImportError:
-            print("pandas and openpyxl required to read Excel files. Install with: pip install pandas openpyxl")
-        except Exception as e:
-            print(f"Error reading Excel file: {e}")
+            if config:
+                _count('hits')
+                return config
+            _count('misses')
+    except ImportError:
+        print("pandas and openpyxl required to read Excel files. Install with: pip install pandas openpyxl")
+    except Exception as e:
+        print(f"Error reading Excel file: {e}")
     
     return None
 
@@ -91,3 +324,129 @@ def get_user_config_from_excel(user_email: str) -> Optional[Dict]:
     """
     return lookup_user_tenant_from_excel(user_email)
 
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to `size` items without materializing the input"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_validate_user_tenants(pairs: Iterable[Tuple[str, str]],
+                               batch_size: int = VALIDATION_BATCH_SIZE) -> Iterator[Dict]:
+    """
+    Validate (email, tenantId) pairs against the roster, streaming results.
+    Each batch is joined against the roster in one query pass, so memory
+    stays flat no matter how many pairs are fed in.
+
+    Args:
+        pairs: Iterable of (user_email, tenant_id)
+        batch_size: Number of pairs joined per roster query pass
+
+    Yields:
+        Dictionary with userEmail, tenantId, expectedTenantId and status
+        ('match', 'mismatch', or 'unknown' when the email is not in the
+        roster), in input order
+    """
+    roster = get_roster_index()
+
+    for batch in _batched(pairs, batch_size):
+        emails = [_normalize_email(email) for email, _ in batch]
+        found = roster.get_many(list(set(emails))) if roster is not None else {}
+
+        for (email, tenant_id), normalized in zip(batch, emails):
+            config = found.get(normalized)
+            expected_tenant_id = config.get('tenantId') if config else None
+            if not config:
+                status = 'unknown'
+            elif not expected_tenant_id:
+                # Same verdict as validate_user_tenant for a row without a tenant
+                status = 'mismatch'
+            elif expected_tenant_id.lower() == (tenant_id or '').strip().lower():
+                status = 'match'
+            else:
+                status = 'mismatch'
+
+            _count('hits' if config else 'misses')
+            yield {
+                'userEmail': email,
+                'tenantId': tenant_id,
+                'expectedTenantId': expected_tenant_id,
+                'status': status
+            }
+
+def validate_user_tenants(pairs: Iterable[Tuple[str, str]]) -> List[Dict]:
+    """
+    Validate a batch of (email, tenantId) pairs before sending invites.
+
+    Args:
+        pairs: Iterable of (user_email, tenant_id)
+
+    Returns:
+        List of per-row results (see iter_validate_user_tenants)
+    """
+    return list(iter_validate_user_tenants(pairs))
+
+def validate_user_tenants_csv(input_path: str, output_path: str,
+                              email_column: str = 'userEmail',
+                              tenant_column: str = 'tenantId') -> Dict[str, int]:
+    """
+    Stream a CSV of new hires through bulk validation (CSV in, CSV out).
+    The output keeps every input column and adds expectedTenantId and status.
+
+    Args:
+        input_path: CSV with email and tenant columns
+        output_path: Where to write the annotated CSV
+        email_column: Name of the email column
+        tenant_column: Name of the tenant ID column
+
+    Returns:
+        Dictionary counting rows per status
+    """
+    summary = {'match': 0, 'mismatch': 0, 'unknown': 0}
+
+    with open(input_path, newline='', encoding='utf-8-sig') as src, \
+         open(output_path, 'w', newline='', encoding='utf-8') as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=list(reader.fieldnames or []) + ['expectedTenantId', 'status'])
+        writer.writeheader()
+
+        # Results come back in input order, so at most one batch of rows is
+        # buffered here while it is being validated
+        pending_rows = deque()
+
+        def _pairs():
+            for row in reader:
+                pending_rows.append(row)
+                yield row.get(email_column, ''), row.get(tenant_column, '')
+
+        for result in iter_validate_user_tenants(_pairs()):
+            row = pending_rows.popleft()
+            row['expectedTenantId'] = result['expectedTenantId'] or ''
+            row['status'] = result['status']
+            writer.writerow(row)
+            summary[result['status']] += 1
+
+    return summary
+
+if __name__ == "__main__":
+    # Build step: python user_tenant_lookup.py roster.xlsx [--output roster.snapshot.sqlite]
+    # Pre-flight:  python user_tenant_lookup.py --validate new_hires.csv results.csv
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile the tenant roster workbook into a lookup snapshot")
+    parser.add_argument("excel_file_path", nargs="?", default=os.getenv("USER_TENANT_EXCEL_PATH"))
+    parser.add_argument("--output", help="Snapshot path (default: next to the workbook)")
+    parser.add_argument("--validate", nargs=2, metavar=("INPUT_CSV", "OUTPUT_CSV"),
+                        help="Validate userEmail/tenantId rows of a CSV against the roster")
+    args = parser.parse_args()
+
+    if args.validate:
+        print(validate_user_tenants_csv(*args.validate))
+    elif not args.excel_file_path:
+        parser.error("excel_file_path is required (or set USER_TENANT_EXCEL_PATH)")
+    else:
+        compile_roster_snapshot(args.excel_file_path, args.output)